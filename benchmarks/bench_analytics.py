@@ -0,0 +1,154 @@
+"""
+TUNVESTI - Benchmark: analytics engines
+Times the analytics modules on the real fact table (when present) and on a
+synthetic universe to check how they scale with the number of tickers.
+
+Usage:
+    python benchmarks/bench_analytics.py [--tickers 2000] [--dates 3200]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tunvesti import backtest, beta, charts, config, indices, liquidity, panel, portfolio  # noqa: E402
+
+
+def timed(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f'  {label:<45} {(time.perf_counter() - start) * 1000:9.1f} ms')
+    return result
+
+
+def load_fact():
+    """Fact table from output/ (Parquet preferred), or None."""
+    import pandas as pd
+
+    parquet = config.OUTPUT_DIR / 'fact_stock_daily.parquet'
+    if parquet.exists():
+        return pd.read_parquet(parquet)
+    if config.FACT_TABLE.exists():
+        return pd.read_csv(config.FACT_TABLE, parse_dates=['date'])
+    return None
+
+
+def bench_real(fact):
+    print(f'\nReal data: {len(fact):,} rows, {fact["ticker"].nunique()} tickers')
+    timed('rolling_beta (window=60)', beta.rolling_beta, fact, 60)
+    timed('rolling_correlation_matrix (every=21)',
+          lambda: list(beta.rolling_correlation_matrix(fact, 60, every=21)))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_panel(fact, Path(tmp))
+    with tempfile.TemporaryDirectory() as tmp:
+        bench_charts(fact, Path(tmp))
+    bench_portfolio(fact)
+    bench_indices(fact)
+    bench_liquidity(fact)
+
+
+def bench_portfolio(fact):
+    analytics = timed('PortfolioAnalytics.from_fact', portfolio.PortfolioAnalytics.from_fact, fact)
+    rng = np.random.default_rng(0)
+    candidates = [dict(zip(rng.choice(analytics.tickers, 10, replace=False), rng.random(10)))
+                  for _ in range(500)]
+    for method in portfolio.COVARIANCE_METHODS:
+        timed(f'evaluate_many 500 portfolios ({method}, cold)',
+              analytics.evaluate_many, candidates, '2018-01-01', None, method)
+        timed(f'evaluate_many 500 portfolios ({method}, cached)',
+              analytics.evaluate_many, candidates, '2018-01-01', None, method)
+
+
+def bench_indices(fact):
+    import pandas as pd
+
+    dim_stock = pd.read_csv(config.DIM_STOCK) if config.DIM_STOCK.exists() else None
+    timed('compute_indices (all sectors, full history)', indices.compute_indices, fact, dim_stock)
+    with tempfile.TemporaryDirectory() as tmp:
+        dates = pd.to_datetime(fact['date'])
+        indices.refresh_indices(fact[dates < dates.max()], dim_stock, index_dir=Path(tmp))
+        timed('refresh_indices (one new day)', indices.refresh_indices, fact, dim_stock, index_dir=Path(tmp))
+
+
+def bench_liquidity(fact):
+    import pandas as pd
+
+    timed('compute_liquidity (full history)', liquidity.compute_liquidity, fact)
+    dates = pd.to_datetime(fact['date'])
+    state = timed('build_state (all but the last day)', liquidity.build_state, fact[dates < dates.max()])
+    _, state = timed('update_liquidity (one new day)', liquidity.update_liquidity, state, fact[dates == dates.max()])
+    timed('screen (max_zero_ratio=0.2)', liquidity.screen, state, max_zero_ratio=0.2)
+
+
+def bench_charts(fact, chart_dir):
+    pyramid = timed('build_pyramid (daily/weekly/monthly)', charts.build_pyramid, fact, chart_dir)
+    ticker = fact['ticker'].value_counts().index[0]
+    dates = fact.loc[fact['ticker'] == ticker, 'date']
+    timed(f'pyramid.bars {ticker} (full daily history)', pyramid.bars, ticker)
+    for start in (dates.max() - np.timedelta64(90, 'D'), dates.min()):
+        span = f'{(dates.max() - start).days // 365}y' if start == dates.min() else '90d'
+        for method in charts.DOWNSAMPLERS:
+            timed(f'chart_series {method} 800px ({span})',
+                  charts.chart_series, ticker, 800, start, None, 'close', method, pyramid)
+    timed('candles 800px (full history)', charts.candles, ticker, 800, pyramid=pyramid)
+
+
+def bench_panel(fact, panel_dir):
+    store = timed('build_panel (all fields)', panel.build_panel, fact, panel_dir=panel_dir)
+    last_date, ticker = store.dates[-1], store.tickers[0]
+    timed('pivot_table close (long -> wide)',
+          fact.pivot_table, index='date', columns='ticker', values='close', aggfunc='last')
+    timed('panel.row close (one date)', store.row, 'close', last_date)
+    timed('panel.column close (one ticker)', store.column, 'close', ticker)
+    timed('panel breadth (advancers per day)',
+          lambda: (store.field('daily_return_pct') > 0).sum(axis=1))
+
+    inputs = timed('backtest.load_inputs (from panel)', backtest.load_inputs, store)
+    for strategy, rebalance in (('momentum', 'M'), ('low_volatility', 'M'), ('momentum', 'D')):
+        timed(f'run_backtest {strategy} rebalance={rebalance}',
+              backtest.run_backtest, inputs, strategy, rebalance=rebalance)
+    grid = {'lookback': [63, 126, 252], 'skip': [0, 21], 'top_n': [5, 10, 20]}
+    timed('run_grid momentum (18 configs, process pool)',
+          backtest.run_grid, 'momentum', grid, panel_dir=panel_dir)
+
+
+def bench_synthetic(n_tickers, n_dates):
+    print(f'\nSynthetic: {n_dates} dates x {n_tickers} tickers')
+    rng = np.random.default_rng(0)
+    returns = rng.standard_normal((n_dates, n_tickers))
+    returns[rng.random(returns.shape) < 0.2] = np.nan
+    market = rng.standard_normal(n_dates)
+    timed('rolling_beta_arrays (window=60)', beta.rolling_beta_arrays, returns, market, 60)
+    small = returns[:, :200]
+    timed('iter_correlation_matrices 200 tickers (every=21)',
+          lambda: list(beta.iter_correlation_matrices(small, 60, every=21)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analytics engines')
+    parser.add_argument('--tickers', type=int, default=2000, help='Synthetic universe size')
+    parser.add_argument('--dates', type=int, default=3200, help='Synthetic history length')
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('TUNVESTI ANALYTICS BENCHMARK')
+    print('=' * 60)
+
+    fact = load_fact()
+    if fact is not None:
+        bench_real(fact)
+    else:
+        print('\n⚠ No fact table in output/ - skipping real-data benchmarks')
+    bench_synthetic(args.tickers, args.dates)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+TUNVESTI - Benchmark: CLI startup and import time
+Measures how long the `tunvesti` CLI takes to start using `python -X importtime`
+and wall-clock timings of light subcommands.
+
+Usage:
+    python benchmarks/bench_import_time.py [--runs 10] [--budget-ms 100] [--top 15]
+
+The budget applies to the CLI's own overhead, i.e. the time on top of a bare
+`python -c pass`, since interpreter startup depends on the environment.
+Exits with code 1 if a light command exceeds the budget.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+# Commands that must never pull in pandas/selenium/requests
+LIGHT_COMMANDS = {
+    'tunvesti --help': ['-m', 'tunvesti', '--help'],
+    'tunvesti --version': ['-m', 'tunvesti', '--version'],
+    'tunvesti query --help': ['-m', 'tunvesti', 'query', '--help'],
+}
+
+HEAVY_MODULES = ('pandas', 'numpy', 'selenium', 'requests', 'bs4', 'schedule', 'duckdb', 'pyarrow')
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = str(BASE_DIR) + os.pathsep + env.get('PYTHONPATH', '')
+    return env
+
+
+def wall_time(args, runs):
+    """Median wall-clock time (ms) of running the interpreter with args."""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, cwd=BASE_DIR, env=_env(),
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def import_profile(args):
+    """
+    Run with -X importtime and parse its stderr.
+
+    Returns:
+    list of (module, self_us, cumulative_us) in import order
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime'] + args, cwd=BASE_DIR, env=_env(),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line.split(':', 1)[1].split('|')
+        rows.append((module.rstrip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tunvesti CLI startup/import time')
+    parser.add_argument('--runs', type=int, default=10, help='Runs per command (median reported)')
+    parser.add_argument('--budget-ms', type=float, default=100.0, help='Allowed CLI overhead in ms')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('TUNVESTI IMPORT-TIME BENCHMARK')
+    print('=' * 60)
+
+    baseline = wall_time(['-c', 'pass'], args.runs)
+    print(f'\nBare interpreter (python -c pass): {baseline:.1f} ms')
+
+    failed = False
+    print('\nLight commands (median wall time / overhead):')
+    for label, cmd in LIGHT_COMMANDS.items():
+        elapsed = wall_time(cmd, args.runs)
+        overhead = elapsed - baseline
+        ok = overhead <= args.budget_ms
+        failed |= not ok
+        print(f"  {'✓' if ok else '✗'} {label:<25} {elapsed:7.1f} ms  (+{overhead:.1f} ms)")
+
+    rows = import_profile(['-m', 'tunvesti', '--help'])
+    print(f'\n-X importtime for `tunvesti --help`: {len(rows)} modules imported')
+
+    heavy = sorted({module.strip().split('.')[0] for module, _, _ in rows} & set(HEAVY_MODULES))
+    if heavy:
+        failed = True
+        print(f"  ✗ Heavy modules imported at startup: {', '.join(heavy)}")
+    else:
+        print('  ✓ No heavy modules imported at startup')
+
+    own = [row for row in rows if row[0].strip().startswith('tunvesti')]
+    own_total = sum(self_us for _, self_us, _ in own)
+    print(f'  tunvesti.* self time: {own_total / 1000:.2f} ms')
+
+    print(f'\nTop {args.top} imports by cumulative time:')
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f'  {cumulative_us / 1000:8.2f} ms  (self {self_us / 1000:6.2f} ms)  {module.strip()}')
+
+    print('\n' + ('✓ WITHIN BUDGET' if not failed else '✗ OVER BUDGET'))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+TUNVESTI - Benchmark: embedded SQL query layer
+Times every saved query in tunvesti.query against the current pipeline outputs.
+
+Usage:
+    python benchmarks/bench_query.py [--runs 5]
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from tunvesti import query  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark saved SQL queries')
+    parser.add_argument('--runs', type=int, default=5, help='Runs per query (median reported)')
+    args = parser.parse_args()
+
+    print('=' * 60)
+    print('TUNVESTI QUERY-LAYER BENCHMARK')
+    print('=' * 60)
+
+    start = time.perf_counter()
+    con = query.connect()
+    print(f'\nconnect(): {(time.perf_counter() - start) * 1000:.1f} ms')
+    for name in query.TABLES:
+        print(f'  {name:<18} <- {query.table_source(name)}')
+
+    print('\nSaved queries (median of warm runs):')
+    for name, sql in query.SAVED_QUERIES.items():
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            rows = con.execute(sql).fetchall()
+            timings.append((time.perf_counter() - start) * 1000)
+        print(f'  {name:<28} {statistics.median(timings):8.1f} ms  ({len(rows)} rows)')
+
+    con.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
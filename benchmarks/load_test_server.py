@@ -0,0 +1,115 @@
+"""
+TUNVESTI - Load test: local HTTP query API
+Fires concurrent GET requests at tunvesti.server and reports throughput and
+latency percentiles. By default an in-process server is started on a free
+port against the current output/ directory.
+
+Usage:
+    python benchmarks/load_test_server.py [--clients 16] [--requests 2000]
+    python benchmarks/load_test_server.py --url http://127.0.0.1:8765
+"""
+
+import argparse
+import http.client
+import random
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlparse
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+PATHS = [
+    '/tickers',
+    '/snapshot/latest',
+    '/sectors?start=2020-01-01',
+    '/series/SFBT?columns=close,volume',
+    '/series/BIAT?start=2018-01-01&columns=close',
+    '/series/TJARI',
+    '/series/SAH?columns=close&format=arrow',
+    '/series/PGH?start=2021-01-01',
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_client(host, port, paths, use_etag):
+    """Issue requests over one keep-alive connection; return latencies and statuses."""
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    etags = {}
+    latencies, statuses = [], []
+    for path in paths:
+        headers = {'If-None-Match': etags[path]} if use_etag and path in etags else {}
+        start = time.perf_counter()
+        conn.request('GET', path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - start) * 1000)
+        statuses.append(response.status)
+        if response.getheader('ETag'):
+            etags[path] = response.getheader('ETag')
+    conn.close()
+    return latencies, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load test the tunvesti HTTP API')
+    parser.add_argument('--url', help='Existing server URL (default: start one in-process)')
+    parser.add_argument('--clients', type=int, default=16, help='Concurrent clients')
+    parser.add_argument('--requests', type=int, default=2000, help='Total requests')
+    parser.add_argument('--etag', action='store_true', help='Send If-None-Match on repeat requests')
+    args = parser.parse_args()
+
+    server = None
+    if args.url:
+        parsed = urlparse(args.url)
+        host, port = parsed.hostname, parsed.port
+    else:
+        from tunvesti.server import make_server
+        server = make_server(port=0)
+        host, port = server.server_address
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    per_client = max(1, args.requests // args.clients)
+    rng = random.Random(42)
+    workloads = [[rng.choice(PATHS) for _ in range(per_client)] for _ in range(args.clients)]
+
+    print('=' * 60)
+    print('TUNVESTI HTTP API LOAD TEST')
+    print('=' * 60)
+    print(f'Target: http://{host}:{port}  clients={args.clients}  requests={per_client * args.clients}'
+          f"  etag={'on' if args.etag else 'off'}")
+
+    # Warm-up: one cold pass over every path (fills the result cache)
+    cold, _ = run_client(host, port, PATHS, use_etag=False)
+    print(f'\nCold pass: median {statistics.median(cold):.1f} ms, max {max(cold):.1f} ms')
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as executor:
+        results = list(executor.map(lambda paths: run_client(host, port, paths, args.etag), workloads))
+    elapsed = time.perf_counter() - start
+
+    latencies = [ms for lat, _ in results for ms in lat]
+    statuses = [code for _, codes in results for code in codes]
+    print(f'\nRequests/sec: {len(latencies) / elapsed:,.0f}')
+    print(f'Latency p50: {percentile(latencies, 50):.2f} ms')
+    print(f'Latency p95: {percentile(latencies, 95):.2f} ms')
+    print(f'Latency p99: {percentile(latencies, 99):.2f} ms')
+    print(f'Status codes: { {code: statuses.count(code) for code in sorted(set(statuses))} }')
+
+    if server is not None:
+        print(f'Cache: {server.RequestHandlerClass.service.cache.stats()}')
+        server.shutdown()
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
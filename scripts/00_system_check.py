@@ -5,9 +5,10 @@ Verifies that all dependencies are installed and environment is ready
 
 import sys
 import os
-import subprocess
 import logging
-import requests
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 logging.basicConfig(
@@ -16,6 +17,33 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Checks run concurrently; each worker collects its own log records here and
+# main() replays them check by check, so the output never interleaves
+_check_records = threading.local()
+
+class _CollectCheckRecords(logging.Filter):
+    """Divert records logged inside a running check to that check's list"""
+    def filter(self, record):
+        records = getattr(_check_records, 'records', None)
+        if records is None:
+            return True
+        records.append(record)
+        return False
+
+logger.addFilter(_CollectCheckRecords())
+
+def run_check(check):
+    """Run one check in a worker thread; returns (passed, its log records)"""
+    _check_records.records = records = []
+    try:
+        return check(), records
+    except Exception:
+        logger.exception(f"✗ {check.__name__} raised an error")
+        return False, records
+    finally:
+        # Worker threads are reused by the pool
+        del _check_records.records
+
 def check_python_version():
     """Check if Python version is 3.8 or higher"""
     logger.info("Checking Python version...")
@@ -42,11 +70,11 @@ def check_packages():
     
     all_ok = True
     
+    # find_spec locates the package without executing it (test_imports does that)
     for import_name, package_name in required_packages.items():
-        try:
-            __import__(import_name)
+        if importlib.util.find_spec(import_name) is not None:
             logger.info(f"✓ {package_name} - OK")
-        except ImportError:
+        else:
             logger.error(f"✗ {package_name} - NOT INSTALLED")
             all_ok = False
     
@@ -139,6 +167,12 @@ def test_internet_connection():
     """Test internet connectivity"""
     logger.info("\nTesting internet connection...")
     
+    try:
+        import requests
+    except ImportError:
+        logger.warning("⚠ requests not installed - skipping internet test")
+        return False
+    
     try:
         # Use allow_redirects=True to handle redirects (Google redirects HTTP to HTTPS)
         response = requests.get('https://www.google.com', timeout=5, allow_redirects=True)
@@ -162,6 +196,12 @@ def test_ilboursa_access():
     """Test if Ilboursa.com is accessible"""
     logger.info("\nTesting Ilboursa.com access...")
     
+    try:
+        import requests
+    except ImportError:
+        logger.warning("⚠ requests not installed - skipping Ilboursa test")
+        return False
+    
     try:
         headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'}
         # Try the main Ilboursa homepage instead of specific page
@@ -185,9 +225,9 @@ def generate_report(results):
     if all(results.values()):
         logger.info("\n✅ ALL CHECKS PASSED - System ready!")
         logger.info("\nNext steps:")
-        logger.info("1. Run: python 01_load_kaggle_data.py")
-        logger.info("2. Run: python 02_scrape_ilboursa_daily.py")
-        logger.info("3. Run: python 03_merge_data.py")
+        logger.info("1. Run: python -m tunvesti load")
+        logger.info("2. Run: python -m tunvesti scrape")
+        logger.info("3. Run: python -m tunvesti merge")
     else:
         logger.info("\n⚠️ SOME CHECKS FAILED - Review above errors")
         logger.info("\nTo fix:")
@@ -205,16 +245,29 @@ def main():
     logger.info(f"Started at: {datetime.now()}")
     logger.info("="*60 + "\n")
     
-    results = {
-        'Python Version': check_python_version(),
-        'Required Packages': check_packages(),
-        'Directory Structure': check_directories(),
-        'Script Files': check_scripts(),
-        'Imports': test_imports(),
-        'Internet Connection': test_internet_connection(),
-        'Ilboursa Access': test_ilboursa_access()
+    checks = {
+        'Python Version': check_python_version,
+        'Required Packages': check_packages,
+        'Directory Structure': check_directories,
+        'Script Files': check_scripts,
+        'Imports': test_imports,
+        'Internet Connection': test_internet_connection,
+        'Ilboursa Access': test_ilboursa_access
     }
     
+    # Probes are independent and mostly I/O bound (network timeouts, imports),
+    # so run them concurrently: total time is the slowest probe, not the sum.
+    with ThreadPoolExecutor(max_workers=len(checks)) as executor:
+        futures = {executor.submit(run_check, check): name for name, check in checks.items()}
+        outcomes = {futures[future]: future.result() for future in as_completed(futures)}
+    
+    # Log each check's output in the fixed order above, not in completion order
+    results = {}
+    for name in checks:
+        results[name], records = outcomes[name]
+        for record in records:
+            logger.handle(record)
+    
     generate_report(results)
     
     logger.info(f"Completed at: {datetime.now()}\n")
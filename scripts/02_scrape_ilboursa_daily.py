@@ -3,22 +3,25 @@ TUNVESTI - Step 2: Web Scraper for Ilboursa Daily Data (2025+)
 This script scrapes daily stock market data from Ilboursa.com using Selenium
 URL pattern: https://www.ilboursa.com/marches/cotation_TICKER
 Extracts: Open, High, Low, Close, Volume
+
+Intraday mode (--intraday [--interval 5] [--tickers SFBT,BIAT]) polls the
+quote pages during the trading session and writes 5/15/60-minute bars to
+output/intraday/.
+
+Every parsed quote is also published on the local feed (tunvesti/feed.py)
+when a broker is running: topic 'quote' (daily) or 'tick' (intraday).
 """
 
-import requests
-from bs4 import BeautifulSoup
-import pandas as pd
 from datetime import datetime
 import logging
 import os
+import sys
 import time
 import re
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+
+# requests, BeautifulSoup, pandas and selenium are imported inside the
+# functions that use them: importing selenium alone costs more than the rest
+# of the script's startup, and most entry points never open a browser.
 
 # Setup absolute paths
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,6 +29,10 @@ base_dir = os.path.dirname(script_dir)
 output_dir = os.path.join(base_dir, 'output')
 daily_updates_dir = os.path.join(output_dir, 'daily_updates')
 
+# Make the tunvesti package (project root) importable when run as a script
+if base_dir not in sys.path:
+    sys.path.insert(0, base_dir)
+
 # Create output directory if it doesn't exist
 os.makedirs(daily_updates_dir, exist_ok=True)
 
@@ -45,6 +52,11 @@ HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
 }
 
+# Intraday mode: a full pass over all tickers takes 3-4 minutes at this page
+# wait, so shorter intervals need a shorter --tickers list
+INTRADAY_INTERVAL_MINUTES = 5
+INTRADAY_PAGE_WAIT = 1.5
+
 # All ACTIVE Tunisia BVMT stock tickers - VERIFIED WORKING URLS
 TUNISIA_TICKERS = [
     'ADWYA', 'AETEC', 'AL', 'AB', 'AMS', 'ATB', 'ATL', 'ARTES', 'ASSAD', 'ASSMA',
@@ -59,6 +71,148 @@ TUNISIA_TICKERS = [
     'UMED', 'WIFAK'
 ]
 
+def create_driver():
+    """Start a headless Chrome WebDriver (faster, no GUI)."""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.options import Options
+    
+    chrome_options = Options()
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    return webdriver.Chrome(options=chrome_options)
+
+def parse_quote_page(page_source):
+    """
+    Extract the quote fields from a rendered Ilboursa quote page.
+    
+    Parameters:
+    page_source (str): HTML of https://www.ilboursa.com/marches/cotation_TICKER
+    
+    Returns:
+    tuple: (open, high, low, close, volume, volatility, market_cap); close is None if not found
+    """
+    from bs4 import BeautifulSoup
+    
+    # Parse the rendered HTML
+    soup = BeautifulSoup(page_source, 'html.parser')
+    all_text = soup.get_text()
+    
+    # Extract OHLCV + Volatility + Market Cap using French labels found on the page
+    # Pattern: Label followed by price value(s)
+    open_price = None
+    high_price = None
+    low_price = None
+    close_price = None
+    volume = 0
+    volatility = None
+    market_cap = None
+    
+    # Split text into lines for easier parsing
+    lines = all_text.split('\n')
+    
+    for i, line in enumerate(lines):
+        line_clean = line.strip()
+    
+        # Look for COURS (Close price)
+        if line_clean.upper() == 'COURS' and i + 1 < len(lines):
+            try:
+                price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
+                if '%' not in price_str:  # Skip percentage lines
+                    close_price = float(price_str)
+            except:
+                pass
+    
+        # Look for OUVERTURE (Open price)
+        if line_clean.upper() == 'OUVERTURE' and i + 1 < len(lines):
+            try:
+                price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
+                if '%' not in price_str:
+                    open_price = float(price_str)
+            except:
+                pass
+    
+        # Look for HAUT (High price)
+        if 'HAUT' in line_clean.upper() and i + 1 < len(lines):
+            try:
+                price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
+                if '%' not in price_str:
+                    high_price = float(price_str)
+            except:
+                pass
+    
+        # Look for BAS (Low price)
+        if line_clean.upper() == 'BAS' and i + 1 < len(lines):
+            try:
+                price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
+                if '%' not in price_str:
+                    low_price = float(price_str)
+            except:
+                pass
+    
+        # Look for VOLUME - check next 3 lines for the volume number
+        if line_clean.upper() == 'VOLUME':
+            # Search next 3 lines for actual volume (skip empty lines)
+            for j in range(i + 1, min(i + 4, len(lines))):
+                vol_candidate = lines[j].strip()
+                # Skip empty lines, continue to next
+                if not vol_candidate:
+                    continue
+                # Remove ALL types of spaces (regular space, non-breaking space \xa0, tabs)
+                vol_cleaned = vol_candidate.replace(' ', '').replace('\xa0', '').replace(',', '').replace('\t', '')
+    
+                # Must be numeric
+                if vol_cleaned and vol_cleaned.isdigit():
+                    vol_num = int(vol_cleaned)
+                    # Accept volume if it's reasonable (0 to 1 billion)
+                    if 0 < vol_num < 1_000_000_000:
+                        volume = vol_num
+                        break
+    
+        # Look for VOLATILITE (Volatility percentage)
+        if line_clean.upper() == 'VOLATILITE' and i + 1 < len(lines):
+            try:
+                # Remove %, comma, spaces, and + sign
+                vol_str = lines[i + 1].strip().replace(',', '.').replace('%', '').replace(' ', '').replace('+', '')
+                if vol_str and vol_str.replace('.', '').replace('-', '').isdigit():
+                    volatility = float(vol_str)
+            except:
+                pass
+    
+        # Look for VALORISATION (Market Cap in millions TND)
+        if line_clean.upper() == 'VALORISATION' and i + 1 < len(lines):
+            try:
+                cap_str = lines[i + 1].strip().upper()
+                # Format: "1664 MTND" or "176,3 MTND" (comma = decimal in French)
+                cap_cleaned = cap_str.replace(' ', '').replace('\xa0', '').replace('MTND', '').replace('M', '').replace(',', '.')
+                # Now parse as float
+                if cap_cleaned and cap_cleaned.replace('.', '').replace('-', '').isdigit():
+                    market_cap = float(cap_cleaned)  # In millions
+            except:
+                pass
+    
+    # Fallback: if OHLC not found properly, try regex extraction
+    if not close_price:
+        price_pattern = r'(\d+[.,]\d{1,2})'
+        prices = re.findall(price_pattern, all_text)
+        if prices:
+            try:
+                close_price = float(prices[0].replace(',', '.'))
+            except:
+                pass
+    
+    # Fill missing OHLC values with Close price
+    if not open_price and close_price:
+        open_price = close_price
+    if not high_price and close_price:
+        high_price = close_price
+    if not low_price and close_price:
+        low_price = close_price
+    
+    return open_price, high_price, low_price, close_price, volume, volatility, market_cap
+
 def scrape_ilboursa_daily():
     """
     Scrape current market data from Ilboursa.com using Selenium for JavaScript rendering
@@ -68,6 +222,10 @@ def scrape_ilboursa_daily():
     pd.DataFrame: Daily market data with columns: Date, Ticker, Open, High, Low, Close, Volume
     """
     
+    import pandas as pd
+    from selenium.common.exceptions import TimeoutException
+    from tunvesti.feed import Publisher
+    
     logger.info(f"Starting Ilboursa daily scrape for {len(TUNISIA_TICKERS)} stocks...")
     logger.info("Using Selenium for JavaScript rendering...")
     logger.info("Looking for: COURS, OUVERTURE, HAUT, BAS, VOLUME, VOLATILITE")
@@ -75,18 +233,11 @@ def scrape_ilboursa_daily():
     data = []
     today = datetime.now().strftime("%Y-%m-%d")
     success_count = 0
-    
-    # Setup Chrome options (headless mode - faster, no GUI)
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    publisher = Publisher()  # live feed for subscribers (no-op without a running broker)
     
     driver = None
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        driver = create_driver()
         logger.info("Chrome WebDriver initialized")
         
         for idx, ticker in enumerate(TUNISIA_TICKERS, 1):
@@ -97,120 +248,8 @@ def scrape_ilboursa_daily():
                 driver.get(url)
                 time.sleep(2)  # Wait for page to fully load
                 
-                # Parse the rendered HTML
-                soup = BeautifulSoup(driver.page_source, 'html.parser')
-                all_text = soup.get_text()
-                
-                # Extract OHLCV + Volatility + Market Cap using French labels found on the page
-                # Pattern: Label followed by price value(s)
-                open_price = None
-                high_price = None
-                low_price = None
-                close_price = None
-                volume = 0
-                volatility = None
-                market_cap = None
-                
-                # Split text into lines for easier parsing
-                lines = all_text.split('\n')
-                
-                for i, line in enumerate(lines):
-                    line_clean = line.strip()
-                    
-                    # Look for COURS (Close price)
-                    if line_clean.upper() == 'COURS' and i + 1 < len(lines):
-                        try:
-                            price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
-                            if '%' not in price_str:  # Skip percentage lines
-                                close_price = float(price_str)
-                        except:
-                            pass
-                    
-                    # Look for OUVERTURE (Open price)
-                    if line_clean.upper() == 'OUVERTURE' and i + 1 < len(lines):
-                        try:
-                            price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
-                            if '%' not in price_str:
-                                open_price = float(price_str)
-                        except:
-                            pass
-                    
-                    # Look for HAUT (High price)
-                    if 'HAUT' in line_clean.upper() and i + 1 < len(lines):
-                        try:
-                            price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
-                            if '%' not in price_str:
-                                high_price = float(price_str)
-                        except:
-                            pass
-                    
-                    # Look for BAS (Low price)
-                    if line_clean.upper() == 'BAS' and i + 1 < len(lines):
-                        try:
-                            price_str = lines[i + 1].strip().replace(',', '.').replace(' ', '')
-                            if '%' not in price_str:
-                                low_price = float(price_str)
-                        except:
-                            pass
-                    
-                    # Look for VOLUME - check next 3 lines for the volume number
-                    if line_clean.upper() == 'VOLUME':
-                        # Search next 3 lines for actual volume (skip empty lines)
-                        for j in range(i + 1, min(i + 4, len(lines))):
-                            vol_candidate = lines[j].strip()
-                            # Skip empty lines, continue to next
-                            if not vol_candidate:
-                                continue
-                            # Remove ALL types of spaces (regular space, non-breaking space \xa0, tabs)
-                            vol_cleaned = vol_candidate.replace(' ', '').replace('\xa0', '').replace(',', '').replace('\t', '')
-                            
-                            # Must be numeric
-                            if vol_cleaned and vol_cleaned.isdigit():
-                                vol_num = int(vol_cleaned)
-                                # Accept volume if it's reasonable (0 to 1 billion)
-                                if 0 < vol_num < 1_000_000_000:
-                                    volume = vol_num
-                                    break
-                    
-                    # Look for VOLATILITE (Volatility percentage)
-                    if line_clean.upper() == 'VOLATILITE' and i + 1 < len(lines):
-                        try:
-                            # Remove %, comma, spaces, and + sign
-                            vol_str = lines[i + 1].strip().replace(',', '.').replace('%', '').replace(' ', '').replace('+', '')
-                            if vol_str and vol_str.replace('.', '').replace('-', '').isdigit():
-                                volatility = float(vol_str)
-                        except:
-                            pass
-                    
-                    # Look for VALORISATION (Market Cap in millions TND)
-                    if line_clean.upper() == 'VALORISATION' and i + 1 < len(lines):
-                        try:
-                            cap_str = lines[i + 1].strip().upper()
-                            # Format: "1664 MTND" or "176,3 MTND" (comma = decimal in French)
-                            cap_cleaned = cap_str.replace(' ', '').replace('\xa0', '').replace('MTND', '').replace('M', '').replace(',', '.')
-                            # Now parse as float
-                            if cap_cleaned and cap_cleaned.replace('.', '').replace('-', '').isdigit():
-                                market_cap = float(cap_cleaned)  # In millions
-                        except:
-                            pass
-                
-                # Fallback: if OHLC not found properly, try regex extraction
-                if not close_price:
-                    price_pattern = r'(\d+[.,]\d{1,2})'
-                    prices = re.findall(price_pattern, all_text)
-                    if prices:
-                        try:
-                            close_price = float(prices[0].replace(',', '.'))
-                        except:
-                            pass
-                
-                # Fill missing OHLC values with Close price
-                if not open_price and close_price:
-                    open_price = close_price
-                if not high_price and close_price:
-                    high_price = close_price
-                if not low_price and close_price:
-                    low_price = close_price
+                open_price, high_price, low_price, close_price, volume, volatility, market_cap = \
+                    parse_quote_page(driver.page_source)
                 
                 # Save if we have close price
                 if close_price and close_price > 0:
@@ -226,6 +265,7 @@ def scrape_ilboursa_daily():
                         'Market_Cap_M': round(market_cap, 2) if market_cap else None
                     }
                     data.append(record)
+                    publisher.publish('quote', record)
                     logger.info(f"  ✓ {ticker}: C={record['Close']}, V={volume}, Vol%={volatility}, MCap={market_cap}M")
                     success_count += 1
                 else:
@@ -245,6 +285,7 @@ def scrape_ilboursa_daily():
                 continue
     
     finally:
+        publisher.close()
         if driver:
             driver.quit()
             logger.info("Chrome WebDriver closed")
@@ -265,6 +306,10 @@ def scrape_tunindex():
     pd.DataFrame: TUNINDEX data
     """
     
+    import pandas as pd
+    import requests
+    from bs4 import BeautifulSoup
+    
     logger.info("Starting TUNINDEX scrape...")
     
     try:
@@ -331,6 +376,148 @@ def save_daily_data(df, data_type):
     
     return output_path
 
+def screen_scraped_quotes(df):
+    """
+    Screen scraped quotes with the streaming anomaly detector before saving.
+    
+    Held quotes (bad OHLC, move beyond the price limit, out-of-order date)
+    are written to output/quarantine/scraped_held_<date>.csv and dropped;
+    flagged quotes are kept and listed in scraped_flagged_<date>.csv. The
+    detector state is seeded from the fact table on first use and saved
+    after every run.
+    
+    Parameters:
+    df (pd.DataFrame): Scraped stock quotes
+    
+    Returns:
+    pd.DataFrame: Accepted quotes, in the scraper's columns
+    """
+    import pandas as pd
+    from tunvesti import config
+    from tunvesti.anomaly import build_state, load_state, save_state, screen_quotes
+    from tunvesti.validation import save_quarantine
+    
+    state = load_state()
+    if state is None:
+        parquet = config.OUTPUT_DIR / 'fact_stock_daily.parquet'
+        if parquet.exists():
+            fact = pd.read_parquet(parquet, columns=['date', 'ticker', 'close', 'volume'])
+        elif config.FACT_TABLE.exists():
+            fact = pd.read_csv(config.FACT_TABLE, usecols=['date', 'ticker', 'close', 'volume'],
+                               parse_dates=['date'])
+        else:
+            fact = pd.DataFrame(columns=['date', 'ticker', 'close', 'volume'])
+        state = build_state(fact)
+        logger.info(f"Anomaly detector seeded from history ({len(state['tickers'])} tickers)")
+    
+    accepted, held, state = screen_quotes(state, df)
+    save_state(state)
+    
+    date_str = datetime.now().strftime('%Y-%m-%d')
+    flagged = accepted[accepted['anomaly'] != '']
+    if not flagged.empty:
+        path = save_quarantine(flagged, f"scraped_flagged_{date_str}")
+        for _, row in flagged.iterrows():
+            logger.info(f"  ⚠ {row['Ticker']}: flagged ({row['anomaly']})")
+        logger.info(f"{len(flagged)} quotes flagged (saved): {path}")
+    if not held.empty:
+        path = save_quarantine(held, f"scraped_held_{date_str}")
+        for _, row in held.iterrows():
+            logger.warning(f"  ✗ {row['Ticker']}: held, not saved ({row['anomaly']})")
+        logger.warning(f"{len(held)} quotes held for review: {path}")
+    logger.info(f"Anomaly screen: {len(accepted)} accepted ({len(flagged)} flagged), {len(held)} held")
+    
+    return accepted.drop(columns='anomaly', errors='ignore')
+
+def update_liquidity_state(df):
+    """
+    Fold the scraped session into the rolling liquidity state.
+    
+    The state is built by script 03; until it exists, or when no quote was
+    accepted, this session is already in it (a re-scrape) or nothing
+    traded (a market holiday), the state is left as is.
+    
+    Parameters:
+    df (pd.DataFrame): Accepted stock quotes
+    """
+    import pandas as pd
+    from tunvesti.liquidity import load_state, save_state, screen, update_liquidity
+    
+    if df.empty:
+        return
+    state = load_state()
+    if state is None:
+        logger.info("No liquidity state yet (built by script 03)")
+        return
+    day_rows = df.rename(columns=str.lower)
+    session = datetime.strptime(str(day_rows['date'].iloc[0]), '%Y-%m-%d').date()
+    if session <= state['last_date'].astype(object):
+        logger.info(f"Liquidity state already at {state['last_date']}, not updated")
+        return
+    if not (pd.to_numeric(day_rows['volume'], errors='coerce') > 0).any():
+        logger.info("No volume in the scraped quotes, liquidity state not updated")
+        return
+    
+    _, state = update_liquidity(state, day_rows)
+    save_state(state)
+    traded = screen(state, max_zero_ratio=0.0)
+    logger.info(f"Liquidity state updated to {session}: {len(traded)} tickers traded every session of the window")
+
+def poll_quotes(driver, tickers, publisher=None):
+    """
+    One intraday pass over the quote pages (generator, one tick per ticker).
+    
+    Yields:
+    tuple: (ticker, last price, cumulative session volume)
+    """
+    for ticker in tickers:
+        try:
+            driver.get(f'https://www.ilboursa.com/marches/cotation_{ticker}')
+            time.sleep(INTRADAY_PAGE_WAIT)
+            _, _, _, close_price, volume, _, _ = parse_quote_page(driver.page_source)
+            if close_price and close_price > 0:
+                if publisher is not None:
+                    publisher.publish('tick', {'ticker': ticker, 'price': close_price, 'volume': volume})
+                yield ticker, close_price, volume
+        except Exception as e:
+            logger.debug(f"  {ticker}: Error - {str(e)}")
+
+def scrape_intraday(interval_minutes, tickers=None):
+    """
+    Poll quotes every interval_minutes during the BVMT session and write
+    5/15/60-minute OHLCV bars to output/intraday/ (see tunvesti/intraday.py).
+    
+    Parameters:
+    interval_minutes (int): Minutes between the starts of two poll cycles
+    tickers (list): Tickers to poll (default: TUNISIA_TICKERS)
+    
+    Returns:
+    dict: Session statistics (cycles, skipped slots, ticks, bars)
+    """
+    from tunvesti.feed import Publisher
+    from tunvesti.intraday import INTRADAY_DIR, BarBuilder, BarWriter, TickBuffer, run_session
+    
+    tickers = tickers or TUNISIA_TICKERS
+    logger.info(f"Starting intraday polling of {len(tickers)} stocks every {interval_minutes} min...")
+    
+    buffer = TickBuffer(tickers, capacity=TickBuffer.capacity_for(interval_minutes))
+    bars = BarBuilder(buffer, BarWriter(INTRADAY_DIR))
+    publisher = Publisher()
+    driver = None
+    try:
+        driver = create_driver()
+        logger.info("Chrome WebDriver initialized")
+        stats = run_session(lambda: poll_quotes(driver, tickers, publisher), buffer, bars, interval_minutes)
+    finally:
+        publisher.close()
+        if driver:
+            driver.quit()
+            logger.info("Chrome WebDriver closed")
+    
+    logger.info(f"Intraday session done: {stats['cycles']} cycles ({stats['skipped']} slots skipped), "
+                f"{stats['ticks']} ticks, {stats['bars']} bars in {INTRADAY_DIR}")
+    return stats
+
 def main():
     """
     Main execution function
@@ -340,11 +527,14 @@ def main():
     
     # Scrape stocks
     stocks_df = scrape_ilboursa_daily()
+    if not stocks_df.empty:
+        stocks_df = screen_scraped_quotes(stocks_df)
     if not stocks_df.empty:
         save_daily_data(stocks_df, 'stocks')
+        update_liquidity_state(stocks_df)
         logger.info(f"Stocks summary:\n{stocks_df.head()}")
     else:
-        logger.warning("No stocks data collected")
+        logger.warning("No stocks data collected (or every quote was held)")
     
     time.sleep(2)
     
@@ -359,4 +549,16 @@ def main():
     logger.info("=== Web Scraper Completed ===\n")
 
 if __name__ == "__main__":
-    main()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Scrape daily (or intraday) quotes from Ilboursa')
+    parser.add_argument('--intraday', action='store_true', help='Poll during the trading session and build bars')
+    parser.add_argument('--interval', type=int, default=INTRADAY_INTERVAL_MINUTES,
+                        help=f'Minutes between intraday polls (default: {INTRADAY_INTERVAL_MINUTES})')
+    parser.add_argument('--tickers', help='Comma-separated tickers to poll intraday (default: all)')
+    args = parser.parse_args()
+    
+    if args.intraday:
+        scrape_intraday(args.interval, args.tickers.upper().split(',') if args.tickers else None)
+    else:
+        main()
@@ -12,6 +12,7 @@ import pandas as pd
 import numpy as np
 from pathlib import Path
 import logging
+import sys
 from datetime import datetime
 
 # ============================================================================
@@ -26,10 +27,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Define paths
-BASE_DIR = Path(__file__).parent.parent
+BASE_DIR = Path(__file__).resolve().parent.parent
 DATA_DIR = BASE_DIR / 'data'
 OUTPUT_DIR = BASE_DIR / 'output'
 
+# Make the tunvesti package (project root) importable when run as a script
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
 # Input files
 INPUT_FILES = {
     'historical': DATA_DIR / 'historical_stocks_2010_2022.csv',
@@ -44,10 +49,30 @@ OUTPUT_FILES = {
     'merged_clean': OUTPUT_DIR / 'merged_clean_data.csv',
     'enriched': OUTPUT_DIR / 'enriched_data.csv',
     'fact_table': OUTPUT_DIR / 'fact_stock_daily.csv',
+    'fact_parquet': OUTPUT_DIR / 'fact_stock_daily.parquet',
     'dim_date': OUTPUT_DIR / 'dim_date.csv',
-    'dim_stock': OUTPUT_DIR / 'dim_stock.csv'
+    'dim_stock': OUTPUT_DIR / 'dim_stock.csv',
+    'fact_market': OUTPUT_DIR / 'fact_market_daily.csv'
 }
 
+# Technical indicators appended to fact_stock_daily (see tunvesti/indicators.py).
+# Empty by default so the fact table only grows when asked, e.g.
+# FACT_INDICATORS = {'rsi': [14], 'sma': [50, 200], 'drawdown': True}
+FACT_INDICATORS = {}
+
+# Also write output/powerbi/ (one fact CSV per month, see tunvesti/powerbi.py)
+POWERBI_PARTITIONED_EXPORT = True
+
+# User-defined baskets indexed next to the sector indices (see tunvesti/indices.py), e.g.
+# INDEX_BASKETS = {'BANKS_TOP5': {'tickers': ['BIAT', 'BT', 'STB', 'ATB', 'UIB'], 'weighting': 'cap'}}
+INDEX_BASKETS = {}
+
+# Validation gate (see tunvesti/validation.py): abort the run when more than
+# this share of rows fails an error-level rule, in stages of at least
+# VALIDATION_GATE_MIN_ROWS rows (a day's scraped batch only quarantines its bad rows)
+VALIDATION_MAX_QUARANTINE_PCT = 1.0
+VALIDATION_GATE_MIN_ROWS = 1000
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -236,6 +261,10 @@ def clean_data(dfs):
             if col in df_tunindex.columns:
                 df_tunindex[col] = df_tunindex[col].apply(safe_convert_numeric)
         
+        # Prefix OHLC so the columns keep their meaning in fact_market_daily
+        df_tunindex.rename(columns={'open': 'tunindex_open', 'high': 'tunindex_high',
+                                    'low': 'tunindex_low'}, inplace=True)
+        
         # Rename 'vol.' if it exists
         if 'vol.' in df_tunindex.columns:
             df_tunindex.rename(columns={'vol.': 'tunindex_volume'}, inplace=True)
@@ -285,6 +314,38 @@ def clean_data(dfs):
     }
 
 
+# ============================================================================
+# VALIDATION GATE (after cleaning and after deriving metrics)
+# ============================================================================
+
+def validate_stage(df, stage, name):
+    """Run the validation rules of a stage; quarantine failing rows and return the rest."""
+    from tunvesti.validation import gate_exceeded, save_quarantine, validate
+    
+    logger.info(f"\n→ Validating {name} ({stage} rules)...")
+    result = validate(df, stage)
+    
+    for rule in result['summary'].itertuples():
+        if rule.violations:
+            marker = '✗' if rule.severity == 'error' else '⚠'
+            logger.info(f"  {marker} {rule.rule}: {rule.violations} rows ({rule.description})")
+    
+    quarantined = len(result['quarantine'])
+    path = save_quarantine(result['quarantine'], name)
+    warnings_path = save_quarantine(result['warnings'], f'{name}_warnings')
+    logger.info(f"  → {quarantined} rows quarantined to {path.name}, "
+                f"{len(result['warnings'])} rows with warnings in {warnings_path.name}")
+    
+    if gate_exceeded(quarantined, len(df), VALIDATION_MAX_QUARANTINE_PCT, VALIDATION_GATE_MIN_ROWS):
+        raise ValueError(f"Validation gate failed for {name}: {quarantined / len(df) * 100:.2f}% of rows "
+                         f"quarantined (limit {VALIDATION_MAX_QUARANTINE_PCT}%), see {path}")
+    if quarantined and len(df) < VALIDATION_GATE_MIN_ROWS:
+        logger.warning(f"  ⚠ {quarantined} of {len(df)} {name} rows quarantined; "
+                       f"the remaining rows are merged")
+    
+    return result['passed']
+
+
 # ============================================================================
 # STEP 3: MERGE DATA
 # ============================================================================
@@ -295,39 +356,24 @@ def merge_data(dfs_clean):
     logger.info("STEP 3: MERGING DATA")
     logger.info("=" * 70)
     
-    # 3.1 Concatenate historical + scraped (stock price data)
-    logger.info("\n→ Concatenating historical + scraped stock data...")
+    # 3.1 Upsert historical + scraped rows into the (ticker, date) keyed store
+    logger.info("\n→ Applying historical + scraped stock data to the price store...")
+    from tunvesti.store import STORE_FILE, PriceStore
     
-    dfs_to_concat = [dfs_clean['historical']]
-    if len(dfs_clean['scraped']) > 0:
-        dfs_to_concat.append(dfs_clean['scraped'])
-    
-    df_stocks = pd.concat(dfs_to_concat, ignore_index=True)
-    logger.info(f"  → Before dedup: {len(df_stocks)} rows")
-    
-    # Remove exact duplicates (same Date + Ticker)
-    df_stocks = df_stocks.drop_duplicates(subset=['date', 'ticker'], keep='last')
-    logger.info(f"  → After dedup: {len(df_stocks)} rows")
-    
-    # Sort by ticker and date
-    df_stocks = df_stocks.sort_values(['ticker', 'date']).reset_index(drop=True)
-    
-    # 3.2 Merge TUNINDEX (broadcast to all stocks by Date)
-    logger.info("\n→ Merging TUNINDEX data...")
-    if len(dfs_clean['tunindex']) > 0:
-        # Select only date and tunindex_close for merge
-        tunindex_cols = ['date', 'tunindex_close']
-        tunindex_cols += [c for c in ['tunindex_open', 'tunindex_high', 'tunindex_low', 
-                                       'tunindex_volume', 'tunindex_change_pct'] 
-                          if c in dfs_clean['tunindex'].columns]
-        
-        df_tunindex_merge = dfs_clean['tunindex'][tunindex_cols].copy()
-        df_stocks = df_stocks.merge(df_tunindex_merge, on='date', how='left')
-        logger.info(f"  → Merged; now {len(df_stocks)} rows, TUNINDEX available for {df_stocks['tunindex_close'].notna().sum()} rows")
-    else:
-        logger.info(f"  → No TUNINDEX data to merge")
+    with PriceStore(STORE_FILE) as store:
+        mode = store.load_history(dfs_clean['historical'])
+        logger.info(f"  → History {mode}; {len(store)} rows in {STORE_FILE.name}")
+        
+        if len(dfs_clean['scraped']) > 0:
+            batch = f"scraped_{dfs_clean['scraped']['date'].max():%Y-%m-%d}"
+            written = store.upsert(dfs_clean['scraped'], batch=batch)
+            logger.info(f"  → Upserted {written} scraped rows ({batch}{', already applied' if not written else ''})")
+        
+        # Ordered by ticker, date straight from the primary key
+        df_stocks = store.read()
+    logger.info(f"  → {len(df_stocks)} rows")
     
-    # 3.3 Merge Sectors on Ticker
+    # 3.2 Merge Sectors on Ticker
     logger.info("\n→ Merging sector information...")
     if len(dfs_clean['sectors']) > 0:
         # Map ticker to uppercase for consistency
@@ -352,25 +398,17 @@ def merge_data(dfs_clean):
     else:
         logger.info(f"  → No sector data to merge")
     
-    # 3.4 Add Year, then merge Dividends
-    logger.info("\n→ Merging dividend data...")
+    # 3.3 Add Year, then attach point-in-time dividends (as-of join on ex-dates)
+    logger.info("\n→ Attaching trailing-12-month dividends...")
     df_stocks['year'] = df_stocks['date'].dt.year
     
-    if len(dfs_clean['dividends']) > 0:
-        # Merge on ticker + year
-        df_divs = dfs_clean['dividends'][['ticker', 'year', 'dividend_per_share']].copy()
-        df_divs['ticker'] = df_divs['ticker'].str.upper()
-        df_divs = df_divs.drop_duplicates(subset=['ticker', 'year'])
-        
-        df_stocks = df_stocks.merge(df_divs, on=['ticker', 'year'], how='left')
-        
-        # Fill missing dividends with 0
-        df_stocks['dividend_per_share'] = df_stocks['dividend_per_share'].fillna(0)
-        
-        logger.info(f"  → Merged; {(df_stocks['dividend_per_share'] > 0).sum()} rows with non-zero dividends")
-    else:
-        logger.info(f"  → No dividend data to merge")
-        df_stocks['dividend_per_share'] = 0
+    from tunvesti.adjust import load_actions
+    from tunvesti.dividends import dividend_events, ttm_dividend
+    
+    events = dividend_events(dfs_clean['dividends'], load_actions())
+    df_stocks['dividend_ttm'] = ttm_dividend(df_stocks, events)
+    
+    logger.info(f"  → {len(events)} dividend events; {(df_stocks['dividend_ttm'] > 0).sum()} rows with a trailing dividend")
     
     logger.info(f"\n✓ Merge complete: {len(df_stocks)} rows")
     
@@ -402,22 +440,7 @@ def derive_metrics(df):
     
     logger.info(f"  → Calculated; {df['daily_return_pct'].notna().sum()} values")
     
-    # 4.2 TUNINDEX Daily Return (%)
-    logger.info("\n→ Calculating TUNINDEX_Daily_Return...")
-    if 'tunindex_close' in df.columns:
-        # Unique dates with their tunindex values
-        tunindex_returns = df[['date', 'tunindex_close']].drop_duplicates()
-        tunindex_returns = tunindex_returns.sort_values('date').reset_index(drop=True)
-        tunindex_returns['tunindex_daily_return_pct'] = tunindex_returns['tunindex_close'].pct_change() * 100
-        
-        # Merge back
-        df = df.merge(tunindex_returns[['date', 'tunindex_daily_return_pct']], on='date', how='left')
-        logger.info(f"  → Calculated; {df['tunindex_daily_return_pct'].notna().sum()} values")
-    else:
-        df['tunindex_daily_return_pct'] = np.nan
-        logger.info(f"  → TUNINDEX not available")
-    
-    # 4.3 Volatility_30d (rolling 30-day annualized volatility of daily returns)
+    # 4.2 Volatility_30d (rolling 30-day annualized volatility of daily returns)
     logger.info("\n→ Calculating Volatility_30d...")
     df['volatility_30d'] = np.nan
     
@@ -433,18 +456,14 @@ def derive_metrics(df):
     
     logger.info(f"  → Calculated; {df['volatility_30d'].notna().sum()} values")
     
-    # 4.4 Dividend_Yield (%)
+    # 4.3 Dividend_Yield (%) on the trailing-12-month dividend attached by merge_data
     logger.info("\n→ Calculating Dividend_Yield...")
-    df['dividend_yield_pct'] = 0.0
-    
-    # Only calculate where we have dividend data and close price > 0
-    valid_mask = (df['dividend_per_share'] > 0) & (df['close'] > 0)
-    df.loc[valid_mask, 'dividend_yield_pct'] = (df.loc[valid_mask, 'dividend_per_share'] / 
-                                                   df.loc[valid_mask, 'close']) * 100
+    from tunvesti.dividends import dividend_yield
     
-    logger.info(f"  → Calculated; {valid_mask.sum()} rows with dividend yield > 0")
+    df['dividend_yield_pct'] = dividend_yield(df)
+    logger.info(f"  → Calculated; {(df['dividend_yield_pct'] > 0).sum()} rows with dividend yield > 0")
     
-    # 4.5 Avg_Volume_30d
+    # 4.4 Avg_Volume_30d
     logger.info("\n→ Calculating Avg_Volume_30d...")
     df['avg_volume_30d'] = np.nan
     
@@ -511,8 +530,8 @@ def create_fact_table(df):
     # Select only relevant columns
     fact_cols = [
         'date', 'ticker', 'open', 'high', 'low', 'close', 'volume',
-        'daily_return_pct', 'volatility_30d', 'dividend_yield_pct', 'avg_volume_30d',
-        'tunindex_close', 'market_cap_m'
+        'daily_return_pct', 'volatility_30d', 'dividend_ttm', 'dividend_yield_pct', 'avg_volume_30d',
+        'market_cap_m'
     ]
     
     fact_cols = [c for c in fact_cols if c in df.columns]
@@ -522,17 +541,49 @@ def create_fact_table(df):
     # Sort by ticker and date
     fact_table = fact_table.sort_values(['ticker', 'date']).reset_index(drop=True)
     
+    # Corporate-action adjusted prices and total returns (data/corporate_actions.csv)
+    from tunvesti.adjust import refresh_adjustments
+    
+    fact_table, adjustments = refresh_adjustments(fact_table)
+    logger.info(f"  → Adjusted prices: {adjustments['actions']} corporate actions "
+                f"({adjustments['new']} new, {adjustments['mode']})")
+    
+    # Optional technical indicators
+    if FACT_INDICATORS:
+        from tunvesti.indicators import compute_indicators
+        
+        indicators = compute_indicators(fact_table, FACT_INDICATORS)
+        fact_table = fact_table.merge(indicators, on=['date', 'ticker'], how='left')
+        logger.info(f"  → Indicators added: {', '.join(indicators.columns[2:])}")
+    
     logger.info(f"  → {len(fact_table)} rows")
     
     return fact_table
 
 
+def create_market_table(df_tunindex):
+    """Create fact_market_daily: one row per date for TUNINDEX (joined to stocks on date at query time)."""
+    from tunvesti.market import build_market_table
+    
+    logger.info("\n→ Creating fact_market_daily...")
+    if len(df_tunindex) == 0:
+        logger.info(f"  → No TUNINDEX data")
+        return None
+    
+    fact_market = build_market_table(df_tunindex)
+    logger.info(f"  → {len(fact_market)} dates, {fact_market['date'].min().date()} to {fact_market['date'].max().date()}")
+    
+    return fact_market
+
+
 # ============================================================================
 # STEP 7: SAVE OUTPUTS
 # ============================================================================
 
-def save_outputs(df_merged_clean, df_enriched, fact_table, dim_date, dim_stock):
-    """Save all output files."""
+def save_outputs(df_merged_clean, df_enriched, fact_table, dim_date, dim_stock, fact_market=None):
+    """Save all output files (each through a temp file + rename, so readers never see a partial file)."""
+    from tunvesti.snapshots import write_atomic
+    
     logger.info("\n" + "=" * 70)
     logger.info("STEP 6: SAVING OUTPUT FILES")
     logger.info("=" * 70)
@@ -542,28 +593,196 @@ def save_outputs(df_merged_clean, df_enriched, fact_table, dim_date, dim_stock):
     
     # 6.1 merged_clean_data.csv
     logger.info(f"\n→ Saving {OUTPUT_FILES['merged_clean'].name}...")
-    df_merged_clean.to_csv(OUTPUT_FILES['merged_clean'], index=False)
+    write_atomic(df_merged_clean, OUTPUT_FILES['merged_clean'])
     logger.info(f"  ✓ {len(df_merged_clean)} rows saved")
     
     # 6.2 enriched_data.csv
     logger.info(f"\n→ Saving {OUTPUT_FILES['enriched'].name}...")
-    df_enriched.to_csv(OUTPUT_FILES['enriched'], index=False)
+    write_atomic(df_enriched, OUTPUT_FILES['enriched'])
     logger.info(f"  ✓ {len(df_enriched)} rows saved")
     
     # 6.3 fact_stock_daily.csv
     logger.info(f"\n→ Saving {OUTPUT_FILES['fact_table'].name}...")
-    fact_table.to_csv(OUTPUT_FILES['fact_table'], index=False)
+    write_atomic(fact_table, OUTPUT_FILES['fact_table'])
     logger.info(f"  ✓ {len(fact_table)} rows saved")
     
+    # 6.3b fact_stock_daily.parquet (columnar copy scanned by the SQL query layer)
+    try:
+        write_atomic(fact_table, OUTPUT_FILES['fact_parquet'])
+        logger.info(f"  ✓ Columnar copy saved: {OUTPUT_FILES['fact_parquet'].name}")
+    except ImportError:
+        logger.info(f"  → pyarrow not installed; skipping {OUTPUT_FILES['fact_parquet'].name}")
+    
     # 6.4 dim_date.csv
     logger.info(f"\n→ Saving {OUTPUT_FILES['dim_date'].name}...")
-    dim_date.to_csv(OUTPUT_FILES['dim_date'], index=False)
+    write_atomic(dim_date, OUTPUT_FILES['dim_date'])
     logger.info(f"  ✓ {len(dim_date)} rows saved")
     
     # 6.5 dim_stock.csv
     logger.info(f"\n→ Saving {OUTPUT_FILES['dim_stock'].name}...")
-    dim_stock.to_csv(OUTPUT_FILES['dim_stock'], index=False)
+    write_atomic(dim_stock, OUTPUT_FILES['dim_stock'])
     logger.info(f"  ✓ {len(dim_stock)} rows saved")
+    
+    # 6.6 fact_market_daily.csv
+    if fact_market is not None:
+        logger.info(f"\n→ Saving {OUTPUT_FILES['fact_market'].name}...")
+        write_atomic(fact_market, OUTPUT_FILES['fact_market'])
+        logger.info(f"  ✓ {len(fact_market)} rows saved")
+
+
+# ============================================================================
+# STEP 8: REFRESH AGGREGATE CUBE
+# ============================================================================
+
+def refresh_aggregates(fact_table, dim_stock):
+    """Update the dashboard rollups in output/cube/ (incremental when possible)."""
+    from tunvesti.cube import CUBE_DIR, refresh_cube
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 7: REFRESHING AGGREGATE CUBE")
+    logger.info("=" * 70)
+    
+    manifest = refresh_cube(fact_table, dim_stock, CUBE_DIR)
+    logger.info(f"\n→ Mode: {manifest['mode']} (watermark {manifest['watermark']}, "
+                f"{len(manifest['recomputed'])} months recomputed)")
+    for name, rows in manifest['rollups'].items():
+        logger.info(f"  ✓ {name}: {rows} rows")
+    
+    return manifest
+
+
+# ============================================================================
+# STEP 9: BUILD PANEL STORE
+# ============================================================================
+
+def build_panel_store(fact_table, dim_date, dim_stock):
+    """Rewrite the memory-mapped date x ticker panel in output/panel/."""
+    from tunvesti.panel import PANEL_DIR, build_panel
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 8: BUILDING PANEL STORE")
+    logger.info("=" * 70)
+    
+    panel = build_panel(fact_table, dim_date, dim_stock, panel_dir=PANEL_DIR)
+    coverage = panel.mask.mean() * 100
+    logger.info(f"\n→ {panel.shape[0]} dates x {panel.shape[1]} tickers, {len(panel.fields)} fields")
+    logger.info(f"  ✓ Coverage: {coverage:.1f}% of cells traded")
+    
+    return panel
+
+
+# ============================================================================
+# STEP 10: BUILD CHART PYRAMID
+# ============================================================================
+
+def build_chart_pyramid(fact_table):
+    """Rewrite the daily/weekly/monthly OHLCV rollups served as chart series in output/charts/."""
+    from tunvesti.charts import CHART_DIR, build_pyramid
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 9: BUILDING CHART PYRAMID")
+    logger.info("=" * 70)
+    
+    pyramid = build_pyramid(fact_table, CHART_DIR)
+    logger.info(f"\n→ {len(pyramid.tickers)} tickers, fields: {', '.join(pyramid.fields)}")
+    for level in pyramid.levels:
+        logger.info(f"  ✓ {level}: {pyramid.rows[level]} bars")
+    
+    return pyramid
+
+
+# ============================================================================
+# STEP 11: PUBLISH SNAPSHOT
+# ============================================================================
+
+def publish_snapshot(fact_table, dim_date, dim_stock, fact_market=None):
+    """Publish the star schema and cube as a new immutable snapshot in output/snapshots/."""
+    from tunvesti.cube import CUBE_DIR, ROLLUPS
+    from tunvesti.snapshots import SNAPSHOT_DIR, publish
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 10: PUBLISHING SNAPSHOT")
+    logger.info("=" * 70)
+    
+    rollups = {f'cube/{name}': CUBE_DIR / f'{name}.csv' for name in ROLLUPS
+               if (CUBE_DIR / f'{name}.csv').exists()}
+    tables = {
+        'fact_stock_daily': (fact_table, 'year'),
+        'dim_date': (dim_date, None),
+        'dim_stock': (dim_stock, None),
+    }
+    if fact_market is not None:
+        tables['fact_market_daily'] = (fact_market, None)
+    manifest = publish(tables, files=rollups)
+    logger.info(f"\n→ Snapshot {manifest['version']} is now current ({SNAPSHOT_DIR})")
+    logger.info(f"  ✓ {manifest['written']} partitions written, {manifest['linked']} unchanged (linked)")
+    
+    return manifest
+
+
+# ============================================================================
+# STEP 12: EXPORT POWER BI PARTITIONS
+# ============================================================================
+
+def export_powerbi(fact_table, dim_date, dim_stock, fact_market=None):
+    """Write monthly fact partitions for Power BI incremental refresh (changed ones only)."""
+    from tunvesti.powerbi import EXPORT_DIR, export_partitions
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 11: EXPORTING POWER BI PARTITIONS")
+    logger.info("=" * 70)
+    
+    manifest = export_partitions(fact_table, dim_date, dim_stock, fact_market)
+    logger.info(f"\n→ {len(manifest['partitions'])} monthly partitions in {EXPORT_DIR}")
+    logger.info(f"  ✓ {len(manifest['changed'])} files rewritten, {len(manifest['removed'])} removed")
+    
+    return manifest
+
+
+# ============================================================================
+# STEP 13: REFRESH SECTOR INDICES
+# ============================================================================
+
+def refresh_sector_indices(fact_table, dim_stock, fact_market=None):
+    """Update the sector, basket and reconstructed TUNINDEX levels in output/indices/."""
+    from tunvesti.indices import INDEX_DIR, compare_with_tunindex, refresh_indices
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 12: REFRESHING SECTOR INDICES")
+    logger.info("=" * 70)
+    
+    levels, manifest = refresh_indices(fact_table, dim_stock, INDEX_BASKETS, INDEX_DIR)
+    logger.info(f"\n→ Mode: {manifest['mode']} (watermark {manifest['watermark']})")
+    logger.info(f"  ✓ {manifest['indices']} indices, {len(levels)} levels in {INDEX_DIR}")
+    
+    check = compare_with_tunindex(levels, fact_market) if fact_market is not None else {'days': 0}
+    if check['days']:
+        logger.info(f"  ✓ Reconstructed TUNINDEX vs official: correlation {check['correlation']:.3f}, "
+                    f"tracking error {check['tracking_error_pct']:.1f}% over {check['days']} days")
+    
+    return levels
+
+
+# ============================================================================
+# STEP 14: BUILD LIQUIDITY STATE
+# ============================================================================
+
+def build_liquidity_state(fact_table):
+    """Rebuild the rolling liquidity measures state (output/state/liquidity.npz)."""
+    from tunvesti.liquidity import STATE_PATH, build_state, save_state, screen
+    
+    logger.info("\n" + "=" * 70)
+    logger.info("STEP 13: BUILDING LIQUIDITY STATE")
+    logger.info("=" * 70)
+    
+    state = build_state(fact_table)
+    save_state(state)
+    traded = screen(state, max_zero_ratio=0.0)
+    logger.info(f"\n  ✓ {len(state['tickers'])} tickers, {int(state['window'])}-session window "
+                f"ending {state['last_date']} in {STATE_PATH}")
+    logger.info(f"  ✓ {len(traded)} tickers traded every session of the window")
+    
+    return state
 
 
 # ============================================================================
@@ -571,7 +790,7 @@ def save_outputs(df_merged_clean, df_enriched, fact_table, dim_date, dim_stock):
 # ============================================================================
 
 def main():
-    """Main execution function."""
+    """Main execution function; returns True on success."""
     logger.info("\n")
     logger.info("╔" + "=" * 68 + "╗")
     logger.info("║" + " " * 15 + "TUNVESTI DATA INTEGRATION SCRIPT" + " " * 21 + "║")
@@ -583,11 +802,15 @@ def main():
         dfs = load_data()
         if dfs is None:
             logger.error("✗ Failed to load data")
-            return
+            return False
         
         # Clean
         dfs_clean = clean_data(dfs)
         
+        # Validate cleaned price rows before they are merged
+        for source in ('historical', 'scraped'):
+            dfs_clean[source] = validate_stage(dfs_clean[source], 'clean', f'clean_{source}')
+        
         # Merge
         df_merged = merge_data(dfs_clean)
         
@@ -599,6 +822,7 @@ def main():
         
         # Derive metrics
         df_enriched = derive_metrics(df_merged)
+        df_enriched = validate_stage(df_enriched, 'enriched', 'enriched')
         
         # Create dimension tables
         dim_date, dim_stock = create_dimension_tables(df_enriched)
@@ -606,8 +830,33 @@ def main():
         # Create fact table
         fact_table = create_fact_table(df_enriched)
         
+        # Market index series, kept out of the per-stock rows
+        fact_market = create_market_table(dfs_clean['tunindex'])
+        
         # Save all outputs
-        save_outputs(df_merged, df_enriched, fact_table, dim_date, dim_stock)
+        save_outputs(df_merged, df_enriched, fact_table, dim_date, dim_stock, fact_market)
+        
+        # Refresh dashboard rollups
+        refresh_aggregates(fact_table, dim_stock)
+        
+        # Wide panel for cross-sectional analytics
+        build_panel_store(fact_table, dim_date, dim_stock)
+        
+        # Multi-resolution bars for downsampled chart series
+        build_chart_pyramid(fact_table)
+        
+        # Versioned copy for consistent reads and rollback
+        publish_snapshot(fact_table, dim_date, dim_stock, fact_market)
+        
+        # Monthly partitions for Power BI incremental refresh
+        if POWERBI_PARTITIONED_EXPORT:
+            export_powerbi(fact_table, dim_date, dim_stock, fact_market)
+        
+        # Cap- and equal-weighted sector indices
+        refresh_sector_indices(fact_table, dim_stock, fact_market)
+        
+        # Rolling liquidity measures for screening
+        build_liquidity_state(fact_table)
         
         # Final summary
         logger.info("\n" + "=" * 70)
@@ -622,12 +871,15 @@ def main():
         logger.info(f"    - dim_date: {len(dim_date)} rows")
         logger.info(f"    - dim_stock: {len(dim_stock)} rows")
         logger.info(f"  • Fact table: {len(fact_table)} rows")
+        if fact_market is not None:
+            logger.info(f"  • Market table: {len(fact_market)} rows")
         logger.info(f"\nOutput files created in: {OUTPUT_DIR}")
+        return True
         
     except Exception as e:
         logger.error(f"\n✗ Error during execution: {e}", exc_info=True)
-        return
+        return False
 
 
 if __name__ == '__main__':
-    main()
+    sys.exit(0 if main() else 1)
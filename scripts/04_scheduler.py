@@ -85,6 +85,32 @@ def run_merger():
     except Exception as e:
         logger.error(f"Error running data merger: {str(e)}")
 
+def run_compaction():
+    """
+    Compact the daily scrape files into monthly segments
+    """
+    logger.info("=== COMPACTING DAILY UPDATES ===")
+    
+    try:
+        result = subprocess.run(
+            [PYTHON_EXECUTABLE, '-m', 'tunvesti', 'compact'],
+            cwd=os.path.dirname(SCRIPTS_DIR),
+            capture_output=True,
+            text=True,
+            timeout=300
+        )
+        
+        if result.returncode == 0:
+            logger.info(f"Compaction completed: {result.stdout.strip()}")
+        else:
+            logger.error(f"Compaction failed with code {result.returncode}")
+            logger.error(f"STDERR:\n{result.stderr}")
+    
+    except subprocess.TimeoutExpired:
+        logger.error("Compaction timed out")
+    except Exception as e:
+        logger.error(f"Error running compaction: {str(e)}")
+
 def daily_update_job():
     """
     Complete daily update job: scrape + merge
@@ -102,6 +128,9 @@ def daily_update_job():
     # Then run merger
     run_merger()
     
+    # Fold today's scrape file into its monthly segment
+    run_compaction()
+    
     logger.info(f"\n{'='*60}")
     logger.info(f"DAILY UPDATE JOB COMPLETED at {datetime.now()}")
     logger.info(f"{'='*60}\n")
@@ -0,0 +1,65 @@
+"""
+TUNVESTI - Shared test fixtures
+A small synthetic universe (six tickers, 160 sessions) used to check the
+incremental paths against their full recomputation.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+TICKERS = ['AB', 'BIAT', 'SFBT', 'TJARI', 'SOTUV', 'ADWYA']
+SECTORS = {'AB': 'Financials', 'BIAT': 'Financials', 'TJARI': 'Financials',
+           'SFBT': 'Consumer Goods', 'SOTUV': 'Industrials', 'ADWYA': 'Health Care'}
+N_DATES = 160
+
+
+def synthetic_fact(seed=0):
+    """
+    Fact rows for TICKERS over N_DATES sessions: moves within the BVMT price
+    limit, a few missing sessions and zero-volume days, one late listing and
+    a market cap on every row.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=N_DATES)
+    frames = []
+    for i, ticker in enumerate(TICKERS):
+        returns = np.clip(rng.normal(0, 0.015, N_DATES), -0.05, 0.05)
+        close = np.round(10 * (i + 1) * np.cumprod(1 + returns), 3)
+        spread = np.abs(rng.normal(0, 0.005, N_DATES)) * close
+        volume = rng.integers(100, 5000, N_DATES).astype(float)
+        volume[rng.random(N_DATES) < 0.15] = 0.0
+        frame = pd.DataFrame({
+            'date': dates, 'ticker': ticker,
+            'open': close, 'high': close + spread, 'low': close - spread, 'close': close,
+            'volume': volume, 'market_cap_m': close * (i + 2),
+        })
+        keep = rng.random(N_DATES) > 0.1
+        keep[-1] = True
+        if ticker == 'ADWYA':
+            keep[:40] = False
+        frames.append(frame[keep])
+    fact = pd.concat(frames, ignore_index=True).sort_values(['date', 'ticker'], ignore_index=True)
+    fact['daily_return_pct'] = fact.groupby('ticker')['close'].pct_change() * 100
+    return fact
+
+
+@pytest.fixture
+def fact():
+    return synthetic_fact()
+
+
+@pytest.fixture
+def dim_stock():
+    return pd.DataFrame({'ticker': TICKERS, 'sector': [SECTORS[t] for t in TICKERS]})
+
+
+@pytest.fixture
+def sessions(fact):
+    """Sorted trading dates of the fact rows."""
+    return np.sort(fact['date'].unique())
@@ -0,0 +1,74 @@
+"""
+TUNVESTI - Tests: streaming quote detector
+screen_quotes folded quote by quote against build_state over the full
+history, held quotes leaving the state untouched, and script 02 saving
+accepted quotes without the detector's notes.
+"""
+
+import importlib.util
+import logging
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import anomaly, config, validation
+
+
+def test_anomaly_screen_matches_build_state(fact, sessions):
+    tail = fact[fact['date'] >= sessions[-10]]
+    state = anomaly.build_state(fact[fact['date'] < sessions[-10]])
+
+    accepted, held, state = anomaly.screen_quotes(state, tail)
+    assert held.empty
+    assert len(accepted) == len(tail)
+
+    expected = anomaly.build_state(fact)
+    order = [state['index'][t] for t in expected['tickers']]
+    for name in anomaly.STATE_FIELDS:
+        if np.issubdtype(expected[name].dtype, np.datetime64):
+            np.testing.assert_array_equal(state[name][order], expected[name])
+        else:
+            np.testing.assert_allclose(state[name][order], expected[name], rtol=1e-9, atol=1e-12,
+                                       err_msg=name)
+
+
+def test_anomaly_holds_limit_breach_without_updating_state(fact):
+    state = anomaly.build_state(fact)
+    last = fact[fact['ticker'] == 'SFBT'].iloc[-1]
+    before = {name: state[name].copy() for name in anomaly.STATE_FIELDS}
+
+    quote = pd.DataFrame({'Date': [last['date'] + pd.offsets.BDay()], 'Ticker': ['SFBT'],
+                          'Close': [last['close'] * 1.5], 'Volume': [100.0]})
+    accepted, held, state = anomaly.screen_quotes(state, quote)
+    assert accepted.empty
+    assert held['anomaly'].iloc[0] == 'price_limit_exceeded'
+    for name in anomaly.STATE_FIELDS:
+        np.testing.assert_array_equal(state[name], before[name])
+
+
+def test_scraped_quotes_saved_without_anomaly_column(fact, tmp_path, monkeypatch):
+    # Importing the script must not open output/web_scraping.log or leave handlers on the root logger
+    monkeypatch.setattr(logging, 'FileHandler', lambda *args, **kwargs: logging.NullHandler())
+    monkeypatch.setattr(logging.root, 'handlers', [])
+    spec = importlib.util.spec_from_file_location('scrape_ilboursa_daily', config.SCRIPTS['scrape'])
+    script = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(script)
+    monkeypatch.setattr(anomaly, 'STATE_PATH', tmp_path / 'state.npz')
+    monkeypatch.setattr(validation, 'QUARANTINE_DIR', tmp_path / 'quarantine')
+    monkeypatch.setattr(script, 'daily_updates_dir', str(tmp_path / 'daily_updates'))
+    anomaly.save_state(anomaly.build_state(fact))
+
+    last = fact[fact['date'] == fact['date'].max()]
+    quotes = pd.DataFrame({'Date': last['date'] + pd.offsets.BDay(), 'Ticker': last['ticker'],
+                           'Close': last['close'], 'Volume': last['volume']})
+    quotes = pd.concat([quotes, pd.DataFrame({'Date': quotes['Date'].iloc[:1], 'Ticker': ['NEWCO'],
+                                              'Close': [10.0], 'Volume': [100.0]})], ignore_index=True)
+
+    accepted = script.screen_scraped_quotes(quotes)
+    saved = pd.read_csv(script.save_daily_data(accepted, 'stocks'))
+    assert saved.columns.tolist() == quotes.columns.tolist()
+    assert len(saved) == len(quotes)
+
+    flagged = pd.read_csv(next((tmp_path / 'quarantine').glob('scraped_flagged_*.csv')))
+    assert flagged['Ticker'].tolist() == ['NEWCO']
+    assert flagged['anomaly'].iloc[0] == 'new_ticker'
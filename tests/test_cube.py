@@ -0,0 +1,66 @@
+"""
+TUNVESTI - Tests: aggregate cube
+refresh_cube (months recomputed from their content hashes) against a full
+build_cube of the same fact rows.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tunvesti import cube
+
+
+@pytest.fixture
+def cube_fact(fact):
+    """Fact rows with the cube's volatility and dividend yield inputs."""
+    fact = fact.copy()
+    fact['volatility_30d'] = fact.groupby('ticker')['daily_return_pct'].transform(
+        lambda s: s.rolling(30).std() * np.sqrt(252))
+    fact['dividend_yield_pct'] = np.where(fact['ticker'].isin(['SFBT', 'BIAT']), 3.5, 0.0)
+    return fact
+
+
+def _partials(rollups):
+    """Partial aggregates of every rollup, in key order."""
+    out = {}
+    for name, keys in cube.ROLLUPS.items():
+        columns = keys + [c for c in rollups[name].columns if c in cube.PARTIALS or c == 'last_close']
+        out[name] = rollups[name][columns].sort_values(keys).reset_index(drop=True)
+    return out
+
+
+def assert_matches_full_build(cube_dir, fact, dim_stock, tmp_path):
+    full_dir = tmp_path / 'full'
+    cube.save_cube(cube.build_cube(fact, dim_stock), fact['date'].max(), len(fact), full_dir)
+    refreshed, expected = _partials(cube.load_cube(cube_dir)), _partials(cube.load_cube(full_dir))
+    for name in cube.ROLLUPS:
+        pd.testing.assert_frame_equal(refreshed[name], expected[name], check_dtype=False, obj=name)
+
+
+def test_cube_refresh_new_day(cube_fact, sessions, dim_stock, tmp_path):
+    # One ticker without a sector ends up under 'Unclassified' on both paths
+    dim_stock = dim_stock[dim_stock['ticker'] != 'SOTUV']
+    cube_dir = tmp_path / 'cube'
+
+    manifest = cube.refresh_cube(cube_fact[cube_fact['date'] < sessions[-1]], dim_stock, cube_dir)
+    assert manifest['mode'] == 'rebuild'
+    manifest = cube.refresh_cube(cube_fact, dim_stock, cube_dir)
+    assert manifest['mode'] == 'incremental'
+    assert manifest['recomputed'] == [str(sessions[-1])[:7]]
+    assert_matches_full_build(cube_dir, cube_fact, dim_stock, tmp_path)
+
+    assert cube.refresh_cube(cube_fact.sample(frac=1, random_state=0), dim_stock, cube_dir)['mode'] == 'unchanged'
+
+
+def test_cube_refresh_recomputes_edited_month(cube_fact, dim_stock, tmp_path):
+    cube_dir = tmp_path / 'cube'
+    cube.refresh_cube(cube_fact, dim_stock, cube_dir)
+
+    edited = cube_fact.copy()
+    row = edited.index[edited['date'] == pd.Timestamp('2024-02-15')][0]
+    edited.loc[row, 'volume'] += 1000
+    manifest = cube.refresh_cube(edited, dim_stock, cube_dir)
+    assert manifest['mode'] == 'incremental'
+    assert manifest['recomputed'] == ['2024-02']
+    assert_matches_full_build(cube_dir, edited, dim_stock, tmp_path)
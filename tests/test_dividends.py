@@ -0,0 +1,33 @@
+"""
+TUNVESTI - Tests: point-in-time dividend metrics
+ttm_dividend only counts dividends already detached on each row's date, and
+is the same for new days computed alone; dividend_yield on top of it.
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti.dividends import dividend_events, dividend_yield, ttm_dividend
+
+
+def test_ttm_dividend_is_point_in_time(fact):
+    dividends = pd.DataFrame({'ticker': ['SFBT', 'SFBT', 'BIAT'], 'year': [2023, 2024, 2024],
+                              'dividend_per_share': [0.5, 0.7, 1.2]})
+    events = dividend_events(dividends)
+    ttm = ttm_dividend(fact, events)
+
+    # Brute force: dividends with ex-date in (date - 365 days, date]
+    expected = [events.loc[(events['ticker'] == ticker) & (events['ex_date'] <= date)
+                           & (events['ex_date'] > date - pd.Timedelta(days=365)), 'dividend'].sum()
+                for ticker, date in zip(fact['ticker'], fact['date'])]
+    np.testing.assert_allclose(ttm, expected)
+    assert ttm[(fact['ticker'] == 'SFBT') & (fact['date'] < '2024-06-30')].max() == 0.5
+
+    # Appending days never changes earlier rows
+    tail = fact['date'] >= fact['date'].max() - pd.Timedelta(days=30)
+    np.testing.assert_allclose(ttm_dividend(fact[tail], events), ttm[tail.to_numpy()])
+
+
+def test_dividend_yield():
+    df = pd.DataFrame({'dividend_ttm': [0.5, 0.0, 0.5, 0.5], 'close': [10.0, 10.0, 0.0, np.nan]})
+    np.testing.assert_allclose(dividend_yield(df), [5.0, 0.0, 0.0, 0.0])
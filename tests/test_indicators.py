@@ -0,0 +1,33 @@
+"""
+TUNVESTI - Tests: technical indicators
+update_indicators folded day by day against compute_indicators over the
+full history.
+"""
+
+import numpy as np
+
+from tunvesti import indicators
+
+
+def test_indicators_update_matches_full(fact, sessions):
+    config = {'sma': [5, 20], 'ema': [12], 'rsi': [14], 'macd': [(12, 26, 9)],
+              'bollinger': [(20, 2.0)], 'atr': [14], 'obv': True, 'drawdown': True}
+    full = indicators.compute_indicators(fact, config).set_index(['date', 'ticker'])
+
+    state = indicators.build_state(fact[fact['date'] < sessions[-5]], config)
+    for date in sessions[-5:]:
+        values, state = indicators.update_indicators(state, fact[fact['date'] == date])
+        values = values.set_index(['date', 'ticker'])
+        expected = full.loc[values.index, values.columns]
+        np.testing.assert_allclose(values.to_numpy(), expected.to_numpy(), rtol=1e-9, equal_nan=True)
+
+
+def test_indicators_state_round_trip(fact, sessions, tmp_path):
+    state = indicators.build_state(fact[fact['date'] < sessions[-1]])
+    indicators.save_state(state, tmp_path / 'indicators.npz')
+    loaded = indicators.load_state(tmp_path / 'indicators.npz')
+
+    day = fact[fact['date'] == sessions[-1]]
+    expected, _ = indicators.update_indicators(state, day)
+    values, _ = indicators.update_indicators(loaded, day)
+    np.testing.assert_allclose(values.iloc[:, 2:].to_numpy(), expected.iloc[:, 2:].to_numpy(), equal_nan=True)
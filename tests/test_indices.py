@@ -0,0 +1,39 @@
+"""
+TUNVESTI - Tests: sector and custom index engine
+refresh_indices (incremental, unchanged and rebuild modes) against
+compute_indices over the full history.
+"""
+
+import pandas as pd
+
+from tunvesti import indices
+
+
+def _levels(levels):
+    return levels.sort_values(['date', 'index']).reset_index(drop=True)
+
+
+def test_indices_refresh_matches_full(fact, sessions, dim_stock, tmp_path):
+    baskets = {'BANKS': {'tickers': ['AB', 'BIAT', 'TJARI'], 'weighting': 'equal'}}
+
+    _, manifest = indices.refresh_indices(fact[fact['date'] <= sessions[-4]], dim_stock, baskets, tmp_path)
+    assert manifest['mode'] == 'rebuild'
+    levels, manifest = indices.refresh_indices(fact, dim_stock, baskets, tmp_path)
+    assert manifest['mode'] == 'incremental'
+
+    expected = indices.compute_indices(fact, dim_stock, baskets)
+    pd.testing.assert_frame_equal(_levels(levels), _levels(expected), rtol=1e-8)
+
+    _, manifest = indices.refresh_indices(fact.sample(frac=1, random_state=0), dim_stock, baskets, tmp_path)
+    assert manifest['mode'] == 'unchanged'
+
+
+def test_indices_refresh_rebuilds_on_history_edit(fact, dim_stock, tmp_path):
+    indices.refresh_indices(fact, dim_stock, index_dir=tmp_path)
+
+    edited = fact.copy()
+    row = edited.index[(edited['ticker'] == 'SFBT')][10]
+    edited.loc[row, 'daily_return_pct'] += 3.0
+    levels, manifest = indices.refresh_indices(edited, dim_stock, index_dir=tmp_path)
+    assert manifest['mode'] == 'rebuild'
+    pd.testing.assert_frame_equal(_levels(levels), _levels(indices.compute_indices(edited, dim_stock)), rtol=1e-8)
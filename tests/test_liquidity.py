@@ -0,0 +1,29 @@
+"""
+TUNVESTI - Tests: liquidity measures
+update_liquidity folded session by session against compute_liquidity over
+the full history.
+"""
+
+import numpy as np
+import pytest
+
+from tunvesti import liquidity
+
+
+def test_liquidity_update_matches_full(fact, sessions):
+    """Market caps are known on every row, so turnover matches too (no back-fill)."""
+    full = liquidity.compute_liquidity(fact).set_index(['date', 'ticker'])
+
+    state = liquidity.build_state(fact[fact['date'] < sessions[-5]])
+    for date in sessions[-5:]:
+        today, state = liquidity.update_liquidity(state, fact[fact['date'] == date])
+        today = today.set_index(['date', 'ticker'])
+        expected = full.loc[today.index, list(liquidity.MEASURES)]
+        np.testing.assert_allclose(today[list(liquidity.MEASURES)].to_numpy(), expected.to_numpy(),
+                                   rtol=1e-9, equal_nan=True)
+
+
+def test_liquidity_rejects_past_session(fact):
+    state = liquidity.build_state(fact)
+    with pytest.raises(ValueError):
+        liquidity.update_liquidity(state, fact[fact['date'] == fact['date'].max()])
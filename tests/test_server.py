@@ -0,0 +1,62 @@
+"""
+TUNVESTI - Tests: HTTP query API
+Sector aggregates with and without the cube, and data-version swaps while
+cursors of the previous connection are still in use.
+"""
+
+import pandas as pd
+import pytest
+
+from tunvesti import cube, server
+
+pytest.importorskip('duckdb')
+
+
+def write_outputs(output_dir, fact, dim_stock):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fact.assign(volatility_30d=25.0, dividend_yield_pct=(fact['ticker'] == 'SFBT') * 3.5).to_csv(
+        output_dir / 'fact_stock_daily.csv', index=False)
+    dim_stock.to_csv(output_dir / 'dim_stock.csv', index=False)
+
+
+def sectors(service):
+    cursor, _ = service.current()
+    try:
+        return cursor.execute(*server.route_sectors({}, cursor)).df()
+    finally:
+        service.release(cursor)
+
+
+def test_sectors_fallback_matches_cube(fact, dim_stock, tmp_path):
+    # SOTUV is missing from dim_stock: the cube files it under 'Unclassified', the fallback must too
+    dim_stock = dim_stock[dim_stock['ticker'] != 'SOTUV']
+    write_outputs(tmp_path, fact, dim_stock)
+    fallback = sectors(server.QueryService(tmp_path))
+
+    stored = pd.read_csv(tmp_path / 'fact_stock_daily.csv', parse_dates=['date'])
+    cube.refresh_cube(stored, dim_stock, tmp_path / 'cube')
+    from_cube = sectors(server.QueryService(tmp_path))
+
+    assert 'Unclassified' in set(fallback['sector'])
+    pd.testing.assert_frame_equal(fallback, from_cube, check_dtype=False)
+
+
+def test_version_swap_keeps_cursors_in_flight(fact, dim_stock, tmp_path):
+    write_outputs(tmp_path, fact, dim_stock)
+    service = server.QueryService(tmp_path)
+    old_cursor, old_version = service.current()
+
+    write_outputs(tmp_path, fact[fact['ticker'] != 'AB'], dim_stock)
+    new_cursor, new_version = service.current()
+    assert new_version != old_version
+
+    # A request that started before the swap can still run its query
+    query = 'SELECT count(DISTINCT ticker) FROM fact_stock_daily'
+    assert old_cursor.execute(query).fetchone()[0] == fact['ticker'].nunique() - 1
+    assert new_cursor.execute(query).fetchone()[0] == fact['ticker'].nunique() - 1
+
+    # The replaced connection is closed with its last cursor
+    service.release(old_cursor)
+    assert list(service._users) == [id(service._con)]
+    service.release(new_cursor)
+    assert service._users[id(service._con)][1] == 0
@@ -0,0 +1,69 @@
+"""
+TUNVESTI - Tests: keyed price store
+PriceStore against the concat + drop_duplicates + sort merge it replaces,
+update-log replay on a changed history, and no-op batches.
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti.store import COLUMNS, PriceStore
+
+
+def concat_merge(history, *batches):
+    """The merge the store replaces: concat, drop_duplicates(keep='last'), sort."""
+    merged = pd.concat([history, *batches], ignore_index=True)
+    merged = merged.drop_duplicates(subset=['date', 'ticker'], keep='last')
+    merged = merged.sort_values(['ticker', 'date']).reset_index(drop=True)
+    return merged.reindex(columns=COLUMNS).astype({c: np.float64 for c in COLUMNS[2:]})
+
+
+def scraped_batch(fact, date):
+    """Rows of one scraped day: existing keys with new prices plus a new ticker."""
+    day = fact[fact['date'] == date][['date', 'ticker', 'close', 'volume']].copy()
+    day['close'] = day['close'] * 1.01
+    new = pd.DataFrame({'date': [date], 'ticker': ['NEWCO'], 'close': [5.0], 'volume': [10.0]})
+    return pd.concat([day, new], ignore_index=True)
+
+
+def test_store_matches_concat_merge(fact, sessions, tmp_path):
+    history = fact.drop(columns='daily_return_pct')
+    first, second = scraped_batch(fact, sessions[-2]), scraped_batch(fact, sessions[-1])
+
+    with PriceStore(tmp_path / 'prices.sqlite') as store:
+        assert store.load_history(history) == 'rebuilt'
+        store.upsert(first, batch='day1.csv')
+        store.upsert(second, batch='day2.csv')
+        pd.testing.assert_frame_equal(store.read(), concat_merge(history, first, second))
+
+
+def test_store_changed_history_replays_updates(fact, sessions, tmp_path):
+    history = fact.drop(columns='daily_return_pct')
+    batch = scraped_batch(fact, sessions[-1])
+
+    with PriceStore(tmp_path / 'prices.sqlite') as store:
+        store.load_history(history)
+        store.upsert(batch, batch='day.csv')
+
+        corrected = history.copy()
+        corrected.loc[corrected.index[:50], 'close'] *= 2
+        corrected = corrected.drop(index=corrected.index[60:70])
+        assert store.load_history(corrected) == 'rebuilt'
+        assert store.update_count() == len(batch)
+        pd.testing.assert_frame_equal(store.read(), concat_merge(corrected, batch))
+
+
+def test_store_identical_batch_is_noop(fact, sessions, tmp_path):
+    history = fact.drop(columns='daily_return_pct')
+    batch = scraped_batch(fact, sessions[-1])
+
+    with PriceStore(tmp_path / 'prices.sqlite') as store:
+        store.load_history(history)
+        assert store.upsert(batch, batch='day.csv') == len(batch)
+        before = store.read()
+
+        assert store.load_history(history) == 'unchanged'
+        assert store.upsert(batch, batch='day.csv') == 0
+        assert store.update_count() == len(batch)
+        assert len(store.batches()) == 1
+        pd.testing.assert_frame_equal(store.read(), before)
@@ -0,0 +1,60 @@
+"""
+TUNVESTI - Tests: data-quality validation gate
+Bad rows are quarantined, and the quarantined share only aborts the run for
+stages of at least GATE_MIN_ROWS rows: one bad quote in a day's scraped
+batch must not block the whole pipeline.
+"""
+
+import importlib.util
+
+import pandas as pd
+import pytest
+
+from tunvesti import config, validation
+
+
+def load_merge_script():
+    path = config.SCRIPTS['merge']
+    spec = importlib.util.spec_from_file_location('merge_and_enrich', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def scraped_day(fact):
+    """Ninety quotes of one session (a BVMT daily batch), one with a close above its high."""
+    day = fact[fact['date'] == fact['date'].max()].drop(columns='daily_return_pct')
+    day = pd.concat([day] * 15, ignore_index=True).assign(ticker=lambda d: d['ticker'] + d.index.astype(str))
+    day.loc[0, 'close'] = day.loc[0, 'high'] * 1.1
+    return day
+
+
+def test_gate_exceeded():
+    assert not validation.gate_exceeded(1, 90, max_pct=1.0)
+    assert not validation.gate_exceeded(10, 2000, max_pct=1.0)
+    assert validation.gate_exceeded(30, 2000, max_pct=1.0)
+    assert validation.gate_exceeded(2, 90, max_pct=1.0, min_rows=50)
+
+
+def test_one_bad_row_in_small_batch_is_quarantined(fact, tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, 'QUARANTINE_DIR', tmp_path)
+    batch = scraped_day(fact)
+    assert len(batch) < validation.GATE_MIN_ROWS
+
+    passed = load_merge_script().validate_stage(batch, 'clean', 'clean_scraped')
+
+    assert len(passed) == len(batch) - 1
+    quarantine = pd.read_csv(tmp_path / 'clean_scraped.csv')
+    assert quarantine['ticker'].tolist() == [batch.loc[0, 'ticker']]
+    assert quarantine['failed_rules'].iloc[0] == 'close_out_of_range'
+
+
+def test_gate_fails_large_stage(fact, tmp_path, monkeypatch):
+    monkeypatch.setattr(validation, 'QUARANTINE_DIR', tmp_path)
+    history = fact.drop(columns='daily_return_pct')
+    history = pd.concat([history, history.assign(ticker=history['ticker'] + 'B')], ignore_index=True)
+    assert len(history) >= validation.GATE_MIN_ROWS
+    history.loc[:len(history) // 50, 'close'] = -1.0
+
+    with pytest.raises(ValueError, match='Validation gate failed'):
+        load_merge_script().validate_stage(history, 'clean', 'clean_historical')
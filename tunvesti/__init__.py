@@ -0,0 +1,9 @@
+"""
+TUNVESTI - Python package
+Shared configuration, command-line interface and analytics modules built on
+top of the ETL pipeline outputs.
+
+Keep this module free of heavy imports: it is loaded by every CLI invocation.
+"""
+
+__version__ = '0.1.0'
@@ -0,0 +1,7 @@
+"""Allow `python -m tunvesti`."""
+
+import sys
+
+from tunvesti.cli import main
+
+sys.exit(main())
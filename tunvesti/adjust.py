@@ -0,0 +1,205 @@
+"""
+TUNVESTI - Corporate-action adjustment
+Adjusted close and total-return series from a corporate-actions table, so
+ex-dividend drops, splits and free-share distributions (actions gratuites)
+do not show up as price moves.
+
+Corporate actions (data/corporate_actions.csv):
+    ticker, ex_date, action, value
+    action = cash_dividend   value = dividend per share (TND)
+             split           value = new shares per old share (2 for a 2:1 split)
+             bonus           value = free shares per share held (0.1 for 1 new per 10)
+
+Each action gets a multiplier m (the price ratio it explains): (P - D) / P for
+a dividend with previous close P, 1 / value for a split, 1 / (1 + value) for
+a bonus issue. The sparse factor table keeps, per ticker and ex-date, the
+forward cumulative factor F = prod(1 / m) of every action up to that date:
+
+    total_return_pct(t) = close(t) F(t) / (close(t-1) F(t-1)) - 1
+    adj_close(t)        = close(t) F(t) / F(last)
+
+F for a date never changes when later actions arrive, so returns of existing
+history stay valid; new actions only need their own multiplier (kept in
+output/adjustments/factors.csv) and new trading days just carry F forward.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+ACTIONS_FILE = config.CORPORATE_ACTIONS
+ADJUSTMENTS_DIR = config.OUTPUT_DIR / 'adjustments'
+FACTORS_FILE = 'factors.csv'
+ACTION_TYPES = ('cash_dividend', 'split', 'bonus')
+ACTION_KEY = ['ticker', 'ex_date', 'action', 'value']
+# Moves beyond the BVMT daily limit are only possible around corporate actions
+SUSPECT_MOVE_PCT = 6.5
+
+
+# ============================================================================
+# ACTIONS AND FACTORS
+# ============================================================================
+
+def load_actions(path=None):
+    """Read and normalize the corporate-actions table (empty if the file is missing)."""
+    path = path or ACTIONS_FILE
+    if not path.exists():
+        return _typed(pd.DataFrame(columns=ACTION_KEY))
+    actions = pd.read_csv(path, dtype={'ticker': str, 'action': str})
+    actions.columns = actions.columns.str.lower()
+    actions = _typed(actions)
+    actions['ticker'] = actions['ticker'].str.upper().str.strip()
+    actions['action'] = actions['action'].str.lower().str.strip()
+
+    invalid = actions['ex_date'].isna() | actions['value'].isna() | ~actions['action'].isin(ACTION_TYPES)
+    if invalid.any():
+        logger.warning(f"Ignoring {invalid.sum()} invalid corporate action rows")
+    return actions.loc[~invalid, ACTION_KEY].drop_duplicates().reset_index(drop=True)
+
+
+def _typed(df):
+    """Coerce the action key columns (also makes empty tables mergeable)."""
+    df['ticker'] = df['ticker'].astype(object)
+    df['ex_date'] = pd.to_datetime(df['ex_date'], errors='coerce')
+    df['action'] = df['action'].astype(object)
+    df['value'] = pd.to_numeric(df['value'], errors='coerce').astype(np.float64)
+    return df
+
+
+def _multipliers(actions, fact):
+    """Price multiplier of each action (needs the close before the ex-date for dividends)."""
+    actions = actions.sort_values('ex_date')
+    closes = fact[['ticker', 'date', 'close']].dropna().assign(date=lambda d: pd.to_datetime(d['date']))
+    previous = pd.merge_asof(actions, closes.sort_values('date'), left_on='ex_date', right_on='date',
+                             by='ticker', allow_exact_matches=False, direction='backward')['close'].to_numpy()
+
+    value = actions['value'].to_numpy(dtype=np.float64)
+    action = actions['action'].to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        multiplier = np.select(
+            [action == 'cash_dividend', action == 'split', action == 'bonus'],
+            [(previous - value) / previous, 1 / value, 1 / (1 + value)],
+            default=np.nan)
+
+    unusable = ~np.isfinite(multiplier) | (multiplier <= 0)
+    if unusable.any():
+        logger.warning(f"{unusable.sum()} corporate actions have no usable factor "
+                       "(no prior close or dividend >= price); they are ignored")
+    return actions.assign(multiplier=np.where(unusable, 1.0, multiplier))
+
+
+def compute_factors(actions, fact, previous=None):
+    """
+    Sparse cumulative factor table, one row per (ticker, ex-date, action).
+
+    Multipliers already present in previous (same action key) are reused, so
+    only new actions look up prices.
+
+    Returns:
+    pd.DataFrame: ticker, ex_date, action, value, multiplier,
+                  price_factor (splits/bonus only), total_factor (all actions)
+    """
+    if previous is not None and len(previous):
+        known = actions.merge(previous[ACTION_KEY + ['multiplier']], on=ACTION_KEY, how='left')
+        new = known['multiplier'].isna()
+        factors = pd.concat([known[~new], _multipliers(actions[new.to_numpy()], fact)], ignore_index=True)
+    else:
+        factors = _multipliers(actions, fact)
+
+    factors = factors.sort_values(['ticker', 'ex_date']).reset_index(drop=True)
+    # Several actions on one ex-date compound; F at the ex-date includes all of them
+    structural = np.where(factors['action'] == 'cash_dividend', 1.0, factors['multiplier'])
+    factors['price_factor'] = (1 / pd.Series(structural)).groupby(factors['ticker']).cumprod().to_numpy()
+    factors['total_factor'] = (1 / factors['multiplier']).groupby(factors['ticker']).cumprod().to_numpy()
+    return factors
+
+
+def apply_factors(fact, factors):
+    """
+    Add adj_close, split_adj_close and total_return_pct to the fact table.
+
+    The factor in force on each row is found with one merge_asof over the
+    sparse table (no per-ticker loop); tickers without actions get F = 1.
+    """
+    df = fact.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    ordered = df[['date', 'ticker', 'close']].sort_values(['ticker', 'date'])
+
+    if len(factors):
+        sparse = (factors.drop_duplicates(['ticker', 'ex_date'], keep='last')
+                  [['ticker', 'ex_date', 'price_factor', 'total_factor']].sort_values('ex_date'))
+        by_date = ordered.assign(row=ordered.index).sort_values('date')
+        in_force = pd.merge_asof(by_date, sparse, left_on='date', right_on='ex_date',
+                                 by='ticker', direction='backward').set_index('row')
+        price_factor = in_force['price_factor'].fillna(1.0).reindex(ordered.index)
+        total_factor = in_force['total_factor'].fillna(1.0).reindex(ordered.index)
+    else:
+        price_factor = total_factor = pd.Series(1.0, index=ordered.index)
+
+    tickers = ordered['ticker']
+    total_value = ordered['close'] * total_factor
+    df['adj_close'] = total_value / total_factor.groupby(tickers).transform('last')
+    df['split_adj_close'] = ordered['close'] * price_factor / price_factor.groupby(tickers).transform('last')
+    df['total_return_pct'] = (total_value / total_value.groupby(tickers).shift(1) - 1) * 100
+    return df
+
+
+# ============================================================================
+# PERSISTENCE / INCREMENTAL REFRESH
+# ============================================================================
+
+def load_factors(adjustments_dir=None):
+    """Saved factor table, or None."""
+    path = (adjustments_dir or ADJUSTMENTS_DIR) / FACTORS_FILE
+    if not path.exists():
+        return None
+    return _typed(pd.read_csv(path, dtype={'ticker': str, 'action': str}))
+
+
+def save_factors(factors, adjustments_dir=None):
+    adjustments_dir = adjustments_dir or ADJUSTMENTS_DIR
+    adjustments_dir.mkdir(parents=True, exist_ok=True)
+    factors.to_csv(adjustments_dir / FACTORS_FILE, index=False, float_format='%.12g')
+
+
+def refresh_adjustments(fact, actions_path=None, adjustments_dir=None):
+    """
+    Update the factor table from the actions file and adjust the fact table.
+
+    Returns:
+    tuple: (adjusted fact DataFrame, summary dict with actions / new / mode)
+    """
+    actions = load_actions(actions_path)
+    previous = load_factors(adjustments_dir)
+    factors = compute_factors(actions, fact, previous)
+
+    known = 0 if previous is None else len(actions.merge(previous[ACTION_KEY], on=ACTION_KEY))
+    new = len(actions) - known
+    if previous is None:
+        mode = 'rebuild'
+    elif not new and len(previous) == len(factors):
+        mode = 'unchanged'
+    else:
+        mode = 'incremental'
+    if mode != 'unchanged':
+        save_factors(factors, adjustments_dir)
+
+    return apply_factors(fact, factors), {'actions': len(actions), 'new': new, 'mode': mode}
+
+
+def suspect_moves(fact, threshold_pct=SUSPECT_MOVE_PCT, factors=None):
+    """
+    Daily moves larger than the BVMT price limit that no recorded action explains.
+
+    These are almost always unrecorded splits, bonus issues or data errors,
+    and are the rows to check when filling data/corporate_actions.csv.
+    """
+    df = fact if factors is None else apply_factors(fact, factors)
+    column = 'total_return_pct' if 'total_return_pct' in df.columns else 'daily_return_pct'
+    moves = df.loc[df[column].abs() > threshold_pct, ['date', 'ticker', 'close', column, 'volume']]
+    return moves.sort_values(column).reset_index(drop=True)
@@ -0,0 +1,245 @@
+"""
+TUNVESTI - Cached analysis layer for the exploration notebook
+Loads the star schema from a binary cache keyed on the pipeline's data
+version, and memoizes the notebook's expensive analyses on disk, so
+re-running the notebook on unchanged outputs skips the CSV parsing and the
+full-table groupbys.
+
+Layout (output/cache/analysis/<data version>/):
+    tables/fact_stock_daily.pkl         pickled copies of the pipeline outputs
+    <function>-<argument hash>.pkl      memoized results
+
+The data version is tunvesti.query.data_version() (mtime and size of every
+output table and cube file), so a new run of script 03 moves the cache to a
+new directory and the previous one is deleted. Bump ANALYSIS_VERSION when
+the definition of a memoized function changes.
+
+Usage:
+    from tunvesti.analysis import load_tables, risk_return, sector_performance
+    fact, dim_date, dim_stock = load_tables()
+    risk = risk_return()
+    sectors = sector_performance()
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import pickle
+import shutil
+
+import pandas as pd
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = 'cache/analysis'
+TABLE_DIR_NAME = 'tables'
+# Bump when a memoized function's definition changes
+ANALYSIS_VERSION = 1
+CORRELATION_COLUMNS = ('daily_return_pct', 'volatility_30d', 'volume', 'dividend_yield_pct')
+
+# Tables loaded in this process: (version directory, name) -> DataFrame
+_loaded = {}
+
+
+# ============================================================================
+# CACHE DIRECTORY
+# ============================================================================
+
+def cache_dir(output_dir=None):
+    """
+    Cache directory for the outputs currently on disk, created on first use.
+
+    Directories of older data versions are removed when a new one is created.
+    """
+    from tunvesti.query import data_version
+
+    output_dir = output_dir or config.OUTPUT_DIR
+    root = output_dir / CACHE_DIR_NAME
+    path = root / f'{data_version(output_dir)}-v{ANALYSIS_VERSION}'
+    if not path.exists():
+        if root.exists():
+            for stale in root.iterdir():
+                if stale.is_dir():
+                    shutil.rmtree(stale, ignore_errors=True)
+        (path / TABLE_DIR_NAME).mkdir(parents=True)
+    return path
+
+
+def clear_cache(output_dir=None):
+    """Delete every cached table and result."""
+    _loaded.clear()
+    shutil.rmtree((output_dir or config.OUTPUT_DIR) / CACHE_DIR_NAME, ignore_errors=True)
+
+
+def _dump(obj, path):
+    tmp = path.with_name(f'.{path.name}.tmp')
+    with open(tmp, 'wb') as f:
+        pickle.dump(obj, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+
+def _load(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+# ============================================================================
+# TABLES
+# ============================================================================
+
+def load_table(name, output_dir=None):
+    """
+    One pipeline output (e.g. 'fact_stock_daily') with parsed dates.
+
+    The first load of a data version reads the Parquet/CSV output and stores
+    a pickled copy; later loads (and later notebook sessions) read the copy.
+
+    Raises:
+    FileNotFoundError: If the pipeline has not produced the table
+    """
+    from tunvesti.query import table_source
+
+    version_dir = cache_dir(output_dir)
+    if (version_dir, name) in _loaded:
+        return _loaded[version_dir, name]
+
+    path = version_dir / TABLE_DIR_NAME / f'{name}.pkl'
+    if path.exists():
+        df = _load(path)
+    else:
+        source = table_source(name, output_dir or config.OUTPUT_DIR)
+        if source is None or source.is_dir():
+            raise FileNotFoundError(f"{name} not found in {output_dir or config.OUTPUT_DIR}: run script 03 first")
+        df = pd.read_parquet(source) if source.suffix == '.parquet' else pd.read_csv(source)
+        if 'date' in df.columns:
+            df['date'] = pd.to_datetime(df['date'])
+        _dump(df, path)
+        logger.info(f"Cached {name}: {len(df):,} rows from {source.name}")
+    _loaded[version_dir, name] = df
+    return df
+
+
+def load_tables(output_dir=None):
+    """fact_stock_daily, dim_date and dim_stock, as load_table() returns them."""
+    return tuple(load_table(name, output_dir) for name in ('fact_stock_daily', 'dim_date', 'dim_stock'))
+
+
+# ============================================================================
+# MEMOIZATION
+# ============================================================================
+
+def memoize(func):
+    """
+    Cache a function's result on disk for the current data version.
+
+    The key is the function name and the repr of its arguments, so arguments
+    must have a stable repr (numbers, strings, tuples). Pass refresh=True to
+    recompute and overwrite the cached result.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, output_dir=None, refresh=False, **kwargs):
+        key = hashlib.sha1(repr((args, sorted(kwargs.items()))).encode()).hexdigest()[:16]
+        path = cache_dir(output_dir) / f'{func.__name__}-{key}.pkl'
+        if path.exists() and not refresh:
+            return _load(path)
+        result = func(*args, output_dir=output_dir, **kwargs)
+        _dump(result, path)
+        return result
+    return wrapper
+
+
+# ============================================================================
+# ANALYSES
+# ============================================================================
+
+@memoize
+def volatility_by_stock(days=30, output_dir=None):
+    """Average volatility_30d per ticker over the last `days` calendar days, highest first."""
+    fact = load_table('fact_stock_daily', output_dir)
+    recent = fact[fact['date'] >= fact['date'].max() - pd.Timedelta(days=days)]
+    return recent.groupby('ticker')['volatility_30d'].mean().dropna().sort_values(ascending=False)
+
+
+@memoize
+def dividend_leaders(output_dir=None):
+    """Highest dividend_yield_pct per dividend-paying ticker, highest first."""
+    fact = load_table('fact_stock_daily', output_dir)
+    paying = fact[fact['dividend_yield_pct'] > 0]
+    return paying.groupby('ticker')['dividend_yield_pct'].max().sort_values(ascending=False)
+
+
+@memoize
+def risk_return(output_dir=None):
+    """Mean daily return, 30-day volatility and volume per ticker (complete rows only)."""
+    fact = load_table('fact_stock_daily', output_dir)
+    return fact.groupby('ticker').agg({
+        'daily_return_pct': 'mean',
+        'volatility_30d': 'mean',
+        'volume': 'mean'
+    }).dropna()
+
+
+@memoize
+def metric_correlations(columns=CORRELATION_COLUMNS, output_dir=None):
+    """
+    Pearson correlations between fact metrics, over rows where all are known.
+
+    Returns:
+    tuple: (correlation matrix, p-value matrix) as DataFrames
+    """
+    import numpy as np
+    from scipy import stats
+
+    fact = load_table('fact_stock_daily', output_dir)
+    data = fact[list(columns)].dropna()
+    pvalues = pd.DataFrame(np.zeros((len(columns), len(columns))), columns=list(columns), index=list(columns))
+    for i, col1 in enumerate(columns):
+        for j, col2 in enumerate(columns):
+            if i != j:
+                pvalues.iloc[i, j] = stats.pearsonr(data[col1], data[col2])[1]
+    return data.corr(), pvalues
+
+
+@memoize
+def sector_performance(output_dir=None):
+    """
+    Return, volatility, volume and stock count per sector.
+
+    Returns:
+    tuple: (DataFrame by sector, best average return first,
+            sorted list of tickers left out because they have no sector)
+    """
+    fact = load_table('fact_stock_daily', output_dir)
+    dim_stock = load_table('dim_stock', output_dir)
+    df = fact.merge(dim_stock[['ticker', 'sector']], on='ticker', how='left')
+
+    performance = df[df['sector'].notna()].groupby('sector').agg({
+        'daily_return_pct': ['mean', 'std'],
+        'volatility_30d': 'mean',
+        'volume': 'mean',
+        'ticker': 'nunique'
+    }).round(2)
+    performance.columns = ['Avg Return %', 'Return Std Dev', 'Avg Volatility %', 'Avg Volume', 'Stock Count']
+    unclassified = sorted(df.loc[df['sector'].isna(), 'ticker'].unique())
+    return performance.sort_values('Avg Return %', ascending=False), unclassified
+
+
+@memoize
+def market_vs_stocks(output_dir=None):
+    """
+    TUNINDEX level and return next to the average stock return, per date.
+
+    Returns:
+    pd.DataFrame: Indexed by date - tunindex_close, daily_return_pct (mean
+                  over stocks), tunindex_return; dates missing any are dropped
+    """
+    fact = load_table('fact_stock_daily', output_dir)
+    market = load_table(config.FACT_MARKET.stem, output_dir).set_index('date')
+    stats = fact.groupby('date')['daily_return_pct'].mean().to_frame()
+    stats.insert(0, 'tunindex_close', market['tunindex_close'])
+    stats = stats.dropna()
+    stats['tunindex_return'] = stats['tunindex_close'].pct_change() * 100
+    return stats.dropna()
@@ -0,0 +1,259 @@
+"""
+TUNVESTI - Streaming anomaly detector for scraped quotes
+Checks each new quote against per-ticker rolling state before it is saved:
+last close, exponentially weighted mean/variance of log returns and of log
+volume. Every check and state update is O(1) per quote (a dict lookup and a
+few arithmetic operations), and the state is a handful of NumPy arrays kept
+in a compressed .npz, so the scraper never reloads history.
+
+Verdicts:
+    hold   the quote is not saved (bad OHLC, move beyond the BVMT price
+           limit, out-of-order date); it does not update the state
+    flag   the quote is saved but reported (return or volume outlier,
+           zero volume, first sighting of a ticker)
+
+Usage:
+    from tunvesti.anomaly import build_state, screen_quotes, save_state
+    state = build_state(fact)                         # once, from history
+    accepted, held, state = screen_quotes(state, scraped_df)
+    save_state(state, STATE_PATH)
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+STATE_PATH = config.OUTPUT_DIR / 'state' / 'quote_detector.npz'
+HALFLIFE = 20
+# BVMT daily variation threshold (+/- 6.09%) plus a margin for tick rounding
+PRICE_LIMIT_PCT = 6.5
+RETURN_Z = 6.0
+VOLUME_Z = 4.0
+MIN_OBSERVATIONS = 20
+
+STATE_FIELDS = {
+    'last_date': 'datetime64[D]',
+    'last_close': np.float64,
+    'prev_close': np.float64,       # close before last_date (same-day re-scrapes compare to it)
+    'ret_mean': np.float64,         # EWMA of log returns
+    'ret_var': np.float64,
+    'n_returns': np.int64,
+    'logvol_mean': np.float64,      # EWMA of log(volume) on days with volume
+    'logvol_var': np.float64,
+    'n_volumes': np.int64,
+}
+
+
+# ============================================================================
+# STATE
+# ============================================================================
+
+def _alpha(halflife):
+    return 1 - 0.5 ** (1 / halflife)
+
+
+def empty_state(halflife=HALFLIFE):
+    state = {name: np.empty(0, dtype=dtype) for name, dtype in STATE_FIELDS.items()}
+    state['tickers'] = np.empty(0, dtype=object)
+    state['halflife'] = np.float64(halflife)
+    state['index'] = {}
+    return state
+
+
+def _ewm_last(values, keys, alpha):
+    """Last EWMA mean and (bias) variance per group, pandas adjust=False recursion."""
+    grouped = values.groupby(keys)
+    mean = grouped.transform(lambda s: s.ewm(alpha=alpha, adjust=False, ignore_na=True).mean())
+    var = grouped.transform(lambda s: s.ewm(alpha=alpha, adjust=False, ignore_na=True).var(bias=True))
+    return mean.groupby(keys).last(), var.groupby(keys).last()
+
+
+def build_state(fact, halflife=HALFLIFE):
+    """
+    Seed the detector from the fact table (one vectorized pass over history).
+    """
+    alpha = _alpha(halflife)
+    df = fact[['date', 'ticker', 'close', 'volume']].dropna(subset=['close'])
+    df = df.assign(date=pd.to_datetime(df['date'])).sort_values(['ticker', 'date'])
+    keys = df['ticker']
+
+    log_ret = np.log(df['close']).groupby(keys).diff()
+    log_vol = np.log(df['volume'].where(df['volume'] > 0))
+    ret_mean, ret_var = _ewm_last(log_ret, keys, alpha)
+    vol_mean, vol_var = _ewm_last(log_vol, keys, alpha)
+
+    last = df.groupby('ticker').tail(1).set_index('ticker')
+    prev = df.groupby('ticker')['close'].nth(-2)
+    prev = pd.Series(prev.to_numpy(), index=df.loc[prev.index, 'ticker'])
+    tickers = last.index
+
+    state = empty_state(halflife)
+    state.update({
+        'tickers': tickers.to_numpy(dtype=object),
+        'last_date': last['date'].to_numpy().astype('datetime64[D]'),
+        'last_close': last['close'].to_numpy(dtype=np.float64),
+        'prev_close': prev.reindex(tickers).to_numpy(dtype=np.float64),
+        'ret_mean': ret_mean.reindex(tickers).fillna(0.0).to_numpy(),
+        'ret_var': ret_var.reindex(tickers).fillna(0.0).to_numpy(),
+        'n_returns': log_ret.groupby(keys).count().reindex(tickers).to_numpy(dtype=np.int64),
+        'logvol_mean': vol_mean.reindex(tickers).fillna(0.0).to_numpy(),
+        'logvol_var': vol_var.reindex(tickers).fillna(0.0).to_numpy(),
+        'n_volumes': log_vol.groupby(keys).count().reindex(tickers).to_numpy(dtype=np.int64),
+        'index': {ticker: i for i, ticker in enumerate(tickers)},
+    })
+    return state
+
+
+def _add_ticker(state, ticker):
+    """Append a slot for an unseen ticker (rare; arrays are copied)."""
+    for name, dtype in STATE_FIELDS.items():
+        fill = {'last_date': np.datetime64('NaT'), 'last_close': np.nan, 'prev_close': np.nan}.get(name, 0)
+        state[name] = np.append(state[name], np.array([fill], dtype=dtype))
+    state['tickers'] = np.append(state['tickers'], np.array([ticker], dtype=object))
+    state['index'][ticker] = len(state['tickers']) - 1
+    return state['index'][ticker]
+
+
+def save_state(state, path=None):
+    """Persist the state as a compressed .npz."""
+    path = path or STATE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {name: state[name] for name in STATE_FIELDS}
+    np.savez_compressed(path, tickers=state['tickers'].astype(str), halflife=state['halflife'], **arrays)
+
+
+def load_state(path=None):
+    """Load a state written by save_state, or None if there is none."""
+    path = path or STATE_PATH
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        state = {name: data[name] for name in STATE_FIELDS}
+        state['tickers'] = data['tickers'].astype(object)
+        state['halflife'] = data['halflife'][()]
+    state['index'] = {ticker: i for i, ticker in enumerate(state['tickers'])}
+    return state
+
+
+# ============================================================================
+# PER-QUOTE CHECK AND UPDATE (O(1))
+# ============================================================================
+
+def check_quote(state, ticker, date, close, high=None, low=None, volume=None):
+    """
+    Classify one quote against the ticker's state.
+
+    Returns:
+    tuple: (verdict 'ok' / 'flag' / 'hold', list of reasons)
+    """
+    reasons, hold = [], False
+    if not close or close <= 0 or not np.isfinite(close):
+        return 'hold', ['non_positive_close']
+    if high is not None and low is not None and (high < low or not low <= close <= high):
+        reasons.append('close_outside_high_low')
+        hold = True
+
+    i = state['index'].get(ticker)
+    if i is None or np.isnat(state['last_date'][i]):
+        reasons.append('new_ticker')
+        return ('hold' if hold else 'flag'), reasons
+
+    date = np.datetime64(date, 'D')
+    last_date = state['last_date'][i]
+    if date < last_date:
+        return 'hold', reasons + ['out_of_order_date']
+    reference = state['prev_close'][i] if date == last_date else state['last_close'][i]
+
+    if np.isfinite(reference) and reference > 0:
+        sessions = max(1, int(np.busday_count(last_date, date))) if date > last_date else 1
+        limit = (1 + PRICE_LIMIT_PCT / 100) ** sessions
+        ratio = close / reference
+        if ratio > limit or ratio < 1 / limit:
+            reasons.append('price_limit_exceeded')
+            hold = True
+        elif state['n_returns'][i] >= MIN_OBSERVATIONS and state['ret_var'][i] > 0:
+            z = (np.log(ratio) - state['ret_mean'][i]) / np.sqrt(state['ret_var'][i] * sessions)
+            if abs(z) > RETURN_Z:
+                reasons.append('return_outlier')
+
+    if volume is None or not np.isfinite(volume) or volume <= 0:
+        reasons.append('zero_volume')
+    elif state['n_volumes'][i] >= MIN_OBSERVATIONS and state['logvol_var'][i] > 0:
+        z = (np.log(volume) - state['logvol_mean'][i]) / np.sqrt(state['logvol_var'][i])
+        if z > VOLUME_Z:
+            reasons.append('volume_spike')
+
+    if hold:
+        return 'hold', reasons
+    return ('flag' if reasons else 'ok'), reasons
+
+
+def _ewm_update(state, i, prefix, count, x, alpha):
+    """One step of the adjust=False EWMA mean/variance (the first value seeds the mean)."""
+    mean, var = f'{prefix}_mean', f'{prefix}_var'
+    if state[count][i] == 0:
+        state[mean][i], state[var][i] = x, 0.0
+    else:
+        diff = x - state[mean][i]
+        state[mean][i] += alpha * diff
+        state[var][i] = (1 - alpha) * (state[var][i] + alpha * diff * diff)
+    state[count][i] += 1
+
+
+def observe_quote(state, ticker, date, close, volume=None):
+    """Fold an accepted quote into the ticker's state (EWMA recursions)."""
+    i = state['index'].get(ticker)
+    if i is None:
+        i = _add_ticker(state, ticker)
+    date = np.datetime64(date, 'D')
+    alpha = _alpha(state['halflife'])
+
+    if date == state['last_date'][i]:
+        # Same-day re-scrape: replace the close, statistics already include the day
+        state['last_close'][i] = close
+        return
+
+    if not np.isnat(state['last_date'][i]):
+        _ewm_update(state, i, 'ret', 'n_returns', np.log(close / state['last_close'][i]), alpha)
+    if volume is not None and np.isfinite(volume) and volume > 0:
+        _ewm_update(state, i, 'logvol', 'n_volumes', np.log(volume), alpha)
+
+    state['prev_close'][i] = state['last_close'][i]
+    state['last_date'][i], state['last_close'][i] = date, close
+
+
+def screen_quotes(state, quotes):
+    """
+    Check and fold a batch of scraped quotes, record by record.
+
+    Parameters:
+    state (dict): Detector state (updated in place)
+    quotes (pd.DataFrame): Scraper output (Date, Ticker, Close, High, Low, Volume; any case)
+
+    Returns:
+    tuple: (accepted DataFrame with an 'anomaly' column, held DataFrame with
+            'anomaly', state)
+    """
+    if quotes.empty:
+        return quotes, quotes, state
+    columns = {col.lower(): col for col in quotes.columns}
+
+    def column(name):
+        return quotes[columns[name]].to_numpy() if name in columns else [None] * len(quotes)
+
+    verdicts, notes = [], []
+    for ticker, date, close, high, low, volume in zip(column('ticker'), column('date'), column('close'),
+                                                       column('high'), column('low'), column('volume')):
+        ticker = str(ticker).upper()
+        high, low, volume = (None if value is None or pd.isna(value) else float(value)
+                             for value in (high, low, volume))
+        verdict, reasons = check_quote(state, ticker, date, float(close), high, low, volume)
+        if verdict != 'hold':
+            observe_quote(state, ticker, date, float(close), volume)
+        verdicts.append(verdict)
+        notes.append(','.join(reasons))
+
+    verdicts = np.array(verdicts)
+    marked = quotes.assign(anomaly=notes)
+    return marked[verdicts != 'hold'], marked[verdicts == 'hold'], state
@@ -0,0 +1,386 @@
+"""
+TUNVESTI - Vectorized backtesting engine
+Rule-based, long-only strategies evaluated on the date x ticker panel:
+scores are computed once for the whole history as 2D arrays, and the
+portfolio is simulated segment by segment between rebalances (cumulative
+growth of the held weights), so the cost is a handful of array operations
+per rebalance rather than per ticker-day.
+
+Trading model:
+    - Signals use data up to the close of the signal date; trades execute
+      at the close `lag` trading days later.
+    - Transaction costs are charged on turnover (sum of |weight change|).
+    - BVMT price limits: a stock that closed at its daily upper limit
+      cannot be bought, one at its lower limit cannot be sold, and a stock
+      that did not trade keeps its current weight. The freed budget is
+      spread over the tradable targets.
+
+Usage:
+    from tunvesti.backtest import load_inputs, run_backtest, run_grid
+    inputs = load_inputs()                       # from output/panel/
+    result = run_backtest(inputs, 'momentum', rebalance='M', top_n=10)
+    print(result['metrics'])
+    grid = run_grid('low_volatility', {'lookback': [20, 60, 120], 'top_n': [5, 10, 20]})
+"""
+
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+TRADING_DAYS = 252
+# BVMT daily variation threshold for listed stocks (+/- 6.09% of the reference price)
+PRICE_LIMIT_PCT = 6.09
+# Closes within this distance of the limit count as locked (tick rounding)
+PRICE_LIMIT_TOLERANCE_PCT = 0.1
+DEFAULT_COST_BPS = 40
+# A stock must have traded within this many sessions before a signal to be held
+ACTIVE_DAYS = 5
+# adj_close (corporate-action adjusted, see tunvesti/adjust.py) is used when available
+INPUT_FIELDS = ('close', 'adj_close', 'volatility_30d', 'dividend_yield_pct')
+REBALANCE_FREQUENCIES = {'D': None, 'W': 'W', 'M': 'M', 'Q': 'Q', 'A': 'Y'}
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def load_inputs(panel=None, fact=None, dim_stock=None):
+    """
+    Aligned arrays for backtesting, from the panel store or a fact table.
+
+    Parameters:
+    panel (Panel): Open panel store (default: Panel.open() when fact is None)
+    fact (pd.DataFrame): fact_stock_daily, used instead of the panel if given
+    dim_stock (pd.DataFrame): Stock dimension for sectors (default: output/dim_stock.csv)
+
+    Returns:
+    dict: dates, tickers, sectors, close (adjusted when available, forward-filled), returns (fraction,
+          0 on non-trading days), traded (bool) and the other INPUT_FIELDS
+    """
+    from tunvesti.panel import Panel, wide_arrays
+
+    if dim_stock is None and config.DIM_STOCK.exists():
+        dim_stock = pd.read_csv(config.DIM_STOCK)
+
+    if fact is not None:
+        dates, tickers, arrays = wide_arrays(fact, INPUT_FIELDS, dim_stock=dim_stock)
+    else:
+        panel = panel or Panel.open()
+        dates, tickers = panel.dates, panel.tickers
+        arrays = {name: panel.field(name) for name in INPUT_FIELDS if name in panel.fields}
+        arrays['mask'] = panel.mask
+
+    prices = arrays['adj_close'] if 'adj_close' in arrays else arrays['close']
+    close = pd.DataFrame(prices).ffill().to_numpy()
+    with np.errstate(invalid='ignore', divide='ignore'):
+        returns = close[1:] / close[:-1] - 1
+    returns = np.vstack([np.zeros((1, len(tickers))), returns])
+    returns[~np.isfinite(returns)] = 0.0
+
+    sectors = pd.Series(np.nan, index=tickers, dtype=object)
+    if dim_stock is not None:
+        sectors.update(dim_stock.drop_duplicates('ticker').set_index('ticker')['sector'])
+
+    inputs = {
+        'dates': pd.DatetimeIndex(dates),
+        'tickers': pd.Index(tickers),
+        'sectors': sectors.to_numpy(),
+        'close': close,
+        'returns': returns,
+        'traded': np.asarray(arrays['mask'], dtype=bool),
+    }
+    for name in INPUT_FIELDS[2:]:
+        if name in arrays:
+            inputs[name] = np.asarray(arrays[name], dtype=np.float64)
+    return inputs
+
+
+# ============================================================================
+# STRATEGIES (score arrays: higher = preferred, NaN = not eligible)
+# ============================================================================
+
+def score_momentum(inputs, lookback=252, skip=21):
+    """Trailing return from lookback to skip days ago (12-1 momentum by default)."""
+    close = inputs['close']
+    score = np.full(close.shape, np.nan)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        score[lookback:] = close[lookback - skip:len(close) - skip] / close[:len(close) - lookback] - 1
+    return score
+
+
+def score_low_volatility(inputs, lookback=60):
+    """Negative rolling volatility of daily returns over traded days."""
+    returns = np.where(inputs['traded'], inputs['returns'], np.nan)
+    vol = pd.DataFrame(returns).rolling(lookback, min_periods=max(2, lookback // 2)).std().to_numpy()
+    return -vol
+
+
+def score_dividend_yield(inputs):
+    """Current dividend yield (stocks without a dividend are not eligible)."""
+    yield_pct = inputs['dividend_yield_pct']
+    return np.where(yield_pct > 0, yield_pct, np.nan)
+
+
+def score_sector_low_volatility(inputs, lookback=60, sectors=3):
+    """
+    Sector rotation: hold every stock of the `sectors` least volatile sectors.
+
+    Sector volatility is the cross-sectional mean of member stock volatility.
+    """
+    vol = -score_low_volatility(inputs, lookback)
+    names = inputs['sectors']
+    known = pd.notna(names)
+    labels, codes = np.unique(names[known].astype(str), return_inverse=True)
+
+    sector_vol = np.full((vol.shape[0], len(labels)), np.nan)
+    for k in range(len(labels)):
+        member = vol[:, np.flatnonzero(known)[codes == k]]
+        counts = (~np.isnan(member)).sum(axis=1)
+        np.divide(np.nansum(member, axis=1), counts, out=sector_vol[:, k], where=counts > 0)
+
+    ranks = pd.DataFrame(sector_vol).rank(axis=1, method='first').to_numpy()
+    chosen = ranks <= sectors
+    score = np.full(vol.shape, np.nan)
+    columns = np.flatnonzero(known)
+    score[:, columns] = np.where(chosen[:, codes] & ~np.isnan(vol[:, columns]), 1.0, np.nan)
+    return score
+
+
+STRATEGIES = {
+    'momentum': score_momentum,
+    'low_volatility': score_low_volatility,
+    'dividend_yield': score_dividend_yield,
+    'sector_low_volatility': score_sector_low_volatility,
+}
+
+
+# ============================================================================
+# SIMULATION
+# ============================================================================
+
+def rebalance_rows(dates, rebalance='M'):
+    """
+    Signal rows: last trading day of each period (or every N rows for an int).
+    """
+    n = len(dates)
+    if isinstance(rebalance, int):
+        return np.arange(rebalance - 1, n, rebalance)
+    if rebalance not in REBALANCE_FREQUENCIES:
+        raise ValueError(f"Unknown rebalance '{rebalance}' (use {', '.join(REBALANCE_FREQUENCIES)} or an int)")
+    freq = REBALANCE_FREQUENCIES[rebalance]
+    if freq is None:
+        return np.arange(n)
+    periods = pd.DatetimeIndex(dates).to_period(freq).asi8
+    return np.flatnonzero(np.append(periods[1:] != periods[:-1], True))
+
+
+def target_weights(score, top_n=None):
+    """
+    Equal weights over the top_n scores of each row (all eligible if None).
+
+    Parameters:
+    score (ndarray): (rebalances x tickers) scores, NaN = not eligible
+    """
+    eligible = ~np.isnan(score)
+    if top_n:
+        order = np.argsort(-np.where(eligible, score, -np.inf), axis=1, kind='stable')
+        rank = np.empty_like(order)
+        np.put_along_axis(rank, order, np.arange(score.shape[1])[None, :].repeat(len(score), 0), axis=1)
+        eligible &= rank < top_n
+    counts = eligible.sum(axis=1, keepdims=True)
+    return np.divide(eligible, counts, out=np.zeros(score.shape), where=counts > 0)
+
+
+def apply_price_limits(target, current, day_return, traded, limit_pct=PRICE_LIMIT_PCT):
+    """
+    Constrain a rebalance to what could trade at the close.
+
+    Returns:
+    tuple: (feasible weights, number of blocked orders)
+    """
+    if limit_pct is None:
+        return target, 0
+    threshold = (limit_pct - PRICE_LIMIT_TOLERANCE_PCT) / 100
+    locked_up = day_return >= threshold
+    locked_down = day_return <= -threshold
+    blocked = ((~traded & (target != current))
+               | (locked_up & (target > current))
+               | (locked_down & (target < current)))
+    if not blocked.any():
+        return target, 0
+
+    feasible = np.where(blocked, current, target)
+    free = ~blocked
+    budget = max(target.sum() - feasible[blocked].sum(), 0.0)
+    free_total = feasible[free].sum()
+    if free_total > 0:
+        feasible[free] *= budget / free_total
+    return feasible, int(blocked.sum())
+
+
+def simulate(returns, traded, targets, exec_rows, cost_bps=DEFAULT_COST_BPS, limit_pct=PRICE_LIMIT_PCT):
+    """
+    Daily portfolio returns for target weights traded at exec_rows closes.
+
+    Between trades the weights drift with prices: the value of each holding
+    is its weight times the cumulative growth since the last trade, so each
+    holding period is one cumprod over a (days x tickers) block. Weight not
+    invested stays in cash (0% return).
+
+    Returns:
+    tuple: (daily returns ndarray, turnover per trade ndarray, blocked order count)
+    """
+    n_dates = len(returns)
+    cost = cost_bps / 10000
+    daily = np.zeros(n_dates)
+    turnover = np.zeros(len(exec_rows))
+    blocked_total = 0
+    weights = np.zeros(returns.shape[1])
+    previous = 0
+
+    for k, row in enumerate(np.append(exec_rows, n_dates - 1)):
+        # Hold current weights from the close of `previous` to the close of `row`
+        if row > previous:
+            growth = np.cumprod(1 + returns[previous + 1:row + 1], axis=0)
+            value = growth @ weights + (1 - weights.sum())
+            daily[previous + 1:row + 1] = value / np.append(1.0, value[:-1]) - 1
+            weights = weights * growth[-1] / value[-1]
+        if k == len(exec_rows):
+            break
+
+        new, blocked = apply_price_limits(targets[k], weights, returns[row], traded[row], limit_pct)
+        turnover[k] = np.abs(new - weights).sum()
+        daily[row] = (1 + daily[row]) * (1 - turnover[k] * cost) - 1
+        blocked_total += blocked
+        weights, previous = new, row
+
+    return daily, turnover, blocked_total
+
+
+def performance(daily, turnover, years):
+    """Summary statistics of a daily return series (fractions)."""
+    equity = np.cumprod(1 + daily)
+    peak = np.maximum.accumulate(equity)
+    std = daily.std(ddof=1) if len(daily) > 1 else np.nan
+    return {
+        'total_return_pct': (equity[-1] - 1) * 100 if len(equity) else np.nan,
+        'cagr_pct': (equity[-1] ** (1 / years) - 1) * 100 if years > 0 else np.nan,
+        'volatility_pct': std * np.sqrt(TRADING_DAYS) * 100,
+        'sharpe': daily.mean() / std * np.sqrt(TRADING_DAYS) if std > 0 else np.nan,
+        'max_drawdown_pct': ((equity / peak).min() - 1) * 100 if len(equity) else np.nan,
+        'annual_turnover_pct': turnover.sum() / years * 100 if years > 0 else np.nan,
+    }
+
+
+def run_backtest(inputs, strategy='momentum', rebalance='M', top_n=10, cost_bps=DEFAULT_COST_BPS,
+                 limit_pct=PRICE_LIMIT_PCT, lag=1, start=None, end=None, **params):
+    """
+    Backtest one strategy configuration.
+
+    Parameters:
+    inputs (dict): Output of load_inputs()
+    strategy (str): Key of STRATEGIES
+    rebalance (str|int): 'D', 'W', 'M', 'Q', 'A' or every N trading days
+    top_n (int): Number of stocks held (None = every eligible stock)
+    cost_bps (float): Transaction cost per unit of turnover, in basis points
+    limit_pct (float): BVMT daily price limit in % (None disables the constraint)
+    lag (int): Trading days between signal and execution
+    start, end (str): Evaluation window (signals may use earlier history)
+    **params: Strategy parameters (e.g. lookback, skip, sectors)
+
+    Returns:
+    dict: 'returns' (pd.Series of daily %), 'turnover' (pd.Series per trade),
+          'metrics' (dict)
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}' (available: {', '.join(STRATEGIES)})")
+    dates = inputs['dates']
+    lo = dates.searchsorted(pd.Timestamp(start)) if start else 0
+    hi = dates.searchsorted(pd.Timestamp(end), side='right') if end else len(dates)
+
+    score = STRATEGIES[strategy](inputs, **params)
+    signal = rebalance_rows(dates, rebalance)
+    signal = signal[(signal + lag >= lo) & (signal + lag < hi)]
+    # Only stocks that traded recently are eligible (no stale, suspended or delisted names)
+    traded_count = np.cumsum(inputs['traded'], axis=0)
+    recent = traded_count[signal] - np.where(signal[:, None] >= ACTIVE_DAYS,
+                                             traded_count[np.maximum(signal - ACTIVE_DAYS, 0)], 0)
+    targets = target_weights(np.where(recent > 0, score[signal], np.nan), top_n)
+
+    window = slice(lo, hi)
+    exec_rows = signal + lag - lo
+    daily, turnover, blocked = simulate(inputs['returns'][window], inputs['traded'][window],
+                                        targets, exec_rows, cost_bps, limit_pct)
+
+    # Performance is measured from the first trade
+    first = exec_rows[0] if len(exec_rows) else len(daily)
+    years = (len(daily) - first) / TRADING_DAYS
+    metrics = performance(daily[first:], turnover, years)
+    metrics.update({'rebalances': len(exec_rows), 'blocked_orders': blocked})
+
+    return {
+        'returns': pd.Series(daily[first:] * 100, index=dates[window][first:], name='return_pct'),
+        'turnover': pd.Series(turnover, index=dates[window][exec_rows], name='turnover'),
+        'metrics': metrics,
+    }
+
+
+# ============================================================================
+# PARAMETER GRID
+# ============================================================================
+
+_WORKER_INPUTS = None
+
+
+def _init_worker(panel_dir):
+    """Process pool initializer: map the panel once per worker."""
+    global _WORKER_INPUTS
+    from tunvesti.panel import Panel
+    _WORKER_INPUTS = load_inputs(Panel.open(panel_dir))
+
+
+def _run_config(params):
+    result = run_backtest(_WORKER_INPUTS, **params)
+    return {**params, **result['metrics']}
+
+
+def expand_grid(grid):
+    """Cartesian product of {param: [values]} as a list of dicts."""
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[key] for key in keys))]
+
+
+def run_grid(strategy, grid, panel_dir=None, processes=None, **fixed):
+    """
+    Run every combination of a parameter grid in parallel processes.
+
+    Workers memory-map the panel store, so the data is shared through the
+    OS page cache rather than pickled to each process.
+
+    Parameters:
+    strategy (str): Key of STRATEGIES
+    grid (dict): {parameter: [values]} (any run_backtest or strategy parameter)
+    panel_dir (Path): Panel store (default: output/panel)
+    processes (int): Worker processes (default: CPU count; 1 runs in-process)
+    **fixed: Parameters shared by every configuration
+
+    Returns:
+    pd.DataFrame: One row per configuration with its metrics, best Sharpe first
+    """
+    configs = [{'strategy': strategy, **fixed, **params} for params in expand_grid(grid)]
+    processes = processes or os.cpu_count() or 1
+
+    if processes == 1 or len(configs) == 1:
+        _init_worker(panel_dir)
+        rows = [_run_config(params) for params in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(configs)),
+                                 initializer=_init_worker, initargs=(panel_dir,)) as executor:
+            rows = list(executor.map(_run_config, configs))
+
+    return pd.DataFrame(rows).sort_values('sharpe', ascending=False).reset_index(drop=True)
@@ -0,0 +1,217 @@
+"""
+TUNVESTI - Rolling beta / correlation engine
+Per-ticker rolling beta, alpha and correlation against TUNINDEX, and the
+cross-ticker rolling correlation matrix, computed on aligned NumPy arrays
+(date x ticker) instead of per-ticker pandas loops.
+
+Window moments are maintained incrementally: windowed sums come from running
+sums (add the new day, drop the day leaving the window), so the cost per
+date is O(tickers) for beta and O(tickers^2) for the correlation matrix,
+independent of the window length. Tickers are processed in column blocks so
+memory stays bounded for large universes.
+
+Usage:
+    from tunvesti.beta import rolling_beta, rolling_correlation_matrix
+    betas = rolling_beta(fact, window=60)
+    for date, tickers, corr in rolling_correlation_matrix(fact, window=60, every=21):
+        ...
+"""
+
+import numpy as np
+import pandas as pd
+
+TRADING_DAYS = 252
+
+
+# ============================================================================
+# ALIGNMENT
+# ============================================================================
+
+def returns_panel(fact, value=None):
+    """
+    Pivot long fact rows into an aligned (date x ticker) float array.
+
+    value defaults to total_return_pct (corporate-action adjusted) when the
+    fact table has it, daily_return_pct otherwise.
+
+    Returns:
+    tuple: (dates DatetimeIndex, tickers Index, 2D float64 array with NaN gaps)
+    """
+    if value is None:
+        value = 'total_return_pct' if 'total_return_pct' in fact.columns else 'daily_return_pct'
+    wide = fact.pivot_table(index='date', columns='ticker', values=value, aggfunc='last')
+    wide.index = pd.to_datetime(wide.index)
+    wide = wide.sort_index()
+    return wide.index, wide.columns, wide.to_numpy(dtype=np.float64)
+
+
+def market_returns(fact, dates, market=None):
+    """
+    TUNINDEX daily return (%) aligned to dates.
+
+    Levels come from fact_market_daily (market, loaded from the outputs when
+    omitted); a fact table that still carries tunindex_close is used as is.
+    The level is taken once per date, so broadcast rows do not distort the series.
+    """
+    from tunvesti.market import market_series
+
+    if market is None and 'tunindex_close' in fact.columns:
+        market = fact
+    levels = market_series(market)
+    returns = levels.pct_change() * 100
+    return returns.reindex(dates).to_numpy(dtype=np.float64)
+
+
+def _window_sums(values, window):
+    """Trailing window sums along axis 0 via running sums (add new, drop old)."""
+    running = np.cumsum(values, axis=0)
+    out = running.copy()
+    out[window:] -= running[:-window]
+    return out
+
+
+# ============================================================================
+# BETA / ALPHA / CORRELATION VS MARKET
+# ============================================================================
+
+def rolling_beta_arrays(returns, market, window=60, min_periods=None, block=1024):
+    """
+    Rolling regression statistics of every column of returns on market.
+
+    Parameters:
+    returns (ndarray): (dates x tickers) daily returns in %, NaN where missing
+    market (ndarray): (dates,) market daily returns in %
+    window (int): Rolling window length in trading days
+    min_periods (int): Minimum paired observations (default: window)
+    block (int): Tickers per column block (bounds temporary memory)
+
+    Returns:
+    dict: 'beta', 'alpha' (daily %), 'correlation', 'n' as (dates x tickers) arrays
+    """
+    min_periods = min_periods or window
+    n_dates, n_tickers = returns.shape
+    result = {key: np.full((n_dates, n_tickers), np.nan) for key in ('beta', 'alpha', 'correlation')}
+    result['n'] = np.zeros((n_dates, n_tickers), dtype=np.int32)
+    market = market.reshape(-1, 1)
+
+    for start in range(0, n_tickers, block):
+        cols = slice(start, start + block)
+        r = returns[:, cols]
+        valid = ~np.isnan(r) & ~np.isnan(market)
+        x = np.where(valid, r, 0.0)
+        y = np.where(valid, market, 0.0)
+
+        n = _window_sums(valid.astype(np.float64), window)
+        sx, sy = _window_sums(x, window), _window_sums(y, window)
+        sxx, syy, sxy = _window_sums(x * x, window), _window_sums(y * y, window), _window_sums(x * y, window)
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            cov = (sxy - sx * sy / n) / (n - 1)
+            var_x = (sxx - sx * sx / n) / (n - 1)
+            var_m = (syy - sy * sy / n) / (n - 1)
+            beta = cov / var_m
+            alpha = sx / n - beta * sy / n
+            corr = cov / np.sqrt(var_x * var_m)
+
+        enough = n >= min_periods
+        result['beta'][:, cols] = np.where(enough, beta, np.nan)
+        result['alpha'][:, cols] = np.where(enough, alpha, np.nan)
+        result['correlation'][:, cols] = np.where(enough, np.clip(corr, -1, 1), np.nan)
+        result['n'][:, cols] = n
+
+    return result
+
+
+def rolling_beta(fact, window=60, min_periods=None, market=None):
+    """
+    Rolling beta, alpha and correlation of every ticker against TUNINDEX.
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily (date, ticker, daily_return_pct)
+    window (int): Rolling window in trading days
+    min_periods (int): Minimum paired observations (default: window)
+    market (pd.DataFrame): fact_market_daily (default: loaded from the outputs)
+
+    Returns:
+    pd.DataFrame: date, ticker, beta, alpha_pct (daily), alpha_annual_pct, correlation
+    """
+    dates, tickers, returns = returns_panel(fact)
+    market = market_returns(fact, dates, market)
+    stats = rolling_beta_arrays(returns, market, window, min_periods)
+
+    beta = stats['beta']
+    keep = ~np.isnan(beta)
+    date_idx, ticker_idx = np.nonzero(keep)
+    return pd.DataFrame({
+        'date': dates[date_idx],
+        'ticker': tickers[ticker_idx],
+        'beta': beta[keep],
+        'alpha_pct': stats['alpha'][keep],
+        'alpha_annual_pct': stats['alpha'][keep] * TRADING_DAYS,
+        'correlation': stats['correlation'][keep],
+    }).sort_values(['ticker', 'date']).reset_index(drop=True)
+
+
+# ============================================================================
+# CROSS-TICKER CORRELATION MATRIX
+# ============================================================================
+
+def iter_correlation_matrices(returns, window=60, min_periods=None, every=1):
+    """
+    Yield (row index, correlation matrix) along the dates of a returns panel.
+
+    Pairwise-complete moments (count, sums, sums of squares, cross products)
+    are kept as tickers x tickers arrays and updated by adding the entering
+    day and subtracting the leaving one: O(tickers^2) per date, O(tickers^2)
+    memory whatever the history length.
+
+    Parameters:
+    returns (ndarray): (dates x tickers) daily returns, NaN where missing
+    window (int): Rolling window in trading days
+    min_periods (int): Minimum paired observations per cell (default: window // 2)
+    every (int): Emit a matrix every N dates (moments are still updated daily)
+    """
+    min_periods = min_periods or max(2, window // 2)
+    n_dates, n_tickers = returns.shape
+    mask = (~np.isnan(returns)).astype(np.float64)
+    values = np.nan_to_num(returns)
+
+    count = np.zeros((n_tickers, n_tickers))
+    sum_x = np.zeros((n_tickers, n_tickers))    # sum of x_i over days where i and j both trade
+    sum_xx = np.zeros((n_tickers, n_tickers))
+    sum_xy = np.zeros((n_tickers, n_tickers))
+
+    for t in range(n_dates):
+        # Day t enters the window, day t - window leaves it
+        for row, sign in ((t, 1.0), (t - window, -1.0)):
+            if row < 0:
+                continue
+            m, x = mask[row], values[row]
+            count += sign * np.outer(m, m)
+            sum_x += sign * np.outer(x, m)
+            sum_xx += sign * np.outer(x * x, m)
+            sum_xy += sign * np.outer(x, x)
+        if (t + 1) % every and t != n_dates - 1:
+            continue
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_i = sum_x / count
+            mean_j = mean_i.T
+            cov = sum_xy / count - mean_i * mean_j
+            var_i = sum_xx / count - mean_i ** 2
+            corr = cov / np.sqrt(var_i * var_i.T)
+        corr[count < min_periods] = np.nan
+        np.fill_diagonal(corr, np.where(np.diag(count) >= min_periods, 1.0, np.nan))
+        yield t, np.clip(corr, -1, 1)
+
+
+def rolling_correlation_matrix(fact, window=60, min_periods=None, every=21):
+    """
+    Cross-ticker rolling correlation matrices from the fact table.
+
+    Yields:
+    tuple: (date, tickers Index, (tickers x tickers) correlation ndarray)
+    """
+    dates, tickers, returns = returns_panel(fact)
+    for t, corr in iter_correlation_matrices(returns, window, min_periods, every):
+        yield dates[t], tickers, corr
@@ -0,0 +1,308 @@
+"""
+TUNVESTI - Downsampled chart series
+Serves price histories at the resolution a chart can actually draw. Script
+03 writes a pyramid of OHLCV rollups (daily -> weekly -> monthly) per
+ticker; a chart request for a pixel width picks the coarsest level that
+still has a point per pixel and downsamples it with LTTB (shape-preserving)
+or min-max decimation (keeps every peak and trough), or returns whole bars
+for candlesticks. The points read are bounded by a few times the width, so
+a 15-year range costs about the same as a 3-month one.
+
+Layout (output/charts/):
+    meta.json                          build, fields, tickers, per-level row offsets of each ticker
+    <build>/<level>/dates.npy          datetime64[D], last trading day of each bar
+    <build>/<level>/<field>.npy        float64, rows grouped by ticker then sorted by date
+
+Each ticker's bars are one contiguous, date-sorted slice of the memory-mapped
+arrays, so a ticker and date range is located with two binary searches.
+
+A rebuild writes a new build directory and then replaces meta.json
+atomically; files are never rewritten in place, so a reader that opened
+the previous meta.json keeps consistent offsets and arrays. The previous
+build is kept for such readers and older ones are deleted.
+
+Usage:
+    from tunvesti.charts import Pyramid, chart_series, candles
+    pyramid = Pyramid.open()
+    line = chart_series('SFBT', width=800, pyramid=pyramid)                 # date, close
+    peaks = chart_series('SFBT', width=800, method='minmax', pyramid=pyramid)
+    bars = candles('SFBT', width=800, start='2020-01-01', pyramid=pyramid)
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+CHART_DIR = config.OUTPUT_DIR / 'charts'
+META_FILE = 'meta.json'
+# Level name -> pandas period of one bar (None: the daily rows themselves)
+LEVELS = {
+    'daily': None,
+    'weekly': 'W-FRI',
+    'monthly': 'M',
+}
+# Field -> how daily values combine into a bar
+ROLLUP_FIELDS = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'close': 'last',
+    'adj_close': 'last',
+    'volume': 'sum',
+}
+DEFAULT_WIDTH = 800
+# Narrowest candle worth drawing, in pixels
+CANDLE_PIXELS = 3
+
+
+# ============================================================================
+# DOWNSAMPLING
+# ============================================================================
+
+def lttb(x, y, n):
+    """
+    Largest-Triangle-Three-Buckets: indices of n points that keep the visual shape.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+
+    Parameters:
+    x, y (np.ndarray): Sorted x values (e.g. dates as integers) and values, no NaN
+    n (int): Number of points wanted (at least 3)
+
+    Returns:
+    np.ndarray: Sorted indices into x/y
+    """
+    size = len(x)
+    n = max(int(n), 3)
+    if size <= n:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # n - 2 buckets over points 1 .. size-2; the "bucket" after the last is the last point
+    edges = np.append(np.linspace(1, size - 1, n - 1).astype(np.int64), size)
+    counts = np.diff(edges)
+    mean_x = (np.add.reduceat(x, edges[:-1]) / counts).tolist()
+    mean_y = (np.add.reduceat(y, edges[:-1]) / counts).tolist()
+
+    # Buckets hold a handful of points, so plain floats beat per-bucket array calls
+    xs, ys, edges = x.tolist(), y.tolist(), edges.tolist()
+    keep = [0]
+    a = 0
+    for i in range(n - 2):
+        ax, ay = xs[a], ys[a]
+        dx, dy = ax - mean_x[i + 1], mean_y[i + 1] - ay
+        best = -1.0
+        for b in range(edges[i], edges[i + 1]):
+            area = abs(dx * (ys[b] - ay) - (ax - xs[b]) * dy)
+            if area > best:
+                best, a = area, b
+        keep.append(a)
+    keep.append(size - 1)
+    return np.array(keep, dtype=np.int64)
+
+
+def minmax(x, y, n):
+    """
+    Min-max decimation: the lowest and highest point of each of n/2 time buckets.
+
+    Buckets split the x range evenly (one per pixel column pair), so every
+    extreme survives. Returns at most n sorted indices, plus the endpoints.
+    """
+    size = len(x)
+    if size <= n:
+        return np.arange(size)
+    x = np.asarray(x, dtype=np.float64)
+    buckets = max(int(n) // 2, 1)
+    bucket = np.minimum(((x - x[0]) / (x[-1] - x[0]) * buckets).astype(np.int64), buckets - 1)
+
+    order = np.lexsort((y, bucket))
+    sorted_bucket = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+    ends = np.r_[starts[1:], size]
+    return np.unique(np.concatenate([order[starts], order[ends - 1], [0, size - 1]]))
+
+
+DOWNSAMPLERS = {
+    'lttb': lttb,
+    'minmax': minmax,
+}
+
+
+# ============================================================================
+# PYRAMID BUILD
+# ============================================================================
+
+def rollup(fact, level):
+    """
+    OHLCV bars of one pyramid level from the long fact table.
+
+    Returns:
+    pd.DataFrame: ticker, date (last trading day of the bar) and the
+                  ROLLUP_FIELDS present in fact, sorted by ticker and date
+    """
+    fields = [f for f in ROLLUP_FIELDS if f in fact.columns]
+    df = fact[['ticker', 'date'] + fields].assign(date=lambda d: pd.to_datetime(d['date']))
+    df = df.sort_values(['ticker', 'date'], kind='stable')
+    if LEVELS[level] is None:
+        return df.reset_index(drop=True)
+
+    period = df['date'].dt.to_period(LEVELS[level]).rename('period')
+    bars = df.groupby([df['ticker'], period], sort=True).agg(
+        date=('date', 'last'), **{field: (field, ROLLUP_FIELDS[field]) for field in fields})
+    return bars.reset_index('ticker').reset_index(drop=True)
+
+
+def build_pyramid(fact, chart_dir=None):
+    """
+    Write every pyramid level from the fact table (full rewrite).
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily
+    chart_dir (Path): Destination directory (default: output/charts)
+
+    Returns:
+    Pyramid: The freshly written store, opened read-only
+    """
+    from tunvesti.snapshots import new_build, publish_build
+
+    chart_dir = chart_dir or CHART_DIR
+    build, staging = new_build(chart_dir)
+    tickers = sorted(fact['ticker'].unique())
+    fields = [f for f in ROLLUP_FIELDS if f in fact.columns]
+    meta = {'build': build, 'fields': fields, 'tickers': tickers, 'levels': {}}
+
+    for level in LEVELS:
+        bars = rollup(fact, level)
+        level_dir = staging / level
+        level_dir.mkdir(parents=True)
+        np.save(level_dir / 'dates.npy', bars['date'].to_numpy().astype('datetime64[D]'))
+        for field in fields:
+            np.save(level_dir / f'{field}.npy', pd.to_numeric(bars[field], errors='coerce').to_numpy(np.float64))
+        offsets = np.append(np.searchsorted(bars['ticker'].to_numpy(), tickers), len(bars))
+        meta['levels'][level] = {'rows': len(bars), 'offsets': offsets.tolist()}
+
+    publish_build(chart_dir, staging, meta, META_FILE)
+    return Pyramid.open(chart_dir)
+
+
+# ============================================================================
+# PYRAMID READS
+# ============================================================================
+
+class Pyramid:
+    """Read-only, memory-mapped view of the chart pyramid."""
+
+    def __init__(self, chart_dir, meta):
+        self.chart_dir = chart_dir
+        self.build_dir = chart_dir / meta['build'] if meta.get('build') else chart_dir
+        self.fields = meta['fields']
+        self.tickers = meta['tickers']
+        self.levels = [level for level in LEVELS if level in meta['levels']]
+        self.rows = {level: meta['levels'][level]['rows'] for level in self.levels}
+        self._offsets = {level: meta['levels'][level]['offsets'] for level in self.levels}
+        self._ticker_pos = {t: i for i, t in enumerate(self.tickers)}
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, chart_dir=None):
+        """Open an existing pyramid (files are mapped lazily, per level and field)."""
+        chart_dir = chart_dir or CHART_DIR
+        meta_path = chart_dir / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No chart pyramid in {chart_dir} (run script 03 or build_pyramid first)")
+        return cls(chart_dir, json.loads(meta_path.read_text()))
+
+    def _array(self, level, name):
+        if (level, name) not in self._arrays:
+            self._arrays[level, name] = np.load(self.build_dir / level / f'{name}.npy', mmap_mode='r')
+        return self._arrays[level, name]
+
+    def span(self, ticker, level, start=None, end=None):
+        """Row slice of one ticker's bars between start and end (two binary searches)."""
+        if ticker.upper() not in self._ticker_pos:
+            raise KeyError(f"Ticker '{ticker}' not in chart pyramid")
+        t = self._ticker_pos[ticker.upper()]
+        lo, hi = self._offsets[level][t], self._offsets[level][t + 1]
+        dates = self._array(level, 'dates')[lo:hi]
+        first = dates.searchsorted(np.datetime64(pd.Timestamp(start).date(), 'D')) if start is not None else 0
+        last = (dates.searchsorted(np.datetime64(pd.Timestamp(end).date(), 'D'), side='right')
+                if end is not None else len(dates))
+        return slice(lo + first, lo + last)
+
+    def bars(self, ticker, level='daily', start=None, end=None, fields=None):
+        """One ticker's bars of a level as a DataFrame (date plus fields)."""
+        rows = self.span(ticker, level, start, end)
+        fields = fields or self.fields
+        data = {'date': self._array(level, 'dates')[rows].astype('datetime64[ns]')}
+        data.update({field: np.asarray(self._array(level, field)[rows]) for field in fields})
+        return pd.DataFrame(data)
+
+    def choose_level(self, ticker, points, start=None, end=None):
+        """
+        Coarsest level with at least `points` bars in the range.
+
+        Falls back to daily when even daily has fewer (the chart then shows
+        every bar), so the bars read stay within a few times `points`.
+        """
+        for level in reversed(self.levels):
+            rows = self.span(ticker, level, start, end)
+            if rows.stop - rows.start >= points:
+                return level
+        return self.levels[0]
+
+
+# ============================================================================
+# CHART SERIES
+# ============================================================================
+
+def chart_series(ticker, width=DEFAULT_WIDTH, start=None, end=None, field='close', method='lttb', pyramid=None):
+    """
+    A line series of at most `width` points for one ticker.
+
+    Parameters:
+    ticker (str): Stock ticker
+    width (int): Chart width in pixels (points returned)
+    start, end: Inclusive date bounds (default: full history)
+    field (str): Pyramid field, e.g. 'close' or 'adj_close'
+    method (str): Key of DOWNSAMPLERS ('lttb' or 'minmax')
+    pyramid (Pyramid): Open pyramid (default: Pyramid.open())
+
+    Returns:
+    pd.DataFrame: date, <field>
+    """
+    if method not in DOWNSAMPLERS:
+        raise ValueError(f"Unknown method '{method}' (available: {', '.join(DOWNSAMPLERS)})")
+    pyramid = pyramid or Pyramid.open()
+    if field not in pyramid.fields:
+        raise ValueError(f"Unknown field '{field}' (available: {', '.join(pyramid.fields)})")
+
+    level = pyramid.choose_level(ticker, width, start, end)
+    bars = pyramid.bars(ticker, level, start, end, fields=[field]).dropna(subset=[field])
+    x = bars['date'].to_numpy().astype(np.int64)
+    keep = DOWNSAMPLERS[method](x, bars[field].to_numpy(), width)
+    return bars.iloc[keep].reset_index(drop=True)
+
+
+def candles(ticker, width=DEFAULT_WIDTH, start=None, end=None, pyramid=None):
+    """
+    OHLCV bars for a candlestick chart: the finest level that fits the width.
+
+    A level fits when each bar gets at least CANDLE_PIXELS pixels; monthly
+    bars are returned when none does.
+
+    Returns:
+    pd.DataFrame: date and every pyramid field
+    """
+    pyramid = pyramid or Pyramid.open()
+    fits = max(int(width) // CANDLE_PIXELS, 1)
+    for level in pyramid.levels:
+        rows = pyramid.span(ticker, level, start, end)
+        if rows.stop - rows.start <= fits:
+            break
+    return pyramid.bars(ticker, level, start, end)
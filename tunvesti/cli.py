@@ -0,0 +1,326 @@
+"""
+TUNVESTI - Command-line interface
+Unified entry point for the pipeline scripts and the query helpers.
+
+Usage:
+    python -m tunvesti --help
+    python -m tunvesti check | load | scrape | merge | schedule
+    python -m tunvesti scrape --intraday --interval 5
+    python -m tunvesti query --ticker SFBT --start 2022-01-01
+    python -m tunvesti query --sql "SELECT sector, count(*) FROM dim_stock GROUP BY 1"
+    python -m tunvesti snapshots [--rollback VERSION | --gc]
+    python -m tunvesti feed [--listen --topics quote]
+    python -m tunvesti compact [--remove-sources]
+    python -m tunvesti reports [--force] [--processes N] [--tickers SFBT,BIAT]
+    python -m tunvesti liquidity [--max-zero-ratio 0.2] [--sort amihud]
+
+Heavy dependencies (pandas, selenium, requests...) are only imported by the
+subcommand that needs them, so `--help` and argument errors stay fast.
+"""
+
+import argparse
+import os
+import sys
+from contextlib import contextmanager
+
+from tunvesti import __version__
+from tunvesti import config
+
+
+# ============================================================================
+# HELPERS
+# ============================================================================
+
+@contextmanager
+def _working_directory(path):
+    """Temporarily change the working directory (scripts expect scripts/)."""
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def _run_script(name, script_args=()):
+    """
+    Run one of the numbered pipeline scripts as if called directly.
+
+    Returns:
+    int: The script's exit status (its sys.exit() code; 0 if it returns normally)
+    """
+    import runpy
+
+    script_path = config.SCRIPTS[name]
+    argv = sys.argv
+    sys.argv = [str(script_path)] + list(script_args)
+    try:
+        with _working_directory(config.SCRIPTS_DIR):
+            runpy.run_path(str(script_path), run_name='__main__')
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        # sys.exit('message'): print it and fail, like the interpreter does
+        print(e.code, file=sys.stderr)
+        return 1
+    finally:
+        sys.argv = argv
+    return 0
+
+
+# ============================================================================
+# SUBCOMMANDS
+# ============================================================================
+
+def cmd_script(args):
+    """check / load / scrape / merge / schedule"""
+    script_args = []
+    if getattr(args, 'intraday', False):
+        script_args += ['--intraday', '--interval', str(args.interval)]
+        if args.tickers:
+            script_args += ['--tickers', args.tickers]
+    return _run_script(args.command, script_args)
+
+
+def cmd_query(args):
+    """Run SQL (ad-hoc, saved, or built from filters) against the star schema."""
+    from tunvesti import query
+
+    if args.list:
+        for name in query.SAVED_QUERIES:
+            print(name)
+        return 0
+
+    params = []
+    if args.sql:
+        sql = args.sql
+    elif args.saved:
+        if args.saved not in query.SAVED_QUERIES:
+            print(f"✗ Unknown saved query '{args.saved}' (see --list)", file=sys.stderr)
+            return 1
+        sql = query.SAVED_QUERIES[args.saved]
+    else:
+        columns = f'date, ticker, {args.columns}' if args.columns else '*'
+        conditions = []
+        if args.ticker:
+            conditions.append('ticker = ?')
+            params.append(args.ticker.upper())
+        if args.start:
+            conditions.append('date >= CAST(? AS DATE)')
+            params.append(args.start)
+        if args.end:
+            conditions.append('date <= CAST(? AS DATE)')
+            params.append(args.end)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        limit = f'LIMIT {args.limit}' if args.limit else ''
+        sql = (f"SELECT * FROM (SELECT {columns} FROM fact_stock_daily {where} "
+               f"ORDER BY date DESC, ticker {limit}) ORDER BY ticker, date")
+
+    con = query.connect()
+    try:
+        con.sql(sql, params=params or None).show(max_rows=args.max_rows, max_width=200)
+    finally:
+        con.close()
+    return 0
+
+
+def cmd_snapshots(args):
+    """List, roll back or garbage-collect the versioned output snapshots."""
+    from tunvesti import snapshots
+
+    if args.rollback:
+        try:
+            snapshots.set_current(args.rollback)
+        except ValueError as e:
+            print(f"✗ {e}", file=sys.stderr)
+            return 1
+        print(f"✓ Current snapshot: {args.rollback}")
+        return 0
+    if args.gc:
+        deleted = snapshots.collect_garbage(keep=args.keep, keep_days=args.keep_days)
+        print(f"✓ Deleted {len(deleted)} snapshots" + (f": {', '.join(deleted)}" if deleted else ''))
+        return 0
+
+    table = snapshots.list_snapshots()
+    if table.empty:
+        print("No snapshots published yet (run: python -m tunvesti merge)")
+        return 0
+    print(table.to_string(index=False))
+    return 0
+
+
+def cmd_feed(args):
+    """Run the local quote feed broker, or print its messages (--listen)."""
+    import json
+    import logging
+    from tunvesti import feed
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if not args.listen:
+        feed.serve(args.host, args.port)
+        return 0
+
+    topics = args.topics.split(',') if args.topics else None
+    tickers = args.tickers.upper().split(',') if args.tickers else None
+    try:
+        for message in feed.subscribe(topics, tickers, args.replay, args.host, args.port):
+            print(json.dumps(message), flush=True)
+    except ConnectionRefusedError:
+        print(f"✗ No feed broker on {args.host}:{args.port} (start one with: python -m tunvesti feed)",
+              file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def cmd_compact(args):
+    """Compact the daily scrape files into monthly columnar segments."""
+    from tunvesti import segments
+
+    catalog = segments.compact(remove_sources=args.remove_sources)
+    print(f"✓ {len(catalog['segments'])} segments in {segments.SEGMENT_DIR}; "
+          f"{len(catalog['written'])} rewritten, {catalog['removed']} daily files removed")
+    return 0
+
+
+def cmd_reports(args):
+    """Render the per-ticker and per-sector tear sheets whose data changed."""
+    from tunvesti import reports
+
+    tickers = args.tickers.split(',') if args.tickers else None
+    manifest = reports.build_reports(tickers=tickers, processes=args.processes, force=args.force)
+    print(f"✓ {len(manifest['rendered'])} tear sheets rendered, {len(manifest['skipped'])} unchanged "
+          f"({reports.REPORT_DIR / 'index.html'})")
+    return 0
+
+
+def cmd_liquidity(args):
+    """Screen tickers on the rolling liquidity measures saved by script 03."""
+    import pandas as pd
+    from tunvesti import liquidity
+
+    liquid = liquidity.screen(max_zero_ratio=args.max_zero_ratio, max_amihud=args.max_amihud,
+                              min_turnover_pct=args.min_turnover, max_cs_spread_pct=args.max_spread,
+                              sort=args.sort)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(liquid.drop(columns='date').round(4).to_string(index=False))
+    if len(liquid):
+        print(f"\n{len(liquid)} tickers, {int(liquidity.load_state()['window'])} sessions "
+              f"ending {liquid['date'].iloc[0].date()}")
+    return 0
+
+
+def cmd_serve(args):
+    """Run the local read-only HTTP query API."""
+    import logging
+    from tunvesti import server
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    server.serve(args.host, args.port)
+    return 0
+
+
+# ============================================================================
+# PARSER
+# ============================================================================
+
+def build_parser():
+    """Build the argparse parser (no heavy imports here)."""
+    parser = argparse.ArgumentParser(
+        prog='tunvesti',
+        description='TUNVESTI - BVMT data pipeline and analytics'
+    )
+    parser.add_argument('--version', action='version', version=f'%(prog)s {__version__}')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    subparsers.required = True
+
+    script_help = {
+        'check': 'Verify dependencies, directories and connectivity (00)',
+        'load': 'Load Kaggle historical data (01)',
+        'scrape': 'Scrape daily quotes from Ilboursa (02)',
+        'merge': 'Merge and enrich data into the star schema (03)',
+        'schedule': 'Run the automated daily update scheduler (04)',
+    }
+    for name, help_text in script_help.items():
+        sub = subparsers.add_parser(name, help=help_text, description=help_text)
+        sub.set_defaults(func=cmd_script)
+        if name == 'scrape':
+            sub.add_argument('--intraday', action='store_true',
+                             help='Poll during the trading session and write 5/15/60-minute bars')
+            sub.add_argument('--interval', type=int, default=5, help='Minutes between intraday polls (default: 5)')
+            sub.add_argument('--tickers', help='Comma-separated tickers to poll intraday (default: all)')
+
+    query = subparsers.add_parser('query', help='Query the star schema with SQL',
+                                  description='Run SQL against fact_stock_daily, dim_date and dim_stock '
+                                              '(DuckDB over the output files), or filter the fact table')
+    query.add_argument('--sql', help='Ad-hoc SQL statement')
+    query.add_argument('--saved', help='Name of a saved query (see --list)')
+    query.add_argument('--list', action='store_true', help='List saved queries')
+    query.add_argument('--max-rows', type=int, default=40, help='Rows to display')
+    query.add_argument('--ticker', help='Ticker symbol, e.g. SFBT')
+    query.add_argument('--start', help='First date (YYYY-MM-DD)')
+    query.add_argument('--end', help='Last date (YYYY-MM-DD)')
+    query.add_argument('--columns', help='Comma-separated columns to return')
+    query.add_argument('--limit', type=int, default=20, help='Show only the last N rows (0 = all)')
+    query.set_defaults(func=cmd_query)
+
+    snaps = subparsers.add_parser('snapshots', help='List, roll back or clean up output snapshots',
+                                  description='Manage the versioned snapshots of the star schema in output/snapshots')
+    snaps.add_argument('--rollback', metavar='VERSION', help='Make an existing snapshot current')
+    snaps.add_argument('--gc', action='store_true', help='Delete snapshots outside the retention policy')
+    snaps.add_argument('--keep', type=int, default=7, help='Always keep the newest N snapshots (default: 7)')
+    snaps.add_argument('--keep-days', type=int, default=30, help='Keep snapshots younger than N days (default: 30)')
+    snaps.set_defaults(func=cmd_snapshots)
+
+    feed = subparsers.add_parser('feed', help='Run or listen to the live quote feed',
+                                 description='Local publish/subscribe feed of quotes parsed by the scraper')
+    feed.add_argument('--listen', action='store_true', help='Subscribe and print messages instead of running the broker')
+    feed.add_argument('--topics', help="Comma-separated topics to receive ('quote', 'tick'; default: all)")
+    feed.add_argument('--tickers', help='Comma-separated tickers to receive (default: all)')
+    feed.add_argument('--replay', action='store_true', help='Start with the last message per ticker')
+    feed.add_argument('--host', default='127.0.0.1', help='Broker address (default: 127.0.0.1)')
+    feed.add_argument('--port', type=int, default=8766, help='Broker port (default: 8766)')
+    feed.set_defaults(func=cmd_feed)
+
+    compact = subparsers.add_parser('compact', help='Compact daily scrape files into monthly segments',
+                                    description='Merge output/daily_updates/*.csv into one columnar file per month')
+    compact.add_argument('--remove-sources', action='store_true',
+                         help='Delete the daily files of closed months once they are in a segment')
+    compact.set_defaults(func=cmd_compact)
+
+    report = subparsers.add_parser('reports', help='Render tear sheets for every ticker and sector',
+                                   description='Render PNG/HTML tear sheets in output/reports (changed data only)')
+    report.add_argument('--force', action='store_true', help='Redraw every sheet, changed or not')
+    report.add_argument('--processes', type=int, help='Worker processes (default: CPU count)')
+    report.add_argument('--tickers', help='Comma-separated tickers to render (default: all)')
+    report.set_defaults(func=cmd_reports)
+
+    liquid = subparsers.add_parser('liquidity', help='Screen tickers on rolling liquidity measures',
+                                   description='Zero-volume ratio, Amihud illiquidity, turnover and high-low '
+                                               'spread estimates over the last sessions (output/state/liquidity.npz)')
+    liquid.add_argument('--max-zero-ratio', type=float, help='Largest share of sessions without a trade (0-1)')
+    liquid.add_argument('--max-amihud', type=float, help='Largest Amihud illiquidity (|return| per million TND)')
+    liquid.add_argument('--min-turnover', type=float, help='Smallest mean daily turnover, %% of shares')
+    liquid.add_argument('--max-spread', type=float, help='Largest Corwin-Schultz spread estimate, %%')
+    liquid.add_argument('--sort', default='amihud', help='Measure to rank by (default: amihud)')
+    liquid.set_defaults(func=cmd_liquidity)
+
+    serve = subparsers.add_parser('serve', help='Run the local HTTP query API',
+                                  description='Serve ticker series, sector aggregates and snapshots over HTTP')
+    serve.add_argument('--host', default='127.0.0.1', help='Bind address (default: 127.0.0.1)')
+    serve.add_argument('--port', type=int, default=8765, help='Port (default: 8765)')
+    serve.set_defaults(func=cmd_serve)
+
+    return parser
+
+
+def main(argv=None):
+    """CLI entry point."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,31 @@
+"""
+TUNVESTI - Project paths
+Single source of truth for the directories used by the scripts and modules.
+Only standard-library imports are allowed here.
+"""
+
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+SCRIPTS_DIR = BASE_DIR / 'scripts'
+DATA_DIR = BASE_DIR / 'data'
+OUTPUT_DIR = BASE_DIR / 'output'
+DAILY_UPDATES_DIR = OUTPUT_DIR / 'daily_updates'
+
+# Pipeline scripts, keyed by CLI subcommand
+SCRIPTS = {
+    'check': SCRIPTS_DIR / '00_system_check.py',
+    'load': SCRIPTS_DIR / '01_load_kaggle_data.py',
+    'scrape': SCRIPTS_DIR / '02_scrape_ilboursa_daily.py',
+    'merge': SCRIPTS_DIR / '03_merge_and_enrich_data.py',
+    'schedule': SCRIPTS_DIR / '04_scheduler.py',
+}
+
+# Star schema outputs of script 03
+FACT_TABLE = OUTPUT_DIR / 'fact_stock_daily.csv'
+DIM_DATE = OUTPUT_DIR / 'dim_date.csv'
+DIM_STOCK = OUTPUT_DIR / 'dim_stock.csv'
+FACT_MARKET = OUTPUT_DIR / 'fact_market_daily.csv'
+
+# Corporate actions (ex-dates of dividends, splits, bonus issues)
+CORPORATE_ACTIONS = DATA_DIR / 'corporate_actions.csv'
@@ -0,0 +1,277 @@
+"""
+TUNVESTI - Precomputed aggregate cube
+Materialized rollups of the fact table for dashboards, so that "average
+return by sector", "top volatility stocks" or "market vs stock" visuals read
+a few kilobytes instead of scanning fact_stock_daily.
+
+Rollups (output/cube/<name>.csv):
+    sector_month   sector, year, month
+    ticker_month   ticker, year, month
+    ticker_year    ticker, year
+    date           date (market-wide cross-section)
+
+Each rollup stores additive partial aggregates (counts, sums, sums of
+squares, maxima, last values) next to the derived metrics, so the groups of
+a month can be replaced without touching the rest of the rollup.
+
+refresh_cube() keeps a content hash per month of the fact columns feeding
+the cube (and of each row's sector). A run recomputes only the months whose
+hash changed - the current month on a daily run, or a corrected historical
+month - and the years containing them for ticker_year.
+"""
+
+import hashlib
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+CUBE_DIR = config.OUTPUT_DIR / 'cube'
+MANIFEST_FILE = 'manifest.json'
+# Bump when the definition of a fact metric feeding the cube changes, so
+# existing cubes are rebuilt instead of extended (2: point-in-time dividend yield,
+# 3: TUNINDEX moved to fact_market_daily)
+CUBE_VERSION = 3
+
+ROLLUPS = {
+    'sector_month': ['sector', 'year', 'month'],
+    'ticker_month': ['ticker', 'year', 'month'],
+    'ticker_year': ['ticker', 'year'],
+    'date': ['date'],
+}
+
+# Fact columns the rollups read (hashed per month)
+INPUT_COLUMNS = ('close', 'volume', 'daily_return_pct', 'volatility_30d', 'dividend_yield_pct')
+
+# Partial aggregate -> how the rows of a group are aggregated
+PARTIALS = {
+    'n_rows': 'sum',
+    'n_return': 'sum',
+    'sum_return': 'sum',
+    'sum_sq_return': 'sum',
+    'sum_log_return': 'sum',
+    'sum_volume': 'sum',
+    'n_volatility': 'sum',
+    'sum_volatility': 'sum',
+    'n_div_yield': 'sum',
+    'sum_div_yield': 'sum',
+    'max_div_yield': 'max',
+    'last_date': 'max',
+}
+
+
+# ============================================================================
+# PARTIAL AGGREGATES
+# ============================================================================
+
+def _prepare(fact, dim_stock):
+    """Add rollup keys and per-row partial inputs to a slice of the fact table."""
+    df = fact.copy()
+    df['date'] = pd.to_datetime(df['date'])
+    if 'sector' not in df.columns:
+        sectors = dim_stock[['ticker', 'sector']].drop_duplicates('ticker') if dim_stock is not None else None
+        if sectors is not None:
+            df = df.merge(sectors, on='ticker', how='left')
+        else:
+            df['sector'] = np.nan
+    df['sector'] = df['sector'].fillna('Unclassified')
+    df['year'] = df['date'].dt.year
+    df['month'] = df['date'].dt.month
+
+    ret = df['daily_return_pct']
+    df['n_rows'] = 1
+    df['n_return'] = ret.notna().astype(int)
+    df['sum_return'] = ret.fillna(0)
+    df['sum_sq_return'] = ret.fillna(0) ** 2
+    # Clip at -99.99% so a bad print can never hit log(0)
+    df['sum_log_return'] = np.log1p((ret.fillna(0) / 100).clip(lower=-0.9999))
+    df['sum_volume'] = df['volume'].fillna(0)
+    df['n_volatility'] = df['volatility_30d'].notna().astype(int)
+    df['sum_volatility'] = df['volatility_30d'].fillna(0)
+    div_yield = df['dividend_yield_pct'] if 'dividend_yield_pct' in df.columns else pd.Series(0.0, index=df.index)
+    df['n_div_yield'] = (div_yield > 0).astype(int)
+    df['sum_div_yield'] = div_yield.where(div_yield > 0, 0)
+    df['max_div_yield'] = div_yield.fillna(0)
+    df['last_date'] = df['date']
+    return df
+
+
+def _aggregate(df, keys):
+    """Group prepared rows into partial aggregates for one rollup."""
+    partials = df.groupby(keys, sort=False).agg(PARTIALS)
+
+    # Closing level at the end of each ticker group
+    if 'ticker' in keys:
+        partials['last_close'] = df.sort_values('date').groupby(keys, sort=False)['close'].last()
+
+    return partials.reset_index()
+
+
+def _derive(partials, keys):
+    """Compute dashboard metrics from partial aggregates."""
+    df = partials.copy()
+    n_ret = df['n_return'].replace(0, np.nan)
+    df['avg_daily_return_pct'] = df['sum_return'] / n_ret
+    variance = (df['sum_sq_return'] - df['sum_return'] ** 2 / n_ret) / (n_ret - 1)
+    df['realized_volatility_pct'] = np.sqrt(variance.clip(lower=0)) * np.sqrt(252)
+    if 'ticker' in keys:
+        # Compounded period return only makes sense along a single ticker
+        df['period_return_pct'] = np.expm1(df['sum_log_return']) * 100
+    df['avg_volume'] = df['sum_volume'] / df['n_rows']
+    df['total_volume'] = df['sum_volume']
+    df['avg_volatility_30d'] = df['sum_volatility'] / df['n_volatility'].replace(0, np.nan)
+    df['avg_dividend_yield_pct'] = df['sum_div_yield'] / df['n_div_yield'].replace(0, np.nan)
+    df['max_dividend_yield_pct'] = df['max_div_yield']
+    return df.sort_values(keys).reset_index(drop=True)
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def build_cube(fact, dim_stock=None):
+    """
+    Build every rollup from the full fact table.
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily (may already carry 'sector')
+    dim_stock (pd.DataFrame): Stock dimension, used for sector lookup
+
+    Returns:
+    dict: rollup name -> DataFrame (partials + derived metrics)
+    """
+    prepared = _prepare(fact, dim_stock)
+    return {name: _derive(_aggregate(prepared, keys), keys) for name, keys in ROLLUPS.items()}
+
+
+# ============================================================================
+# PERSISTENCE
+# ============================================================================
+
+def save_cube(cube, watermark, fact_rows, cube_dir=None, months=None):
+    """Write rollups and the manifest (watermark = last date folded in, months = month hashes)."""
+    cube_dir = cube_dir or CUBE_DIR
+    cube_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in cube.items():
+        df.to_csv(cube_dir / f'{name}.csv', index=False, float_format='%.10g')
+    manifest = {
+        'version': CUBE_VERSION,
+        'watermark': str(pd.Timestamp(watermark).date()),
+        'fact_rows': int(fact_rows),
+        'rollups': {name: len(df) for name, df in cube.items()},
+        'months': months or {},
+    }
+    (cube_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_manifest(cube_dir=None):
+    """Return the cube manifest, or None if no cube has been built."""
+    path = (cube_dir or CUBE_DIR) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def load_cube(cube_dir=None):
+    """Load all rollups from disk."""
+    cube_dir = cube_dir or CUBE_DIR
+    cube = {}
+    for name, keys in ROLLUPS.items():
+        date_cols = ['last_date'] + (['date'] if 'date' in keys else [])
+        cube[name] = pd.read_csv(cube_dir / f'{name}.csv', parse_dates=date_cols)
+    return cube
+
+
+def month_hashes(fact, dim_stock=None):
+    """Content hash of the cube inputs per month ('YYYY-MM' -> sha1; row order ignored)."""
+    columns = ['ticker'] + [c for c in INPUT_COLUMNS if c in fact.columns]
+    df = fact[columns].assign(date=pd.to_datetime(fact['date']).to_numpy())
+    if 'sector' in fact.columns:
+        df['sector'] = fact['sector'].fillna('Unclassified').to_numpy()
+    elif dim_stock is not None:
+        sectors = dim_stock.drop_duplicates('ticker').set_index('ticker')['sector']
+        df['sector'] = df['ticker'].map(sectors).fillna('Unclassified')
+    df = df.sort_values(['date', 'ticker'], kind='stable')
+
+    rows = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    months, starts = np.unique(df['date'].to_numpy().astype('datetime64[M]'), return_index=True)
+    header = json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode()
+    hashes = {}
+    for month, lo, hi in zip(months, starts, np.append(starts[1:], len(df))):
+        digest = hashlib.sha1(header)
+        digest.update(rows[lo:hi].tobytes())
+        hashes[str(month)] = digest.hexdigest()
+    return hashes
+
+
+def recompute_months(cube, fact, months, dim_stock=None):
+    """
+    Replace the groups of the given months (and of their years in
+    ticker_year) with aggregates of the current fact rows.
+
+    Returns:
+    dict: Updated cube
+    """
+    dates = pd.to_datetime(fact['date'])
+    years = sorted({int(month[:4]) for month in months})
+    in_months = np.isin(dates.to_numpy().astype('datetime64[M]'), np.array(months, dtype='datetime64[M]'))
+    by_month = _prepare(fact[in_months], dim_stock)
+    by_year = _prepare(fact[dates.dt.year.isin(years).to_numpy()], dim_stock)
+
+    updated = {}
+    for name, keys in ROLLUPS.items():
+        old = cube[name]
+        if 'month' in keys:
+            stale = (old['year'].astype(int).astype(str) + '-' + old['month'].astype(int).map('{:02d}'.format)).isin(months)
+        elif 'date' in keys:
+            stale = pd.to_datetime(old['date']).dt.strftime('%Y-%m').isin(months)
+        else:
+            stale = old['year'].astype(int).isin(years)
+        rows = by_year if 'month' not in keys and 'date' not in keys else by_month
+        partial_cols = keys + [c for c in old.columns if c in PARTIALS or c.startswith('last_')]
+        kept = old.loc[~stale.to_numpy(), partial_cols]
+        # A month with no rows left (all deleted) only loses its groups
+        fresh = _aggregate(rows, keys) if len(rows) else kept.iloc[0:0]
+        updated[name] = _derive(pd.concat([kept, fresh], ignore_index=True), keys)
+    return updated
+
+
+def refresh_cube(fact, dim_stock=None, cube_dir=None):
+    """
+    Bring the on-disk cube up to date with the fact table.
+
+    Months whose content hash differs from the manifest (new, corrected or
+    removed) are recomputed from the fact rows and replace their groups;
+    the cube is rebuilt from scratch without a manifest of the current
+    version.
+
+    Returns:
+    dict: The saved manifest, plus 'mode' ('incremental', 'rebuild',
+          'unchanged') and 'recomputed' (months recomputed)
+    """
+    cube_dir = cube_dir or CUBE_DIR
+    latest = pd.to_datetime(fact['date']).max()
+    hashes = month_hashes(fact, dim_stock)
+    manifest = load_manifest(cube_dir)
+
+    mode, changed = 'rebuild', sorted(hashes)
+    if manifest is not None and manifest.get('version', 1) == CUBE_VERSION and manifest.get('months'):
+        stored = manifest['months']
+        changed = sorted(m for m in set(hashes) | set(stored) if hashes.get(m) != stored.get(m))
+        mode = 'incremental' if changed else 'unchanged'
+
+    if mode == 'unchanged':
+        return dict(manifest, mode=mode, recomputed=[])
+    if mode == 'incremental':
+        cube = recompute_months(load_cube(cube_dir), fact, changed, dim_stock)
+    else:
+        cube = build_cube(fact, dim_stock)
+
+    manifest = save_cube(cube, latest, len(fact), cube_dir, months=hashes)
+    return dict(manifest, mode=mode, recomputed=changed)
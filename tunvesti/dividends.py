@@ -0,0 +1,107 @@
+"""
+TUNVESTI - Point-in-time dividend metrics
+Trailing-12-month (TTM) dividend per share and dividend yield that only use
+dividends already detached on each trading day.
+
+Dividend events are dated by their ex-date: cash_dividend rows of
+data/corporate_actions.csv when present, otherwise the annual amount from
+the dividends file is dated at ASSUMED_EX_MONTH_DAY of its year (BVMT
+dividends are mostly detached after the spring general meetings).
+
+TTM is the difference of two as-of lookups into the per-ticker cumulative
+dividend: cum(date) - cum(date - 365 days). Both lookups are sorted
+merge_asof joins, so the cost is one sort plus a linear merge, and a row's
+value depends only on events up to its own date - appending new days never
+changes existing rows.
+
+Usage:
+    from tunvesti.dividends import dividend_events, ttm_dividend, dividend_yield
+    events = dividend_events(dividends_df)
+    df['dividend_ttm'] = ttm_dividend(df, events)       # when merging
+    df['dividend_yield_pct'] = dividend_yield(df)       # when deriving metrics
+"""
+
+import numpy as np
+import pandas as pd
+
+# Ex-date used for annual dividends without a recorded corporate action
+ASSUMED_EX_MONTH_DAY = '06-30'
+TTM_DAYS = 365
+
+
+def dividend_events(dividends, actions=None):
+    """
+    Dated dividend events, one row per (ticker, ex_date).
+
+    Parameters:
+    dividends (pd.DataFrame): ticker, year, dividend_per_share (annual amounts)
+    actions (pd.DataFrame): Corporate actions (tunvesti.adjust.load_actions());
+        their cash_dividend rows replace the annual amount of the same ticker-year
+
+    Returns:
+    pd.DataFrame: ticker, ex_date, dividend (sorted by ex_date)
+    """
+    events = pd.DataFrame(columns=['ticker', 'ex_date', 'dividend'])
+    if dividends is not None and len(dividends):
+        annual = dividends[['ticker', 'year', 'dividend_per_share']].dropna()
+        annual = annual[annual['dividend_per_share'] > 0]
+        events = pd.DataFrame({
+            'ticker': annual['ticker'].str.upper(),
+            'ex_date': pd.to_datetime(annual['year'].astype(int).astype(str) + '-' + ASSUMED_EX_MONTH_DAY),
+            'dividend': annual['dividend_per_share'].astype(np.float64),
+        }).drop_duplicates(['ticker', 'ex_date'])
+
+    if actions is not None and len(actions):
+        cash = actions[actions['action'] == 'cash_dividend']
+        dated = pd.DataFrame({'ticker': cash['ticker'], 'ex_date': cash['ex_date'],
+                              'dividend': cash['value'].astype(np.float64)})
+        recorded = set(zip(dated['ticker'], dated['ex_date'].dt.year))
+        keep = [(t, d.year) not in recorded for t, d in zip(events['ticker'], events['ex_date'])]
+        events = pd.concat([events[keep], dated], ignore_index=True)
+
+    events['ex_date'] = pd.to_datetime(events['ex_date'])
+    events['dividend'] = events['dividend'].astype(np.float64)
+    return events.sort_values(['ex_date', 'ticker']).reset_index(drop=True)
+
+
+def _cumulative_asof(rows, events, on):
+    """Cumulative dividend per ticker as of each date in rows[on] (0 before the first event)."""
+    lookup = rows[['ticker', on]].assign(row=np.arange(len(rows))).sort_values(on)
+    matched = pd.merge_asof(lookup, events[['ticker', 'ex_date', 'cum_dividend']],
+                            left_on=on, right_on='ex_date', by='ticker', direction='backward')
+    out = np.zeros(len(rows))
+    out[matched['row'].to_numpy()] = matched['cum_dividend'].fillna(0.0).to_numpy()
+    return out
+
+
+def ttm_dividend(rows, events, days=TTM_DAYS):
+    """
+    Trailing dividend per share for each (ticker, date) row.
+
+    Parameters:
+    rows (pd.DataFrame): ticker, date (any order; e.g. only newly appended days)
+    events (pd.DataFrame): Output of dividend_events()
+
+    Returns:
+    np.ndarray: Dividends with ex_date in (date - days, date], aligned to rows
+    """
+    if not len(events):
+        return np.zeros(len(rows))
+    events = events.sort_values(['ticker', 'ex_date'])
+    events = events.assign(cum_dividend=events.groupby('ticker')['dividend'].cumsum()).sort_values('ex_date')
+    rows = pd.DataFrame({'ticker': rows['ticker'].str.upper().to_numpy(),
+                         'date': pd.to_datetime(rows['date']).to_numpy()})
+    rows['window_start'] = rows['date'] - pd.Timedelta(days=days)
+    return _cumulative_asof(rows, events, 'date') - _cumulative_asof(rows, events, 'window_start')
+
+
+def dividend_yield(df):
+    """
+    Dividend yield (%) on the TTM dividend: dividend_ttm / close x 100, 0
+    without a trailing dividend or a positive close.
+
+    Returns:
+    np.ndarray: Aligned to the rows of df (needs dividend_ttm and close)
+    """
+    valid = (df['dividend_ttm'] > 0) & (df['close'] > 0)
+    return np.where(valid, df['dividend_ttm'] / df['close'].where(valid) * 100, 0.0)
@@ -0,0 +1,264 @@
+"""
+TUNVESTI - Local publish/subscribe feed for scraped quotes
+A small broker on 127.0.0.1 that fans out messages from the scraper to any
+number of local subscribers (dashboards, anomaly screens, indicator
+updates) over TCP with JSON-lines framing - one compact JSON object per
+line, TCP_NODELAY on every socket, so a quote reaches subscribers within
+milliseconds of being parsed. TCP on the loopback interface is used instead
+of Unix sockets so the feed also works on Windows.
+
+Protocol: a client sends one hello line, then
+    {"role": "publish"}                                   -> sends messages
+    {"role": "subscribe", "topics": ["quote"],            -> receives messages
+     "tickers": ["SFBT"], "replay": true}
+Messages: {"seq": 17, "topic": "quote", "time": 1718000000.123, "data": {...}}
+
+Topics published by script 02: 'quote' (daily scrape, one per ticker) and
+'tick' (intraday mode). With replay, a subscriber first receives the last
+message per (topic, ticker). Each subscriber has a bounded queue; a
+subscriber that falls SUBSCRIBER_QUEUE messages behind is disconnected
+rather than slowing down the others. Publishing never blocks or fails the
+scraper: without a broker, messages are dropped and the connection is
+retried every RETRY_SECONDS.
+
+Usage:
+    python -m tunvesti feed                     # run the broker
+    python -m tunvesti feed --listen            # print messages as they arrive
+
+    from tunvesti.feed import Publisher, subscribe
+    Publisher().publish('quote', {'Ticker': 'SFBT', 'Close': 12.5})
+    for message in subscribe(topics=['quote']):
+        print(message['data'])
+"""
+
+import json
+import logging
+import queue
+import socket
+import socketserver
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8766
+SUBSCRIBER_QUEUE = 10_000
+RETRY_SECONDS = 30
+CONNECT_TIMEOUT = 0.2
+
+
+def encode(message):
+    return (json.dumps(message, separators=(',', ':'), default=str) + '\n').encode()
+
+
+def _ticker(message):
+    data = message.get('data')
+    if isinstance(data, dict):
+        return data.get('ticker', data.get('Ticker'))
+    return None
+
+
+# ============================================================================
+# BROKER
+# ============================================================================
+
+class Broker:
+    """Fan-out of published messages to subscriber queues (thread-safe)."""
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.subscribers = {}
+        self.latest = {}
+        self.seq = 0
+        self._lock = threading.Lock()
+
+    def publish(self, message):
+        """Stamp and deliver one message; returns the number of subscribers reached."""
+        with self._lock:
+            self.seq += 1
+            message = {'seq': self.seq, 'topic': message.get('topic'),
+                       'time': message.get('time') or time.time(), 'data': message.get('data')}
+            self.latest[(message['topic'], _ticker(message))] = message
+            targets = list(self.subscribers.items())
+
+        line = encode(message)
+        delivered = 0
+        for inbox, wants in targets:
+            if not wants(message):
+                continue
+            try:
+                inbox.put_nowait(line)
+                delivered += 1
+            except queue.Full:
+                # Slow subscriber: its handler sees None and disconnects
+                self.unsubscribe(inbox)
+                logger.warning("Dropped a subscriber that fell behind")
+        return delivered
+
+    def subscribe(self, topics=None, tickers=None, replay=False):
+        """Register a subscriber; returns its queue of encoded lines (None = disconnect)."""
+        topics = set(topics) if topics else None
+        tickers = {t.upper() for t in tickers} if tickers else None
+
+        def wants(message):
+            if topics is not None and message['topic'] not in topics:
+                return False
+            return tickers is None or (_ticker(message) or '').upper() in tickers
+
+        inbox = queue.Queue(self.queue_size)
+        with self._lock:
+            if replay:
+                for message in sorted(self.latest.values(), key=lambda m: m['seq']):
+                    if wants(message):
+                        inbox.put_nowait(encode(message))
+            self.subscribers[inbox] = wants
+        return inbox
+
+    def unsubscribe(self, inbox):
+        with self._lock:
+            if self.subscribers.pop(inbox, None) is not None:
+                try:
+                    inbox.put_nowait(None)
+                except queue.Full:
+                    inbox.get_nowait()
+                    inbox.put_nowait(None)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    broker = None  # set by make_broker
+
+    def setup(self):
+        super().setup()
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        try:
+            hello = json.loads(self.rfile.readline() or b'{}')
+        except ValueError:
+            return
+        if hello.get('role') == 'publish':
+            for line in self.rfile:
+                try:
+                    self.broker.publish(json.loads(line))
+                except ValueError:
+                    logger.debug("Ignoring malformed message")
+        elif hello.get('role') == 'subscribe':
+            inbox = self.broker.subscribe(hello.get('topics'), hello.get('tickers'), hello.get('replay', False))
+            try:
+                while True:
+                    line = inbox.get()
+                    if line is None:
+                        break
+                    self.wfile.write(line)
+            except OSError:
+                pass
+            finally:
+                self.broker.unsubscribe(inbox)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+def make_broker(host=DEFAULT_HOST, port=DEFAULT_PORT, broker=None):
+    """Create (but do not start) the broker server; server.broker holds the Broker."""
+    broker = broker or Broker()
+    handler = type('BoundHandler', (_Handler,), {'broker': broker})
+    server = _Server((host, port), handler)
+    server.broker = broker
+    return server
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Run the broker until interrupted."""
+    server = make_broker(host, port)
+    logger.info(f"TUNVESTI quote feed listening on {host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Feed stopped by user")
+    finally:
+        server.server_close()
+
+
+# ============================================================================
+# CLIENTS
+# ============================================================================
+
+class Publisher:
+    """
+    Fire-and-forget publisher used by the scraper.
+
+    Connects lazily; if no broker is listening, messages are dropped and the
+    connection is retried after RETRY_SECONDS, so publishing costs a
+    sendall() at most and never raises.
+    """
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.address = (host, port)
+        self._sock = None
+        self._retry_at = 0.0
+        self.sent = 0
+        self.dropped = 0
+
+    def _connect(self):
+        if time.monotonic() < self._retry_at:
+            return None
+        try:
+            sock = socket.create_connection(self.address, timeout=CONNECT_TIMEOUT)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.sendall(encode({'role': 'publish'}))
+            self._sock = sock
+        except OSError:
+            self._retry_at = time.monotonic() + RETRY_SECONDS
+        return self._sock
+
+    def publish(self, topic, data):
+        sock = self._sock or self._connect()
+        if sock is None:
+            self.dropped += 1
+            return False
+        try:
+            sock.sendall(encode({'topic': topic, 'time': time.time(), 'data': data}))
+            self.sent += 1
+            return True
+        except OSError:
+            self.close()
+            self._retry_at = time.monotonic() + RETRY_SECONDS
+            self.dropped += 1
+            return False
+
+    def close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def subscribe(topics=None, tickers=None, replay=False, host=DEFAULT_HOST, port=DEFAULT_PORT, timeout=None):
+    """
+    Yield messages from the broker as they arrive.
+
+    Parameters:
+    topics (list): Topics to receive (default: all)
+    tickers (list): Only messages about these tickers (default: all)
+    replay (bool): Start with the last message per (topic, ticker)
+    timeout (float): Stop after this many seconds without a message (default: wait forever)
+
+    Yields:
+    dict: seq, topic, time, data
+    """
+    with socket.create_connection((host, port)) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(encode({'role': 'subscribe', 'topics': topics, 'tickers': tickers, 'replay': replay}))
+        sock.settimeout(timeout)
+        with sock.makefile('rb') as stream:
+            try:
+                for line in stream:
+                    yield json.loads(line)
+            except socket.timeout:
+                return
@@ -0,0 +1,331 @@
+"""
+TUNVESTI - Technical indicators
+Batched, vectorized indicator families computed per ticker over the fact
+table, plus an incremental path that folds one new trading day into a
+compact per-ticker state in O(tickers).
+
+Families (select any subset through a config dict):
+    sma         simple moving average of close          {'sma': [20, 50, 200]}
+    ema         exponential moving average of close     {'ema': [12, 26]}
+    rsi         Wilder relative strength index          {'rsi': [14]}
+    macd        MACD line, signal and histogram          {'macd': [(12, 26, 9)]}
+    bollinger   Bollinger bands (population std)         {'bollinger': [(20, 2.0)]}
+    atr         Wilder average true range from OHLC      {'atr': [14]}
+    obv         on-balance volume                        {'obv': True}
+    drawdown    % below running maximum close            {'drawdown': True}
+
+Usage:
+    from tunvesti.indicators import compute_indicators, build_state, update_indicators
+    ind = compute_indicators(fact, {'rsi': [14], 'sma': [50]})
+    state = build_state(fact, config)
+    new_values, state = update_indicators(state, today_rows)
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CONFIG = {
+    'sma': [20, 50, 200],
+    'ema': [12, 26],
+    'rsi': [14],
+    'macd': [(12, 26, 9)],
+    'bollinger': [(20, 2.0)],
+    'atr': [14],
+    'obv': True,
+    'drawdown': True,
+}
+
+
+def normalize_config(config):
+    """Fill defaults for families given as True and coerce tuples."""
+    if config is None:
+        config = DEFAULT_CONFIG
+    unknown = set(config) - set(DEFAULT_CONFIG)
+    if unknown:
+        raise ValueError(f"Unknown indicator families: {sorted(unknown)}")
+    normalized = {}
+    for family, params in config.items():
+        if params is True:
+            params = DEFAULT_CONFIG[family]
+        if not params:
+            continue
+        if family in ('macd', 'bollinger'):
+            params = [tuple(p) for p in params]
+        normalized[family] = params
+    return normalized
+
+
+def _buffer_width(config):
+    """Closes to keep per ticker for the rolling-window families."""
+    windows = list(config.get('sma', [])) + [w for w, _ in config.get('bollinger', [])]
+    return max(windows, default=1)
+
+
+def _ema_spans(config):
+    """Every EMA span needed by the 'ema' and 'macd' families."""
+    spans = set(config.get('ema', []))
+    for fast, slow, _ in config.get('macd', []):
+        spans.update([fast, slow])
+    return sorted(spans)
+
+
+def _rsi_value(avg_gain, avg_loss):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return 100 * avg_gain / (avg_gain + avg_loss)
+
+
+# ============================================================================
+# FULL HISTORY (vectorized over all tickers)
+# ============================================================================
+
+def _internals(fact, config):
+    """
+    Compute indicator outputs and the recursive internals they depend on.
+
+    Returns:
+    tuple: (sorted frame with date/ticker/close, outputs DataFrame, internals DataFrame)
+    """
+    cols = [c for c in ['date', 'ticker', 'high', 'low', 'close', 'volume'] if c in fact.columns]
+    df = fact[cols].sort_values(['ticker', 'date'], kind='stable')
+    g = df.groupby('ticker', sort=False)
+    close = df['close']
+    n_obs = g.cumcount() + 1
+
+    def rolling(series, window, func):
+        r = series.groupby(df['ticker'], sort=False).rolling(window, min_periods=window)
+        return getattr(r, func)(**({'ddof': 0} if func == 'std' else {})).reset_index(level=0, drop=True)
+
+    def ewm(series, alpha):
+        return (series.groupby(df['ticker'], sort=False)
+                .ewm(alpha=alpha, adjust=False, ignore_na=True).mean().reset_index(level=0, drop=True))
+
+    out = pd.DataFrame(index=df.index)
+    internals = pd.DataFrame(index=df.index)
+
+    for window in config.get('sma', []):
+        out[f'sma_{window}'] = rolling(close, window, 'mean')
+
+    for span in _ema_spans(config):
+        internals[f'ema_{span}'] = ewm(close, 2 / (span + 1))
+    for span in config.get('ema', []):
+        out[f'ema_{span}'] = internals[f'ema_{span}']
+
+    for fast, slow, signal in config.get('macd', []):
+        macd = internals[f'ema_{fast}'] - internals[f'ema_{slow}']
+        internals[f'macd_signal_{fast}_{slow}_{signal}'] = ewm(macd, 2 / (signal + 1))
+        out[f'macd_{fast}_{slow}'] = macd
+        out[f'macd_signal_{fast}_{slow}_{signal}'] = internals[f'macd_signal_{fast}_{slow}_{signal}']
+        out[f'macd_hist_{fast}_{slow}_{signal}'] = macd - internals[f'macd_signal_{fast}_{slow}_{signal}']
+
+    diff = g['close'].diff()
+    for window in config.get('rsi', []):
+        internals[f'rsi_gain_{window}'] = ewm(diff.clip(lower=0), 1 / window)
+        internals[f'rsi_loss_{window}'] = ewm((-diff).clip(lower=0), 1 / window)
+        rsi = _rsi_value(internals[f'rsi_gain_{window}'], internals[f'rsi_loss_{window}'])
+        out[f'rsi_{window}'] = rsi.where(n_obs > window)
+
+    for window, k in config.get('bollinger', []):
+        mid = rolling(close, window, 'mean')
+        std = rolling(close, window, 'std')
+        out[f'bb_upper_{window}'] = mid + k * std
+        out[f'bb_lower_{window}'] = mid - k * std
+        out[f'bb_width_{window}'] = (2 * k * std) / mid
+
+    if config.get('atr'):
+        prev_close = g['close'].shift()
+        true_range = np.fmax(df['high'] - df['low'],
+                             np.fmax((df['high'] - prev_close).abs(), (df['low'] - prev_close).abs()))
+        for window in config['atr']:
+            internals[f'atr_{window}'] = ewm(true_range, 1 / window)
+            out[f'atr_{window}'] = internals[f'atr_{window}'].where(n_obs >= window)
+
+    if config.get('obv'):
+        direction = np.sign(diff).fillna(0)
+        internals['obv'] = (direction * df['volume'].fillna(0)).groupby(df['ticker'], sort=False).cumsum()
+        out['obv'] = internals['obv']
+
+    if config.get('drawdown'):
+        internals['run_max'] = g['close'].cummax()
+        out['drawdown_pct'] = (close / internals['run_max'] - 1) * 100
+
+    internals['n_obs'] = n_obs
+    return df, out, internals
+
+
+def compute_indicators(fact, config=None):
+    """
+    Compute the selected indicator families for every ticker.
+
+    Parameters:
+    fact (pd.DataFrame): Rows with date, ticker, close (+ high/low/volume for atr/obv)
+    config (dict): Families to compute (see module docstring); defaults to all
+
+    Returns:
+    pd.DataFrame: date, ticker and one column per indicator, sorted by ticker/date
+    """
+    config = normalize_config(config)
+    df, out, _ = _internals(fact, config)
+    return pd.concat([df[['date', 'ticker']], out], axis=1).reset_index(drop=True)
+
+
+# ============================================================================
+# INCREMENTAL (one trading day at a time)
+# ============================================================================
+
+def build_state(fact, config=None):
+    """
+    Capture per-ticker state at the end of the history for incremental updates.
+
+    Returns:
+    dict: 'config', 'tickers' (array) and aligned NumPy arrays per state field;
+          'closes' is a (tickers x window) buffer of the most recent closes
+    """
+    config = normalize_config(config)
+    df, _, internals = _internals(fact, config)
+    last = pd.concat([df[['ticker', 'close']], internals], axis=1).groupby('ticker', sort=True).last()
+
+    width = _buffer_width(config)
+    closes = np.full((len(last), width), np.nan)
+    tail = df.groupby('ticker', sort=True)['close'].apply(lambda s: s.to_numpy()[-width:])
+    for i, values in enumerate(tail.reindex(last.index)):
+        closes[i, width - len(values):] = values
+
+    state = {'config': config, 'tickers': last.index.to_numpy(dtype=object), 'closes': closes,
+             'last_close': last['close'].to_numpy(dtype=float)}
+    for col in internals.columns:
+        state[col] = last[col].to_numpy(dtype=float)
+    return state
+
+
+def _add_tickers(state, tickers):
+    """Append empty state rows for tickers seen for the first time."""
+    new = [t for t in tickers if t not in set(state['tickers'])]
+    if not new:
+        return state
+    state = dict(state)
+    n = len(new)
+    for key, value in state.items():
+        if key == 'config':
+            continue
+        if key == 'tickers':
+            state[key] = np.concatenate([value, np.array(new, dtype=object)])
+        elif key == 'closes':
+            state[key] = np.vstack([value, np.full((n, value.shape[1]), np.nan)])
+        else:
+            fill = 0.0 if key == 'n_obs' else np.nan
+            state[key] = np.concatenate([value, np.full(n, fill)])
+    return state
+
+
+def update_indicators(state, day_rows):
+    """
+    Fold one trading day (at most one row per ticker) into the state.
+
+    Every operation is a vectorized NumPy expression over the tickers present
+    that day, so the cost is O(tickers) regardless of history length.
+
+    Parameters:
+    state (dict): From build_state / a previous update / load_state
+    day_rows (pd.DataFrame): date, ticker, close (+ high, low, volume)
+
+    Returns:
+    tuple: (DataFrame of indicator values for day_rows, updated state)
+    """
+    config = state['config']
+    state = _add_tickers(state, day_rows['ticker'].tolist())
+    state = {k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in state.items()}
+
+    position = pd.Index(state['tickers']).get_indexer(day_rows['ticker'])
+    close = day_rows['close'].to_numpy(dtype=float)
+    prev = state['last_close'][position]
+    first = np.isnan(prev)
+
+    n_obs = state['n_obs'][position] + 1
+    state['n_obs'][position] = n_obs
+    closes = state['closes']
+    closes[position] = np.roll(closes[position], -1, axis=1)
+    closes[position, -1] = close
+    out = {}
+
+    def ewm_step(key, value, alpha):
+        current = state[key][position]
+        value = np.where(np.isnan(value), current, value)
+        updated = np.where(np.isnan(current), value, (1 - alpha) * current + alpha * value)
+        state[key][position] = updated
+        return updated
+
+    window_vals = closes[position]
+    for window in config.get('sma', []):
+        mean = window_vals[:, -window:].mean(axis=1)
+        out[f'sma_{window}'] = np.where(n_obs >= window, mean, np.nan)
+
+    for span in _ema_spans(config):
+        ewm_step(f'ema_{span}', close, 2 / (span + 1))
+    for span in config.get('ema', []):
+        out[f'ema_{span}'] = state[f'ema_{span}'][position]
+
+    for fast, slow, signal in config.get('macd', []):
+        macd = state[f'ema_{fast}'][position] - state[f'ema_{slow}'][position]
+        sig = ewm_step(f'macd_signal_{fast}_{slow}_{signal}', macd, 2 / (signal + 1))
+        out[f'macd_{fast}_{slow}'] = macd
+        out[f'macd_signal_{fast}_{slow}_{signal}'] = sig
+        out[f'macd_hist_{fast}_{slow}_{signal}'] = macd - sig
+
+    diff = np.where(first, np.nan, close - prev)
+    for window in config.get('rsi', []):
+        gain = ewm_step(f'rsi_gain_{window}', np.where(first, np.nan, np.clip(diff, 0, None)), 1 / window)
+        loss = ewm_step(f'rsi_loss_{window}', np.where(first, np.nan, np.clip(-diff, 0, None)), 1 / window)
+        out[f'rsi_{window}'] = np.where(n_obs > window, _rsi_value(gain, loss), np.nan)
+
+    for window, k in config.get('bollinger', []):
+        mid = window_vals[:, -window:].mean(axis=1)
+        std = window_vals[:, -window:].std(axis=1)
+        valid = n_obs >= window
+        out[f'bb_upper_{window}'] = np.where(valid, mid + k * std, np.nan)
+        out[f'bb_lower_{window}'] = np.where(valid, mid - k * std, np.nan)
+        out[f'bb_width_{window}'] = np.where(valid, (2 * k * std) / mid, np.nan)
+
+    if config.get('atr'):
+        high = day_rows['high'].to_numpy(dtype=float)
+        low = day_rows['low'].to_numpy(dtype=float)
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - prev), np.abs(low - prev)))
+        for window in config['atr']:
+            atr = ewm_step(f'atr_{window}', true_range, 1 / window)
+            out[f'atr_{window}'] = np.where(n_obs >= window, atr, np.nan)
+
+    if config.get('obv'):
+        volume = day_rows['volume'].fillna(0).to_numpy(dtype=float)
+        obv = np.nan_to_num(state['obv'][position]) + np.nan_to_num(np.sign(diff)) * volume
+        state['obv'][position] = obv
+        out['obv'] = obv
+
+    if config.get('drawdown'):
+        run_max = np.fmax(state['run_max'][position], close)
+        state['run_max'][position] = run_max
+        out['drawdown_pct'] = (close / run_max - 1) * 100
+
+    state['last_close'][position] = close
+    values = pd.DataFrame(out, index=day_rows.index)
+    return pd.concat([day_rows[['date', 'ticker']], values], axis=1), state
+
+
+# ============================================================================
+# PERSISTENCE
+# ============================================================================
+
+def save_state(state, path):
+    """Persist the state as a compressed .npz (config stored as JSON)."""
+    arrays = {k: v for k, v in state.items() if k not in ('config', 'tickers')}
+    np.savez_compressed(path, tickers=state['tickers'].astype(str),
+                        config=np.array(json.dumps(state['config'])), **arrays)
+
+
+def load_state(path):
+    """Load a state written by save_state."""
+    with np.load(path, allow_pickle=False) as data:
+        state = {k: data[k] for k in data.files if k not in ('config', 'tickers')}
+        state['tickers'] = data['tickers'].astype(object)
+        state['config'] = normalize_config(json.loads(str(data['config'])))
+    return state
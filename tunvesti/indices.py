@@ -0,0 +1,345 @@
+"""
+TUNVESTI - Sector and custom index engine
+Cap-weighted and equal-weighted indices for every sector, for user-defined
+baskets and for the whole market (a reconstructed TUNINDEX), computed on the
+aligned (date x ticker) arrays of tunvesti.panel.
+
+Method (chain-linked, total return):
+    level(t) = level(t-1) * sum_i b_i(t-1) (1 + r_i(t)) / sum_i b_i(t-1)
+over the constituents of both t-1 and t, with b = market cap (cap-weighted)
+or 1 (equal-weighted, rebalanced daily). A ticker is a constituent from its
+first trading day until it has not traded for STALE_SESSIONS sessions;
+days without a trade count as a 0% return. The published divisor
+D(t) = sum_i b_i(t) / level(t) absorbs constituent changes, so entries and
+exits never move the level.
+
+Market caps: the scraper only records market_cap_m on recent days, so the
+share count implied by each known cap (cap / close) is carried forward, and
+back to the listing for earlier history, and multiplied by the split-adjusted
+close. Tickers without any known cap are left out of cap-weighted indices.
+
+All indices are computed at once as two matrix products over the date x
+ticker arrays. Updates are incremental: only the trading days after the
+stored watermark are computed (from a short tail of history) and chained
+onto the stored levels. The manifest keeps a content hash of the input
+columns up to the watermark, so any change to history (a corrected row, a
+new corporate action) triggers a full rebuild instead.
+
+Usage:
+    from tunvesti.indices import refresh_indices, compare_with_tunindex
+    levels, manifest = refresh_indices(fact, dim_stock, baskets={'BANKS5': {'tickers': [...]}})
+    compare_with_tunindex(levels, market)       # market = fact_market_daily
+"""
+
+import json
+import logging
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+from tunvesti.panel import wide_arrays
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = config.OUTPUT_DIR / 'indices'
+LEVELS_FILE = 'index_levels.csv'
+MANIFEST_FILE = 'manifest.json'
+# Bump when the index method changes, so stored levels are rebuilt
+INDEX_VERSION = 1
+BASE_LEVEL = 1000.0
+WEIGHTINGS = ('cap', 'equal')
+MARKET_INDEX = 'TUNINDEX_RECON'
+# A ticker leaves the indices after this many sessions without a trade
+STALE_SESSIONS = 60
+# Fact columns the levels depend on (hashed up to the watermark)
+INPUT_COLUMNS = ('total_return_pct', 'daily_return_pct', 'split_adj_close', 'close', 'market_cap_m')
+
+
+# ============================================================================
+# DEFINITIONS
+# ============================================================================
+
+def index_definitions(dim_stock=None, baskets=None):
+    """
+    All indices to compute: name -> {'tickers': [...], 'weighting': 'cap' | 'equal'}.
+
+    Sector indices exist in both weightings ('Financials', 'Financials (EW)'),
+    the market index is cap-weighted over every ticker (tickers=None), and
+    baskets are taken as given (weighting defaults to 'cap').
+    """
+    definitions = {MARKET_INDEX: {'tickers': None, 'weighting': 'cap'}}
+    if dim_stock is not None and 'sector' in dim_stock.columns:
+        sectors = dim_stock.dropna(subset=['sector']).groupby('sector')['ticker'].apply(sorted)
+        for sector, tickers in sectors.items():
+            definitions[sector] = {'tickers': tickers, 'weighting': 'cap'}
+            definitions[f'{sector} (EW)'] = {'tickers': tickers, 'weighting': 'equal'}
+    for name, basket in (baskets or {}).items():
+        weighting = basket.get('weighting', 'cap')
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Basket '{name}': unknown weighting '{weighting}' (use {', '.join(WEIGHTINGS)})")
+        definitions[name] = {'tickers': sorted(t.upper() for t in basket['tickers']), 'weighting': weighting}
+    return definitions
+
+
+def _membership(definitions, tickers):
+    """(tickers x indices) 0/1 matrix and the cap-weighted column mask."""
+    position = {ticker: j for j, ticker in enumerate(tickers)}
+    members = np.zeros((len(tickers), len(definitions)))
+    for k, definition in enumerate(definitions.values()):
+        if definition['tickers'] is None:
+            members[:, k] = 1.0
+        else:
+            members[[position[t] for t in definition['tickers'] if t in position], k] = 1.0
+    cap_weighted = np.array([d['weighting'] == 'cap' for d in definitions.values()])
+    return members, cap_weighted
+
+
+# ============================================================================
+# INPUTS
+# ============================================================================
+
+def share_counts(fact):
+    """Sparse share counts (millions) implied by every row with a known market cap."""
+    known = fact.dropna(subset=['market_cap_m', 'close'])
+    known = known[(known['market_cap_m'] > 0) & (known['close'] > 0)]
+    return pd.DataFrame({'date': pd.to_datetime(known['date']).to_numpy(), 'ticker': known['ticker'].to_numpy(),
+                         'shares': (known['market_cap_m'] / known['close']).to_numpy()})
+
+
+def point_in_time_shares(shares, dates, tickers):
+    """
+    (dates x tickers) share counts: the last known on or before each date,
+    the first known before that; NaN for tickers without any known cap.
+    """
+    wide_shares = (shares.drop_duplicates(['date', 'ticker'], keep='last')
+                   .pivot(index='date', columns='ticker', values='shares')
+                   .reindex(columns=tickers))
+    on_dates = wide_shares.reindex(wide_shares.index.union(dates)).ffill().bfill().reindex(dates)
+    return on_dates.to_numpy()
+
+
+def index_inputs(fact, shares=None, stale_sessions=STALE_SESSIONS):
+    """
+    Aligned arrays for the index computation.
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily rows (any date range)
+    shares (pd.DataFrame): Output of share_counts() over the full history
+        (defaults to the rows of fact)
+
+    Returns:
+    dict: dates, tickers, returns (%; 0 on days without a trade),
+          caps (NaN where unknown), listed (bool constituent mask)
+    """
+    value = 'total_return_pct' if 'total_return_pct' in fact.columns else 'daily_return_pct'
+    price = 'split_adj_close' if 'split_adj_close' in fact.columns else 'close'
+    dates, tickers, arrays = wide_arrays(fact, [value, price])
+    traded = arrays['mask']
+
+    # Constituent: has traded within the last stale_sessions sessions (including today)
+    rows = np.where(traded, np.arange(len(dates))[:, None], -1)
+    last_trade = np.maximum.accumulate(rows, axis=0)
+    listed = (last_trade >= 0) & (np.arange(len(dates))[:, None] - last_trade < stale_sessions)
+
+    prices = pd.DataFrame(arrays[price]).ffill().to_numpy()
+    shares = share_counts(fact) if shares is None else shares
+    caps = prices * point_in_time_shares(shares, dates, tickers)
+
+    returns = np.nan_to_num(arrays[value])
+    return {'dates': dates, 'tickers': tickers, 'returns': returns, 'caps': caps, 'listed': listed}
+
+
+# ============================================================================
+# COMPUTATION
+# ============================================================================
+
+def index_ratios(inputs, definitions):
+    """
+    Daily level ratios, divisor numerators and constituent counts for every index.
+
+    Returns:
+    tuple: (ratios, basis, constituents), each (dates x indices); the first
+           row's ratio is 1
+    """
+    members, cap_weighted = _membership(definitions, inputs['tickers'])
+    listed = inputs['listed']
+    caps = np.where(listed, inputs['caps'], np.nan)
+    has_cap = np.isfinite(caps)
+
+    growth = 1 + inputs['returns'] / 100
+    both = np.zeros_like(listed)
+    both[1:] = listed[1:] & listed[:-1]
+    cap_prev = np.zeros_like(caps)
+    cap_prev[1:] = np.where(both[1:] & has_cap[:-1], caps[:-1], 0.0)
+    equal_prev = both.astype(np.float64)
+
+    cap_members = members * cap_weighted
+    equal_members = members * ~cap_weighted
+    numerator = (cap_prev * growth) @ cap_members + (equal_prev * growth) @ equal_members
+    denominator = cap_prev @ cap_members + equal_prev @ equal_members
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ratios = np.where(denominator > 0, numerator / denominator, 1.0)
+    ratios[0] = 1.0
+
+    basis = np.nan_to_num(np.where(has_cap, caps, 0.0)) @ cap_members + listed.astype(np.float64) @ equal_members
+    constituents = (listed & has_cap).astype(np.float64) @ cap_members + listed.astype(np.float64) @ equal_members
+    return ratios, basis, constituents
+
+
+def _long_levels(dates, definitions, levels, basis, constituents):
+    names = list(definitions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        divisor = np.where(levels > 0, basis / levels, np.nan)
+    frame = pd.DataFrame({
+        'date': np.repeat(dates.values, len(names)),
+        'index': np.tile(names, len(dates)),
+        'weighting': np.tile([definitions[n]['weighting'] for n in names], len(dates)),
+        'level': levels.ravel(),
+        'divisor': divisor.ravel(),
+        'constituents': constituents.ravel().astype(int),
+    })
+    # Drop the rows before an index has any constituent
+    started = np.maximum.accumulate(constituents > 0, axis=0).ravel()
+    return frame[started].reset_index(drop=True)
+
+
+def compute_indices(fact, dim_stock=None, baskets=None, base_level=BASE_LEVEL):
+    """
+    Full history of every index (levels start at base_level on each index's first day).
+
+    Returns:
+    pd.DataFrame: date, index, weighting, level, divisor, constituents
+    """
+    definitions = index_definitions(dim_stock, baskets)
+    inputs = index_inputs(fact)
+    ratios, basis, constituents = index_ratios(inputs, definitions)
+    # An index's chain starts on its first day with constituents
+    started = np.maximum.accumulate(constituents > 0, axis=0)
+    levels = base_level * np.cumprod(np.where(started, ratios, 1.0), axis=0)
+    return _long_levels(inputs['dates'], definitions, levels, basis, constituents)
+
+
+# ============================================================================
+# PERSISTENCE / INCREMENTAL REFRESH
+# ============================================================================
+
+def load_levels(index_dir=None):
+    """Stored levels and manifest, or (None, None)."""
+    index_dir = index_dir or INDEX_DIR
+    if not (index_dir / MANIFEST_FILE).exists() or not (index_dir / LEVELS_FILE).exists():
+        return None, None
+    levels = pd.read_csv(index_dir / LEVELS_FILE, parse_dates=['date'])
+    return levels, json.loads((index_dir / MANIFEST_FILE).read_text())
+
+
+def save_levels(levels, manifest, index_dir=None):
+    index_dir = index_dir or INDEX_DIR
+    index_dir.mkdir(parents=True, exist_ok=True)
+    levels.to_csv(index_dir / LEVELS_FILE, index=False, float_format='%.10g')
+    (index_dir / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+
+
+def history_hash(fact, dates, watermark):
+    """Content hash of the index inputs of the fact rows up to the watermark (row order ignored)."""
+    from tunvesti.snapshots import content_hash
+
+    upto = (dates <= watermark).to_numpy()
+    columns = ['ticker'] + [c for c in INPUT_COLUMNS if c in fact.columns]
+    rows = fact.loc[upto, columns].assign(date=dates[upto].to_numpy())
+    return content_hash(rows.sort_values(['date', 'ticker'], kind='stable')[['date'] + columns])
+
+
+def refresh_indices(fact, dim_stock=None, baskets=None, index_dir=None):
+    """
+    Bring the stored index levels up to date with the fact table.
+
+    If the fact rows up to the watermark are unchanged (same content hash of
+    INPUT_COLUMNS) and the index definitions and version match, only the new trading days are
+    computed - from the last STALE_SESSIONS sessions of history - and
+    chained onto the stored levels; otherwise everything is rebuilt.
+
+    Returns:
+    tuple: (levels DataFrame, manifest dict plus 'mode')
+    """
+    index_dir = index_dir or INDEX_DIR
+    definitions = index_definitions(dim_stock, baskets)
+    dates = pd.to_datetime(fact['date'])
+    latest = dates.max()
+    stored, manifest = load_levels(index_dir)
+
+    mode = 'rebuild'
+    if (manifest is not None and manifest.get('version') == INDEX_VERSION
+            and manifest.get('definitions') == definitions):
+        watermark = pd.Timestamp(manifest['watermark'])
+        if watermark <= latest and manifest.get('fact_hash') == history_hash(fact, dates, watermark):
+            mode = 'incremental' if latest > watermark else 'unchanged'
+
+    if mode == 'unchanged':
+        return stored, dict(manifest, mode=mode)
+
+    if mode == 'incremental':
+        sessions = np.sort(dates.unique())
+        watermark_row = sessions.searchsorted(watermark.to_datetime64())
+        tail_start = sessions[max(watermark_row - STALE_SESSIONS, 0)]
+        inputs = index_inputs(fact[dates >= tail_start], shares=share_counts(fact))
+        ratios, basis, constituents = index_ratios(inputs, definitions)
+
+        last = stored[stored['date'] == watermark].set_index('index')['level'].reindex(list(definitions))
+        new = inputs['dates'] > watermark
+        # Indices without constituents at the watermark start at the base level
+        start = np.where(last.notna(), last.to_numpy(), BASE_LEVEL)
+        started = np.maximum.accumulate(constituents[new] > 0, axis=0)
+        levels = start * np.cumprod(np.where(started, ratios[new], 1.0), axis=0)
+        appended = _long_levels(inputs['dates'][new], definitions, levels, basis[new], constituents[new])
+        levels = pd.concat([stored, appended], ignore_index=True)
+    else:
+        levels = compute_indices(fact, dim_stock, baskets)
+
+    manifest = {
+        'version': INDEX_VERSION,
+        'watermark': str(latest.date()),
+        'fact_rows': int(len(fact)),
+        'fact_hash': history_hash(fact, dates, latest),
+        'definitions': definitions,
+        'indices': len(definitions),
+    }
+    save_levels(levels, manifest, index_dir)
+    return levels, dict(manifest, mode=mode)
+
+
+# ============================================================================
+# VALIDATION
+# ============================================================================
+
+def compare_with_tunindex(levels, market=None, index=MARKET_INDEX):
+    """
+    Reconstructed market index vs the published TUNINDEX.
+
+    Parameters:
+    levels (pd.DataFrame): Output of compute_indices() / refresh_indices()
+    market (pd.DataFrame): fact_market_daily (default: loaded from the outputs)
+
+    Returns:
+    dict: days compared (0 without overlap), correlation and beta of daily
+          returns, annualized tracking error (%), and cumulative return of
+          both over the period (%)
+    """
+    from tunvesti.beta import TRADING_DAYS
+    from tunvesti.market import market_series
+
+    official = market_series(market)
+    ours = levels[levels['index'] == index].set_index('date')['level']
+    both = pd.concat({'official': official, 'reconstructed': ours}, axis=1, join='inner').sort_index()
+    returns = both.pct_change().dropna() * 100
+    if returns.empty:
+        return {'days': 0}
+
+    return {
+        'days': len(returns),
+        'correlation': returns['official'].corr(returns['reconstructed']),
+        'beta': returns['reconstructed'].cov(returns['official']) / returns['official'].var(),
+        'tracking_error_pct': (returns['reconstructed'] - returns['official']).std() * np.sqrt(TRADING_DAYS),
+        'official_return_pct': (both['official'].iloc[-1] / both['official'].iloc[0] - 1) * 100,
+        'reconstructed_return_pct': (both['reconstructed'].iloc[-1] / both['reconstructed'].iloc[0] - 1) * 100,
+    }
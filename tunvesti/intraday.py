@@ -0,0 +1,265 @@
+"""
+TUNVESTI - Intraday ring buffers and OHLCV bars
+In-memory state for the intraday polling mode of script 02: every poll
+appends (time, last price, cumulative session volume) per ticker to
+fixed-size NumPy ring buffers, and completed 5/15/60-minute bars are cut
+from them and written to CSV in batches.
+
+Memory is constant over a session: the ring buffers are preallocated
+(tickers x capacity) and overwrite their oldest ticks, and pending bars are
+flushed once FLUSH_BARS of them have accumulated. The capacity must cover
+the longest bar plus the tick before it; TickBuffer.capacity_for() gives it.
+
+Times are local wall-clock seconds, so bars are aligned on the clock
+(09:00, 09:05, ...). A bar's volume is the increase of the cumulative volume
+since the last tick before the bar, bars without ticks are not emitted, and
+the bars still open at the session close are written as they stand.
+
+Usage:
+    from tunvesti.intraday import TickBuffer, BarBuilder, BarWriter, run_session
+    buffer = TickBuffer(tickers, capacity=TickBuffer.capacity_for(interval_minutes=1))
+    bars = BarBuilder(buffer, BarWriter(INTRADAY_DIR))
+    run_session(poll, buffer, bars, interval_minutes=1)
+"""
+
+import logging
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+INTRADAY_DIR = config.OUTPUT_DIR / 'intraday'
+BAR_MINUTES = (5, 15, 60)
+# BVMT continuous trading session (local time)
+SESSION_OPEN = '09:00'
+SESSION_CLOSE = '14:10'
+DEFAULT_INTERVAL_MINUTES = 5
+FLUSH_BARS = 500
+BAR_COLUMNS = ['timestamp', 'ticker', 'open', 'high', 'low', 'close', 'volume', 'ticks']
+EPOCH = datetime(1970, 1, 1)
+
+
+def clock_seconds(moment):
+    """Local wall-clock datetime -> seconds (no timezone conversion)."""
+    return (moment - EPOCH).total_seconds()
+
+
+# ============================================================================
+# RING BUFFERS
+# ============================================================================
+
+class TickBuffer:
+    """Fixed-size per-ticker ring buffers of (epoch seconds, price, cumulative volume)."""
+
+    def __init__(self, tickers, capacity=128):
+        self.tickers = list(tickers)
+        self.index = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self.capacity = capacity
+        self.times = np.zeros((len(self.tickers), capacity), dtype=np.int64)
+        self.prices = np.full((len(self.tickers), capacity), np.nan)
+        self.volumes = np.zeros((len(self.tickers), capacity))
+        self.head = np.zeros(len(self.tickers), dtype=np.int64)     # next slot to write
+        self.count = np.zeros(len(self.tickers), dtype=np.int64)
+
+    @staticmethod
+    def capacity_for(interval_minutes, bar_minutes=BAR_MINUTES):
+        """Smallest capacity that still holds the longest bar plus the tick before it."""
+        return int(np.ceil(max(bar_minutes) / interval_minutes)) + 2
+
+    def append(self, ticker, timestamp, price, cumulative_volume):
+        """Store one tick (O(1)); ticks not newer than the last one are ignored."""
+        i = self.index.get(ticker)
+        if i is None or not np.isfinite(price):
+            return False
+        if self.count[i] and timestamp <= self.times[i, self.head[i] - 1]:
+            return False
+        slot = self.head[i]
+        self.times[i, slot] = timestamp
+        self.prices[i, slot] = price
+        self.volumes[i, slot] = cumulative_volume if cumulative_volume is not None else np.nan
+        self.head[i] = (slot + 1) % self.capacity
+        self.count[i] = min(self.count[i] + 1, self.capacity)
+        return True
+
+    def ticks(self, i):
+        """Chronological views (times, prices, volumes) of ticker slot i."""
+        n = self.count[i]
+        order = (self.head[i] - n + np.arange(n)) % self.capacity
+        return self.times[i, order], self.prices[i, order], self.volumes[i, order]
+
+    def oldest(self):
+        """Time of the oldest buffered tick over all tickers, or None."""
+        filled = np.flatnonzero(self.count)
+        if not len(filled):
+            return None
+        return self.times[filled, (self.head[filled] - self.count[filled]) % self.capacity].min()
+
+    def clear(self):
+        self.head[:] = 0
+        self.count[:] = 0
+
+
+# ============================================================================
+# BARS
+# ============================================================================
+
+class BarWriter:
+    """Batches completed bars and appends them to intraday/bars_<N>m_<date>.csv."""
+
+    def __init__(self, output_dir=None, flush_bars=FLUSH_BARS):
+        self.output_dir = output_dir or INTRADAY_DIR
+        self.flush_bars = flush_bars
+        self.pending = {}
+        self.written = 0
+
+    def add(self, minutes, row):
+        self.pending.setdefault(minutes, []).append(row)
+        if sum(len(rows) for rows in self.pending.values()) >= self.flush_bars:
+            self.flush()
+
+    def flush(self):
+        import pandas as pd
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        for minutes, rows in self.pending.items():
+            if not rows:
+                continue
+            df = pd.DataFrame(rows, columns=BAR_COLUMNS)
+            df['timestamp'] = EPOCH + pd.to_timedelta(df['timestamp'], unit='s')
+            for day, part in df.groupby(df['timestamp'].dt.strftime('%Y-%m-%d')):
+                path = self.output_dir / f'bars_{minutes}m_{day}.csv'
+                part.to_csv(path, mode='a', header=not path.exists(), index=False, float_format='%.10g')
+            self.written += len(rows)
+        self.pending = {}
+
+
+class BarBuilder:
+    """Cuts completed clock-aligned OHLCV bars out of a TickBuffer."""
+
+    def __init__(self, buffer, writer, bar_minutes=BAR_MINUTES):
+        self.buffer = buffer
+        self.writer = writer
+        self.bar_minutes = tuple(bar_minutes)
+        # End (epoch seconds) of the last bar emitted per frequency
+        self.emitted = {minutes: None for minutes in self.bar_minutes}
+
+    def _bar(self, i, start, end):
+        times, prices, volumes = self.buffer.ticks(i)
+        inside = (times >= start) & (times < end)
+        if not inside.any():
+            return None
+        price = prices[inside]
+        before = volumes[times < start]
+        baseline = before[-1] if len(before) and np.isfinite(before[-1]) else 0.0
+        volume = max(np.nanmax(volumes[inside]) - baseline, 0.0) if np.isfinite(volumes[inside]).any() else 0.0
+        return [start, self.buffer.tickers[i], price[0], price.max(), price.min(), price[-1],
+                volume, int(inside.sum())]
+
+    def emit(self, now):
+        """
+        Write every bar that ended at or before now and has not been emitted yet.
+
+        Parameters:
+        now (float): Epoch seconds (bars ending after now are still open)
+
+        Returns:
+        int: Number of bars emitted
+        """
+        emitted = 0
+        for minutes in self.bar_minutes:
+            width = minutes * 60
+            last_end = int(now // width) * width
+            if self.emitted[minutes] is not None:
+                first_end = self.emitted[minutes] + width
+            elif self.buffer.oldest() is not None:
+                # First call: start with the bar holding the oldest buffered tick
+                first_end = (int(self.buffer.oldest() // width) + 1) * width
+            else:
+                continue
+            for end in range(first_end, last_end + 1, width):
+                for i in np.flatnonzero(self.buffer.count):
+                    row = self._bar(i, end - width, end)
+                    if row is not None:
+                        self.writer.add(minutes, row)
+                        emitted += 1
+            self.emitted[minutes] = max(last_end, self.emitted[minutes] or 0)
+        return emitted
+
+    def close(self, now):
+        """Emit the bars completed by now, then the open ones up to now, and flush."""
+        emitted = self.emit(now)
+        for minutes in self.bar_minutes:
+            width = minutes * 60
+            start = self.emitted[minutes]
+            if start is not None and now >= start:
+                for i in np.flatnonzero(self.buffer.count):
+                    row = self._bar(i, start, start + width)
+                    if row is not None:
+                        self.writer.add(minutes, row)
+                        emitted += 1
+                self.emitted[minutes] = start + width
+        self.writer.flush()
+        return emitted
+
+
+# ============================================================================
+# SESSION LOOP
+# ============================================================================
+
+def _at(day, hhmm):
+    hour, minute = map(int, hhmm.split(':'))
+    return datetime.combine(day, datetime.min.time()).replace(hour=hour, minute=minute)
+
+
+def run_session(poll, buffer, bars, interval_minutes=DEFAULT_INTERVAL_MINUTES,
+                session_open=SESSION_OPEN, session_close=SESSION_CLOSE, now=datetime.now, sleep=time.sleep):
+    """
+    Poll every interval_minutes between session_open and session_close.
+
+    Cycles run back to back on a fixed clock grid: a cycle starts only after
+    the previous one returned, and slots missed by a slow cycle are skipped
+    (never queued), so polls cannot overlap or pile up.
+
+    Parameters:
+    poll (callable): poll() -> iterable of (ticker, price, cumulative_volume);
+        a generator lets each tick be stamped when it arrives
+    buffer (TickBuffer), bars (BarBuilder): Session state
+    now, sleep: Clock functions (replaceable for tests and replays)
+
+    Returns:
+    dict: cycles, skipped slots, ticks, bars
+    """
+    interval = timedelta(minutes=interval_minutes)
+    today = now().date()
+    opens, closes = _at(today, session_open), _at(today, session_close)
+    stats = {'cycles': 0, 'skipped': 0, 'ticks': 0, 'bars': 0}
+
+    slot = max(opens, now())
+    while slot < closes:
+        wait = (slot - now()).total_seconds()
+        if wait > 0:
+            sleep(wait)
+
+        started = now()
+        for ticker, price, volume in poll():
+            stats['ticks'] += buffer.append(ticker, clock_seconds(now()), price, volume)
+        stats['bars'] += bars.emit(clock_seconds(now()))
+        stats['cycles'] += 1
+
+        finished = now()
+        duration = (finished - started).total_seconds()
+        slot += interval
+        if finished > slot:
+            missed = int((finished - slot) / interval) + 1
+            stats['skipped'] += missed
+            slot += missed * interval
+            logger.warning(f"Poll cycle took {duration:.0f}s (> {interval_minutes} min); skipping {missed} slot(s)")
+        else:
+            logger.info(f"Cycle {stats['cycles']}: {duration:.0f}s, {stats['ticks']} ticks, {stats['bars']} bars")
+
+    stats['bars'] += bars.close(clock_seconds(now()))
+    return stats
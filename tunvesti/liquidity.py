@@ -0,0 +1,371 @@
+"""
+TUNVESTI - Liquidity and microstructure measures
+Rolling per-ticker liquidity measures for thinly traded BVMT names, computed
+for every ticker at once on the aligned (date x ticker) arrays of
+tunvesti.panel, plus an incremental path that folds one new session into a
+compact state, so a liquidity screen never rereads history.
+
+Measures (over the last WINDOW market sessions since the ticker's listing):
+    zero_volume_ratio   share of sessions without a trade (no row or volume 0)
+    amihud              mean |return| / value traded, per million TND
+    turnover_pct        mean daily volume as % of shares outstanding
+    cs_spread_pct       Corwin-Schultz high-low spread estimate (overnight
+                        adjusted, negative two-day estimates set to 0)
+    ar_spread_pct       Abdi-Ranaldo close/high-low spread estimate
+    traded_days, listed_days
+
+A session is a date of the fact table. Returns and the two-day spread
+estimators pair each trade with the ticker's previous trade, however many
+sessions earlier. Shares outstanding come from the known market caps, as in
+tunvesti.indices; tickers without any known cap have no turnover.
+amihud and the spreads need MIN_TRADED trades (pairs) in the window.
+
+Each session contributes a fixed set of additive terms per ticker (counts
+and sums); a rolling measure is a ratio of the terms summed over the window.
+The full history is one cumulative sum over the (dates x tickers x terms)
+array; the state keeps the last WINDOW sessions of terms and the previous
+trade of each ticker, so an update costs O(window x tickers).
+
+Usage:
+    from tunvesti.liquidity import compute_liquidity, build_state, update_liquidity, screen
+    history = compute_liquidity(fact)
+    state = build_state(fact)
+    today, state = update_liquidity(state, day_rows)
+    liquid = screen(state, max_zero_ratio=0.2)
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+STATE_PATH = config.OUTPUT_DIR / 'state' / 'liquidity.npz'
+WINDOW = 30
+MIN_TRADED = 5
+# Additive per-session terms, in the order of the last axis of the term arrays
+TERMS = ('listed', 'traded', 'amihud', 'amihud_n', 'turnover', 'turnover_n', 'pairs', 'cs', 'ar')
+MEASURES = ('zero_volume_ratio', 'amihud', 'turnover_pct', 'cs_spread_pct', 'ar_spread_pct',
+            'traded_days', 'listed_days')
+# Screenable measure -> direction of its bound
+SCREEN_COLUMNS = {
+    'zero_volume_ratio': 'max',
+    'amihud': 'max',
+    'turnover_pct': 'min',
+    'cs_spread_pct': 'max',
+    'ar_spread_pct': 'max',
+}
+
+
+# ============================================================================
+# TERMS AND MEASURES (shared by the full and incremental paths)
+# ============================================================================
+
+def _terms(close, high, low, volume, shares, listed, prev_close, prev_high, prev_low):
+    """
+    Additive terms of one or many sessions.
+
+    Works element-wise on arrays of any matching shape (one session: tickers;
+    full history: dates x tickers). prev_* are the values of the ticker's
+    previous trade (NaN before its first).
+
+    Returns:
+    np.ndarray: The inputs' shape plus a last axis over TERMS
+    """
+    traded = listed & (volume > 0) & (close > 0)
+    pair = traded & (prev_close > 0)
+    known_shares = listed & (shares > 0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        ret = np.abs(close / prev_close - 1)
+        amihud = pair & np.isfinite(ret)
+        illiquidity = ret / (close * volume) * 1e6
+        turnover = np.where(traded, volume, 0.0) / (shares * 1e6) * 100
+
+        # Corwin-Schultz: shift today's range by the overnight gap, then two-day vs one-day ranges
+        shift = np.fmax(prev_close - high, 0) - np.fmax(low - prev_close, 0)
+        high_adj, low_adj = high + shift, low + shift
+        beta = np.log(high_adj / low_adj) ** 2 + np.log(prev_high / prev_low) ** 2
+        gamma = np.log(np.fmax(high_adj, prev_high) / np.fmin(low_adj, prev_low)) ** 2
+        k = 3 - 2 * np.sqrt(2)
+        alpha = (np.sqrt(2 * beta) - np.sqrt(beta)) / k - np.sqrt(gamma / k)
+        cs = np.fmax(2 * (np.exp(alpha) - 1) / (1 + np.exp(alpha)), 0)
+
+        # Abdi-Ranaldo: previous close against the mid-ranges of both days
+        prev_close_log = np.log(prev_close)
+        ar = ((prev_close_log - (np.log(prev_high) + np.log(prev_low)) / 2)
+              * (prev_close_log - (np.log(high) + np.log(low)) / 2))
+
+    pair = pair & np.isfinite(cs) & np.isfinite(ar)
+    return np.stack([
+        listed, traded,
+        np.where(amihud, illiquidity, 0.0), amihud,
+        np.where(known_shares, turnover, 0.0), known_shares,
+        pair, np.where(pair, cs, 0.0), np.where(pair, ar, 0.0),
+    ], axis=-1).astype(np.float64)
+
+
+def _measures(sums, min_traded=MIN_TRADED):
+    """Rolling measures from terms summed over the window (last axis over TERMS)."""
+    t = {name: sums[..., i] for i, name in enumerate(TERMS)}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        enough = t['pairs'] >= min_traded
+        return {
+            'zero_volume_ratio': np.where(t['listed'] > 0, 1 - t['traded'] / t['listed'], np.nan),
+            'amihud': np.where(t['amihud_n'] >= min_traded, t['amihud'] / t['amihud_n'], np.nan),
+            'turnover_pct': np.where(t['turnover_n'] > 0, t['turnover'] / t['turnover_n'], np.nan),
+            'cs_spread_pct': np.where(enough, t['cs'] / t['pairs'] * 100, np.nan),
+            'ar_spread_pct': np.where(enough, np.sqrt(np.fmax(4 * t['ar'] / t['pairs'], 0)) * 100, np.nan),
+            'traded_days': t['traded'],
+            'listed_days': t['listed'],
+        }
+
+
+# ============================================================================
+# FULL HISTORY (one pass over the date x ticker arrays)
+# ============================================================================
+
+def _history(fact):
+    """
+    Session terms of the whole fact table.
+
+    Returns:
+    tuple: (dates, tickers, terms (dates x tickers x TERMS), dict of the last
+            trade's close/high/low and last shares/listed per ticker)
+    """
+    from tunvesti.indices import point_in_time_shares, share_counts
+    from tunvesti.panel import wide_arrays
+
+    dates, tickers, arrays = wide_arrays(fact, ['high', 'low', 'close', 'volume'])
+    close = arrays['close']
+    volume = np.nan_to_num(arrays['volume'])
+    high = np.where(np.isnan(arrays['high']), close, arrays['high'])
+    low = np.where(np.isnan(arrays['low']), close, arrays['low'])
+    traded = arrays['mask'] & (volume > 0) & (close > 0)
+    listed = np.logical_or.accumulate(traded, axis=0)
+
+    # Values of each ticker's previous trade (the last trade strictly before each session)
+    last = {name: pd.DataFrame(np.where(traded, values, np.nan)).ffill().to_numpy()
+            for name, values in (('close', close), ('high', high), ('low', low))}
+    prev = {name: np.vstack([np.full((1, len(tickers)), np.nan), values[:-1]]) for name, values in last.items()}
+
+    if 'market_cap_m' in fact.columns:
+        shares = point_in_time_shares(share_counts(fact), dates, tickers)
+    else:
+        shares = np.full(close.shape, np.nan)
+
+    terms = _terms(close, high, low, volume, shares, listed, prev['close'], prev['high'], prev['low'])
+    tail = {f'last_{name}': values[-1] for name, values in last.items()}
+    tail.update(shares=shares[-1], listed=listed[-1])
+    return dates, tickers, terms, tail
+
+
+def _rolling_sum(terms, window):
+    """Sum of the last `window` sessions at every session (cumulative-sum difference)."""
+    cumulative = np.cumsum(terms, axis=0)
+    sums = cumulative.copy()
+    sums[window:] -= cumulative[:-window]
+    return sums
+
+
+def compute_liquidity(fact, window=WINDOW, min_traded=MIN_TRADED):
+    """
+    Rolling liquidity measures for every ticker and session.
+
+    Parameters:
+    fact (pd.DataFrame): Rows with date, ticker, close, volume
+                         (+ high, low, market_cap_m)
+    window (int): Sessions per rolling window
+    min_traded (int): Trades needed for amihud and the spread estimators
+
+    Returns:
+    pd.DataFrame: date, ticker and MEASURES for every session since each
+                  ticker's first trade, sorted by ticker/date
+    """
+    dates, tickers, terms, _ = _history(fact)
+    measures = _measures(_rolling_sum(terms, window), min_traded)
+    rows, cols = np.nonzero(terms[..., TERMS.index('listed')].T)
+    out = pd.DataFrame({'date': dates[cols], 'ticker': tickers[rows]})
+    for name in MEASURES:
+        out[name] = measures[name][cols, rows]
+    return out
+
+
+# ============================================================================
+# INCREMENTAL (one session at a time)
+# ============================================================================
+
+def build_state(fact, window=WINDOW, min_traded=MIN_TRADED):
+    """
+    Capture the last `window` sessions of terms for incremental updates.
+
+    Returns:
+    dict: 'tickers' (array), 'terms' (window x tickers x TERMS), per-ticker
+          arrays last_close/last_high/last_low/shares/listed, 'last_date',
+          'window' and 'min_traded'
+    """
+    dates, tickers, terms, tail = _history(fact)
+    recent = np.zeros((window, len(tickers), len(TERMS)))
+    kept = terms[-window:]
+    recent[window - len(kept):] = kept
+
+    state = {'tickers': tickers.to_numpy(dtype=object), 'terms': recent,
+             'last_date': np.datetime64(dates[-1].date(), 'D') if len(dates) else np.datetime64('NaT', 'D'),
+             'window': np.int64(window), 'min_traded': np.int64(min_traded)}
+    state.update({name: np.asarray(values, dtype=np.float64) for name, values in tail.items()})
+    return state
+
+
+def _add_tickers(state, tickers):
+    """Append empty state rows for tickers seen for the first time."""
+    new = [t for t in dict.fromkeys(tickers) if t not in set(state['tickers'])]
+    if not new:
+        return state
+    state = dict(state)
+    n = len(new)
+    state['tickers'] = np.concatenate([state['tickers'], np.array(new, dtype=object)])
+    state['terms'] = np.concatenate([state['terms'], np.zeros((state['terms'].shape[0], n, len(TERMS)))], axis=1)
+    for name in ('last_close', 'last_high', 'last_low', 'shares'):
+        state[name] = np.concatenate([state[name], np.full(n, np.nan)])
+    state['listed'] = np.concatenate([state['listed'], np.zeros(n)])
+    return state
+
+
+def update_liquidity(state, day_rows):
+    """
+    Fold one market session into the state.
+
+    Tickers of the state missing from day_rows count as not traded that
+    session. Share counts only move forward: a first known market cap is
+    not back-filled into the window as the full computation does.
+
+    Parameters:
+    state (dict): From build_state / a previous update / load_state
+    day_rows (pd.DataFrame): One date; ticker, close, volume (+ high, low, market_cap_m)
+
+    Returns:
+    tuple: (DataFrame of MEASURES for every listed ticker, updated state)
+
+    Raises:
+    ValueError: If day_rows span several dates or are not after the state's last session
+    """
+    dates = pd.to_datetime(day_rows['date']).unique()
+    if len(dates) != 1:
+        raise ValueError(f"update_liquidity expects one session, got {len(dates)} dates")
+    date = np.datetime64(pd.Timestamp(dates[0]).date(), 'D')
+    if not np.isnat(state['last_date']) and date <= state['last_date']:
+        raise ValueError(f"Session {date} is not after the last one in the state ({state['last_date']})")
+
+    state = _add_tickers(state, day_rows['ticker'].tolist())
+    state = {k: (v.copy() if isinstance(v, np.ndarray) else v) for k, v in state.items()}
+    position = pd.Index(state['tickers']).get_indexer(day_rows['ticker'])
+
+    def session(column, default=np.nan):
+        values = np.full(len(state['tickers']), default)
+        if column in day_rows.columns:
+            values[position] = pd.to_numeric(day_rows[column], errors='coerce').to_numpy(dtype=np.float64)
+        return values
+
+    close = session('close')
+    volume = np.nan_to_num(session('volume', 0.0))
+    high = np.where(np.isnan(session('high')), close, session('high'))
+    low = np.where(np.isnan(session('low')), close, session('low'))
+    traded = (volume > 0) & (close > 0)
+    listed = (state['listed'] > 0) | traded
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        implied = session('market_cap_m') / close
+    state['shares'] = np.where(implied > 0, implied, state['shares'])
+
+    today = _terms(close, high, low, volume, state['shares'], listed,
+                   state['last_close'], state['last_high'], state['last_low'])
+    state['terms'] = np.roll(state['terms'], -1, axis=0)
+    state['terms'][-1] = today
+    for name, values in (('last_close', close), ('last_high', high), ('last_low', low)):
+        state[name] = np.where(traded, values, state[name])
+    state['listed'] = listed.astype(np.float64)
+    state['last_date'] = date
+
+    return current_measures(state), state
+
+
+# ============================================================================
+# SCREENING
+# ============================================================================
+
+def current_measures(state):
+    """
+    Measures at the state's last session for every listed ticker.
+
+    Returns:
+    pd.DataFrame: date, ticker and MEASURES, sorted by ticker
+    """
+    measures = _measures(state['terms'].sum(axis=0), int(state['min_traded']))
+    listed = state['listed'] > 0
+    out = pd.DataFrame({'date': pd.Timestamp(state['last_date']), 'ticker': state['tickers'][listed]})
+    for name in MEASURES:
+        out[name] = measures[name][listed]
+    return out.sort_values('ticker').reset_index(drop=True)
+
+
+def screen(state=None, max_zero_ratio=None, max_amihud=None, min_turnover_pct=None,
+           max_cs_spread_pct=None, max_ar_spread_pct=None, sort='amihud'):
+    """
+    Tickers passing every given liquidity bound, most liquid first.
+
+    Reads nothing but the state (default: load_state()), so it is instant.
+    A ticker whose measure is unknown fails that measure's bound.
+
+    Parameters:
+    state (dict): Liquidity state (default: the one saved by script 03)
+    max_zero_ratio, max_amihud, max_cs_spread_pct, max_ar_spread_pct (float): Upper bounds
+    min_turnover_pct (float): Lower bound on daily turnover
+    sort (str): Measure to sort by (ascending; turnover_pct descending)
+
+    Returns:
+    pd.DataFrame: Output of current_measures() for the passing tickers
+    """
+    state = state if state is not None else load_state()
+    if state is None:
+        raise FileNotFoundError(f"No liquidity state at {STATE_PATH}: run script 03 first")
+    if sort not in SCREEN_COLUMNS:
+        raise ValueError(f"Unknown sort '{sort}' (available: {', '.join(SCREEN_COLUMNS)})")
+
+    df = current_measures(state)
+    bounds = {
+        'zero_volume_ratio': max_zero_ratio,
+        'amihud': max_amihud,
+        'turnover_pct': min_turnover_pct,
+        'cs_spread_pct': max_cs_spread_pct,
+        'ar_spread_pct': max_ar_spread_pct,
+    }
+    keep = np.ones(len(df), dtype=bool)
+    for column, bound in bounds.items():
+        if bound is not None:
+            keep &= (df[column] >= bound) if SCREEN_COLUMNS[column] == 'min' else (df[column] <= bound)
+    ascending = SCREEN_COLUMNS[sort] == 'max'
+    return df[keep].sort_values(sort, ascending=ascending, na_position='last').reset_index(drop=True)
+
+
+# ============================================================================
+# PERSISTENCE
+# ============================================================================
+
+def save_state(state, path=None):
+    """Persist the state as a compressed .npz."""
+    path = path or STATE_PATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    arrays = {k: v for k, v in state.items() if k != 'tickers'}
+    np.savez_compressed(path, tickers=state['tickers'].astype(str), **arrays)
+
+
+def load_state(path=None):
+    """Load a state written by save_state, or None if there is none."""
+    path = path or STATE_PATH
+    if not path.exists():
+        return None
+    with np.load(path, allow_pickle=False) as data:
+        state = {k: data[k] for k in data.files if k != 'tickers'}
+        state['tickers'] = data['tickers'].astype(object)
+    for name in ('last_date', 'window', 'min_traded'):
+        state[name] = state[name][()]
+    return state
@@ -0,0 +1,92 @@
+"""
+TUNVESTI - Market-level daily table
+fact_market_daily holds one row per date for the market index (TUNINDEX
+OHLC, volume, published change) and the series derived from it, instead of
+broadcasting them onto every stock row of fact_stock_daily. It shares the
+date key with dim_date and is joined on date only where a query needs it:
+
+    SELECT f.date, f.ticker, f.daily_return_pct, m.tunindex_daily_return_pct
+    FROM fact_stock_daily f LEFT JOIN fact_market_daily m USING (date)
+
+Usage:
+    from tunvesti.market import build_market_table, load_market, with_market
+    market = build_market_table(df_tunindex)        # script 03
+    market = load_market()                          # output/fact_market_daily.*
+    fact = with_market(fact, market, ['tunindex_close'])
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+SOURCE_COLUMNS = ['tunindex_open', 'tunindex_high', 'tunindex_low', 'tunindex_close',
+                  'tunindex_volume', 'tunindex_change_pct']
+VOLATILITY_WINDOW = 30
+TRADING_DAYS = 252
+
+
+def build_market_table(tunindex):
+    """
+    One row per date with the index levels and their derived series.
+
+    Parameters:
+    tunindex (pd.DataFrame): Cleaned TUNINDEX rows (date, tunindex_close, ...)
+
+    Returns:
+    pd.DataFrame: date, the available SOURCE_COLUMNS, tunindex_daily_return_pct,
+                  tunindex_volatility_30d (annualized %), tunindex_drawdown_pct
+    """
+    columns = ['date'] + [c for c in SOURCE_COLUMNS if c in tunindex.columns]
+    market = tunindex[columns].dropna(subset=['date', 'tunindex_close']).copy()
+    market['date'] = pd.to_datetime(market['date'])
+    market = market.drop_duplicates('date', keep='last').sort_values('date').reset_index(drop=True)
+
+    close = market['tunindex_close']
+    market['tunindex_daily_return_pct'] = close.pct_change() * 100
+    market['tunindex_volatility_30d'] = (market['tunindex_daily_return_pct'].rolling(VOLATILITY_WINDOW).std()
+                                         * np.sqrt(TRADING_DAYS))
+    market['tunindex_drawdown_pct'] = (close / close.cummax() - 1) * 100
+    return market
+
+
+def load_market(output_dir=None):
+    """fact_market_daily from the pipeline outputs (Parquet preferred), or None."""
+    output_dir = output_dir or config.OUTPUT_DIR
+    parquet = output_dir / f'{config.FACT_MARKET.stem}.parquet'
+    if parquet.exists():
+        return pd.read_parquet(parquet)
+    csv = output_dir / config.FACT_MARKET.name
+    if csv.exists():
+        return pd.read_csv(csv, parse_dates=['date'])
+    return None
+
+
+def market_series(market=None, column='tunindex_close'):
+    """
+    One market column indexed by date.
+
+    market may be fact_market_daily or any frame with date and the column
+    (e.g. an older fact table that still broadcasts tunindex_close); it is
+    loaded from the outputs when omitted.
+
+    Returns:
+    pd.Series: Sorted by date, NaN rows dropped (empty if unavailable)
+    """
+    if market is None:
+        market = load_market()
+    if market is None or column not in market.columns:
+        return pd.Series(dtype=np.float64, index=pd.DatetimeIndex([], name='date'), name=column)
+    series = (market[['date', column]].dropna().drop_duplicates('date')
+              .assign(date=lambda d: pd.to_datetime(d['date'])).set_index('date')[column])
+    return series.sort_index()
+
+
+def with_market(fact, market=None, columns=('tunindex_close',)):
+    """Left-join market columns onto stock rows by date (for consumers that want them inline)."""
+    if market is None:
+        market = load_market()
+    if market is None:
+        return fact.assign(**{column: np.nan for column in columns})
+    right = market[['date'] + list(columns)].assign(date=lambda d: pd.to_datetime(d['date']))
+    return fact.assign(date=pd.to_datetime(fact['date'])).merge(right, on='date', how='left')
@@ -0,0 +1,195 @@
+"""
+TUNVESTI - Dense date x ticker panel store
+Wide representation of the fact table for cross-sectional analytics: one
+memory-mapped 2D float array per field (close, volume, return...), rows
+indexed by dim_date and columns by dim_stock, plus a mask of which
+(date, ticker) cells actually traded.
+
+Slicing a date (row) or a ticker (column) is an O(1) index lookup that
+returns a view into the mapped file - nothing is copied or pivoted.
+
+Layout (output/panel/):
+    meta.json                  build, fields, tickers, shape, dtype
+    <build>/dates.npy          datetime64[D] row index
+    <build>/mask.npy           bool (dates x tickers), True where a fact row exists
+    <build>/<field>.npy        float64 (dates x tickers), NaN where missing
+
+A rebuild writes a new build directory and then replaces meta.json
+atomically (tunvesti.snapshots.publish_build), so processes that still map
+the previous build - report or backtest workers, notebooks - keep reading
+consistent files while the pipeline runs.
+
+Usage:
+    from tunvesti.panel import Panel
+    panel = Panel.open()
+    closes_today = panel.row('close', '2022-12-30')       # one value per ticker
+    sfbt_returns = panel.column('daily_return_pct', 'SFBT')
+    breadth = (panel.field('daily_return_pct') > 0).sum(axis=1)
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+PANEL_DIR = config.OUTPUT_DIR / 'panel'
+DEFAULT_FIELDS = ('open', 'high', 'low', 'close', 'adj_close', 'volume', 'daily_return_pct',
+                  'total_return_pct', 'volatility_30d', 'dividend_yield_pct', 'market_cap_m')
+META_FILE = 'meta.json'
+
+
+def cell_positions(fact, dim_date=None, dim_stock=None):
+    """
+    Row/column position of every fact row in the (dates x tickers) grid.
+
+    Returns:
+    tuple: (dates, tickers, rows, cols, known) where rows/cols are already
+           filtered by the boolean mask known (fact rows outside the grid)
+    """
+    fact_dates = pd.to_datetime(fact['date'])
+    dates = pd.DatetimeIndex(sorted(pd.to_datetime(dim_date['date']).unique())
+                             if dim_date is not None else fact_dates.unique()).sort_values()
+    tickers = pd.Index(sorted(dim_stock['ticker'].unique()) if dim_stock is not None
+                       else sorted(fact['ticker'].unique()))
+
+    rows = dates.get_indexer(fact_dates)
+    cols = tickers.get_indexer(fact['ticker'])
+    known = (rows >= 0) & (cols >= 0)
+    return dates, tickers, rows[known], cols[known], known
+
+
+def wide_arrays(fact, fields, dim_date=None, dim_stock=None):
+    """
+    In-memory equivalent of the panel files (no disk), for ad-hoc fact tables.
+
+    Returns:
+    tuple: (dates, tickers, dict of field -> (dates x tickers) array, plus 'mask')
+    """
+    dates, tickers, rows, cols, known = cell_positions(fact, dim_date, dim_stock)
+    arrays = {'mask': np.zeros((len(dates), len(tickers)), dtype=np.bool_)}
+    arrays['mask'][rows, cols] = True
+    for field in fields:
+        if field in fact.columns:
+            arrays[field] = np.full((len(dates), len(tickers)), np.nan)
+            arrays[field][rows, cols] = pd.to_numeric(fact[field], errors='coerce').to_numpy(dtype=np.float64)[known]
+    return dates, tickers, arrays
+
+
+def build_panel(fact, dim_date=None, dim_stock=None, fields=DEFAULT_FIELDS, panel_dir=None):
+    """
+    Write the panel files from the long fact table.
+
+    Rows are scattered straight into the arrays by integer position, so the
+    build is a single O(rows) pass per field (no pivot/groupby).
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily
+    dim_date (pd.DataFrame): Date dimension (row order); derived from fact if None
+    dim_stock (pd.DataFrame): Stock dimension (column order); derived from fact if None
+    fields (iterable): Fact columns to store (missing ones are skipped)
+    panel_dir (Path): Destination directory (default: output/panel)
+
+    Returns:
+    Panel: The freshly written store, opened read-only
+    """
+    from tunvesti.snapshots import new_build, publish_build
+
+    panel_dir = panel_dir or PANEL_DIR
+    build, staging = new_build(panel_dir)
+
+    dates, tickers, rows, cols, known = cell_positions(fact, dim_date, dim_stock)
+    shape = (len(dates), len(tickers))
+
+    mask = np.lib.format.open_memmap(staging / 'mask.npy', mode='w+', dtype=np.bool_, shape=shape)
+    mask[:] = False
+    mask[rows, cols] = True
+    mask.flush()
+    del mask
+
+    stored = []
+    for field in fields:
+        if field not in fact.columns:
+            continue
+        values = pd.to_numeric(fact[field], errors='coerce').to_numpy(dtype=np.float64)[known]
+        array = np.lib.format.open_memmap(staging / f'{field}.npy', mode='w+', dtype=np.float64, shape=shape)
+        array[:] = np.nan
+        array[rows, cols] = values
+        array.flush()
+        del array
+        stored.append(field)
+
+    np.save(staging / 'dates.npy', dates.values.astype('datetime64[D]'))
+    meta = {'build': build, 'fields': stored, 'tickers': list(tickers), 'shape': list(shape), 'dtype': 'float64'}
+    publish_build(panel_dir, staging, meta, META_FILE)
+    return Panel.open(panel_dir)
+
+
+class Panel:
+    """Read-only, memory-mapped view of the panel files."""
+
+    def __init__(self, panel_dir, meta, dates):
+        self.panel_dir = panel_dir
+        self.build_dir = panel_dir / meta['build'] if meta.get('build') else panel_dir
+        self.fields = meta['fields']
+        self.tickers = pd.Index(meta['tickers'])
+        self.dates = pd.DatetimeIndex(dates)
+        self._date_pos = {d: i for i, d in enumerate(dates)}
+        self._ticker_pos = {t: i for i, t in enumerate(meta['tickers'])}
+        self._arrays = {}
+
+    @classmethod
+    def open(cls, panel_dir=None):
+        """Open an existing panel store (files are mapped lazily, per field)."""
+        panel_dir = panel_dir or PANEL_DIR
+        meta_path = panel_dir / META_FILE
+        if not meta_path.exists():
+            raise FileNotFoundError(f"No panel store in {panel_dir} (run script 03 or build_panel first)")
+        meta = json.loads(meta_path.read_text())
+        dates = np.load((panel_dir / meta['build'] if meta.get('build') else panel_dir) / 'dates.npy')
+        return cls(panel_dir, meta, dates)
+
+    @property
+    def shape(self):
+        return (len(self.dates), len(self.tickers))
+
+    def field(self, name):
+        """Full (dates x tickers) array for a field, memory-mapped read-only."""
+        if name not in self._arrays:
+            if name != 'mask' and name not in self.fields:
+                raise KeyError(f"Field '{name}' not in panel (available: {', '.join(self.fields)})")
+            self._arrays[name] = np.load(self.build_dir / f'{name}.npy', mmap_mode='r')
+        return self._arrays[name]
+
+    @property
+    def mask(self):
+        """Boolean (dates x tickers) array, True where a fact row exists."""
+        return self.field('mask')
+
+    def date_index(self, date):
+        """Row position of a date (O(1))."""
+        return self._date_pos[np.datetime64(pd.Timestamp(date).date(), 'D')]
+
+    def ticker_index(self, ticker):
+        """Column position of a ticker (O(1))."""
+        return self._ticker_pos[ticker.upper()]
+
+    def row(self, name, date):
+        """All tickers on one date: a contiguous view, no copy."""
+        return self.field(name)[self.date_index(date)]
+
+    def column(self, name, ticker):
+        """Full history of one ticker: a strided view, no copy."""
+        return self.field(name)[:, self.ticker_index(ticker)]
+
+    def date_range(self, start=None, end=None):
+        """Row slice for a date range (binary search on the sorted dates)."""
+        lo = self.dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+        hi = self.dates.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(self.dates)
+        return slice(lo, hi)
+
+    def frame(self, name, start=None, end=None):
+        """Wrap a field (optionally a date range) as a wide DataFrame without copying."""
+        rows = self.date_range(start, end)
+        return pd.DataFrame(self.field(name)[rows], index=self.dates[rows], columns=self.tickers, copy=False)
@@ -0,0 +1,280 @@
+"""
+TUNVESTI - Portfolio analytics
+Evaluate portfolios of BVMT stocks (weights per ticker) against TUNINDEX:
+weighted returns, volatility, Sharpe ratio, Sharpe of the excess return over
+TUNINDEX (information ratio), beta, drawdowns and contribution to risk.
+
+Covariance matrices (sample, EWMA, Ledoit-Wolf shrinkage) are estimated once
+per (method, window) over the whole universe and kept in an LRU cache;
+evaluating a portfolio is then a few matrix-vector products, and
+evaluate_many() scores hundreds of candidate portfolios in one matrix
+product over the cached window.
+
+Days a stock did not trade count as a 0% return (price unchanged), which
+keeps every covariance matrix positive semi-definite.
+
+Usage:
+    from tunvesti.portfolio import PortfolioAnalytics
+    analytics = PortfolioAnalytics.from_fact(fact)
+    report = analytics.evaluate({'SFBT': 0.4, 'BIAT': 0.3, 'PGH': 0.3}, start='2020-01-01')
+    report['metrics'], report['risk_contribution']
+    table = analytics.evaluate_many(candidates, start='2020-01-01', method='ewma')
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from tunvesti.beta import TRADING_DAYS, market_returns, returns_panel
+
+COVARIANCE_METHODS = ('sample', 'ewma', 'shrinkage')
+DEFAULT_HALFLIFE = 60
+
+
+# ============================================================================
+# COVARIANCE ESTIMATORS (inputs: window x tickers returns, no NaN)
+# ============================================================================
+
+def sample_covariance(returns):
+    """Sample mean and covariance (ddof=1)."""
+    mean = returns.mean(axis=0)
+    centered = returns - mean
+    return mean, centered.T @ centered / max(len(returns) - 1, 1)
+
+
+def ewma_covariance(returns, halflife=DEFAULT_HALFLIFE):
+    """Exponentially weighted mean and covariance (most recent day weighs most)."""
+    decay = 0.5 ** (1 / halflife)
+    weights = decay ** np.arange(len(returns) - 1, -1, -1)
+    weights /= weights.sum()
+    mean = weights @ returns
+    centered = returns - mean
+    return mean, (centered * weights[:, None]).T @ centered
+
+
+def shrinkage_covariance(returns, shrinkage=None):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+
+    Parameters:
+    shrinkage (float): Fixed intensity in [0, 1]; estimated (Ledoit & Wolf, 2004) if None
+
+    Returns:
+    tuple: (mean, covariance, shrinkage intensity used)
+    """
+    n = len(returns)
+    mean = returns.mean(axis=0)
+    centered = returns - mean
+    sample = centered.T @ centered / n
+    target = np.trace(sample) / len(sample)
+
+    if shrinkage is None:
+        distance = ((sample - target * np.eye(len(sample))) ** 2).sum()
+        squares = centered ** 2
+        variance = ((squares.T @ squares) / n - sample ** 2).sum() / n
+        shrinkage = min(1.0, variance / distance) if distance > 0 else 1.0
+
+    cov = shrinkage * target * np.eye(len(sample)) + (1 - shrinkage) * sample
+    return mean, cov * n / max(n - 1, 1), shrinkage
+
+
+# ============================================================================
+# ANALYTICS
+# ============================================================================
+
+def _drawdown(equity):
+    """Drawdown path (fraction below running peak) of equity curves along axis 0."""
+    return equity / np.maximum.accumulate(equity, axis=0) - 1
+
+
+def _longest_drawdown(drawdown):
+    """Longest run of days below the previous peak, per column."""
+    below = drawdown < 0
+    longest = np.zeros(below.shape[1], dtype=int)
+    run = np.zeros(below.shape[1], dtype=int)
+    for row in below:
+        run = np.where(row, run + 1, 0)
+        longest = np.maximum(longest, run)
+    return longest
+
+
+class PortfolioAnalytics:
+    """Portfolio evaluation over an aligned (date x ticker) returns panel, in %."""
+
+    def __init__(self, dates, tickers, returns, market, cache_size=32):
+        self.dates = pd.DatetimeIndex(dates)
+        self.tickers = pd.Index(tickers)
+        self.returns = np.nan_to_num(np.asarray(returns, dtype=np.float64))
+        self.market = np.asarray(market, dtype=np.float64)
+        self.cache_size = cache_size
+        self._positions = {ticker: i for i, ticker in enumerate(self.tickers)}
+        self._estimates = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_fact(cls, fact, market=None, **kwargs):
+        """Build from fact_stock_daily and fact_market_daily (loaded from the outputs when omitted)."""
+        dates, tickers, returns = returns_panel(fact)
+        return cls(dates, tickers, returns, market_returns(fact, dates, market), **kwargs)
+
+    # ------------------------------------------------------------------------
+    # Windows and cached estimates
+    # ------------------------------------------------------------------------
+
+    def window(self, start=None, end=None):
+        """Row slice of the evaluation window."""
+        lo = self.dates.searchsorted(pd.Timestamp(start)) if start is not None else 0
+        hi = self.dates.searchsorted(pd.Timestamp(end), side='right') if end is not None else len(self.dates)
+        if hi - lo < 2:
+            raise ValueError(f"Window {start} - {end} has fewer than 2 trading days")
+        return slice(lo, hi)
+
+    def covariance(self, start=None, end=None, method='sample', halflife=DEFAULT_HALFLIFE, shrinkage=None):
+        """
+        Cached daily mean vector and covariance matrix (%^2) for every ticker.
+
+        Returns:
+        dict: 'mean', 'cov', 'shrinkage' (None unless method='shrinkage')
+        """
+        if method not in COVARIANCE_METHODS:
+            raise ValueError(f"Unknown covariance method '{method}' (use {', '.join(COVARIANCE_METHODS)})")
+        rows = self.window(start, end)
+        key = (method, rows.start, rows.stop,
+               halflife if method == 'ewma' else None,
+               shrinkage if method == 'shrinkage' else None)
+
+        estimate = self._estimates.get(key)
+        if estimate is not None:
+            self._estimates.move_to_end(key)
+            self.hits += 1
+            return estimate
+
+        self.misses += 1
+        window = self.returns[rows]
+        if method == 'sample':
+            mean, cov = sample_covariance(window)
+            used = None
+        elif method == 'ewma':
+            mean, cov = ewma_covariance(window, halflife)
+            used = None
+        else:
+            mean, cov, used = shrinkage_covariance(window, shrinkage)
+
+        estimate = {'mean': mean, 'cov': cov, 'shrinkage': used}
+        self._estimates[key] = estimate
+        while len(self._estimates) > self.cache_size:
+            self._estimates.popitem(last=False)
+        return estimate
+
+    def cache_stats(self):
+        return {'entries': len(self._estimates), 'hits': self.hits, 'misses': self.misses}
+
+    def weight_matrix(self, portfolios):
+        """
+        (tickers x portfolios) weights from {ticker: weight} mappings, each normalized to sum to 1.
+        """
+        weights = np.zeros((len(self.tickers), len(portfolios)))
+        for j, holdings in enumerate(portfolios):
+            unknown = [ticker for ticker in holdings if ticker.upper() not in self._positions]
+            if unknown:
+                raise KeyError(f"Unknown tickers: {', '.join(unknown)}")
+            for ticker, weight in holdings.items():
+                weights[self._positions[ticker.upper()], j] += weight
+            total = weights[:, j].sum()
+            if total <= 0:
+                raise ValueError(f"Portfolio {j} has no positive total weight")
+            weights[:, j] /= total
+        return weights
+
+    # ------------------------------------------------------------------------
+    # Evaluation
+    # ------------------------------------------------------------------------
+
+    def evaluate_many(self, portfolios, start=None, end=None, method='sample', risk_free_pct=0.0, **estimator):
+        """
+        Metrics for many portfolios at once (weights held constant, rebalanced daily).
+
+        Parameters:
+        portfolios (list): {ticker: weight} mappings (or a dict of name -> mapping)
+        start, end (str): Evaluation window
+        method (str): Covariance estimator used for volatility and risk ('sample', 'ewma', 'shrinkage')
+        risk_free_pct (float): Annual risk-free rate in % for the Sharpe ratio
+        **estimator: halflife (ewma) or shrinkage (fixed intensity)
+
+        Returns:
+        pd.DataFrame: One row per portfolio
+        """
+        names = list(portfolios) if isinstance(portfolios, dict) else list(range(len(portfolios)))
+        holdings = list(portfolios.values()) if isinstance(portfolios, dict) else list(portfolios)
+        weights = self.weight_matrix(holdings)
+        rows = self.window(start, end)
+        estimate = self.covariance(start, end, method, **estimator)
+
+        daily = self.returns[rows] @ weights                      # (days x portfolios), %
+        market = self.market[rows]
+        has_market = ~np.isnan(market)
+        excess = daily[has_market] - market[has_market, None]
+
+        mean_annual = (estimate['mean'] @ weights) * TRADING_DAYS
+        variance = np.einsum('ip,ij,jp->p', weights, estimate['cov'], weights)
+        vol_annual = np.sqrt(np.maximum(variance, 0) * TRADING_DAYS)
+        tracking = excess.std(axis=0, ddof=1) * np.sqrt(TRADING_DAYS)
+
+        market_var = market[has_market].var(ddof=1)
+        beta = ((daily[has_market] - daily[has_market].mean(axis=0)).T
+                @ (market[has_market] - market[has_market].mean())) / (has_market.sum() - 1) / market_var
+
+        equity = np.cumprod(1 + daily / 100, axis=0)
+        drawdown = _drawdown(equity)
+        years = len(daily) / TRADING_DAYS
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            table = pd.DataFrame({
+                'total_return_pct': (equity[-1] - 1) * 100,
+                'cagr_pct': (equity[-1] ** (1 / years) - 1) * 100,
+                'mean_return_annual_pct': mean_annual,
+                'volatility_annual_pct': vol_annual,
+                'sharpe': (mean_annual - risk_free_pct) / vol_annual,
+                'sharpe_vs_tunindex': excess.mean(axis=0) * TRADING_DAYS / tracking,
+                'tracking_error_pct': tracking,
+                'beta': beta,
+                'max_drawdown_pct': drawdown.min(axis=0) * 100,
+                'longest_drawdown_days': _longest_drawdown(drawdown),
+            }, index=pd.Index(names, name='portfolio'))
+        return table
+
+    def evaluate(self, holdings, start=None, end=None, method='sample', risk_free_pct=0.0, **estimator):
+        """
+        Full report for one portfolio.
+
+        Returns:
+        dict: 'metrics' (dict), 'returns' (daily % Series), 'drawdown' (% Series),
+              'risk_contribution' (DataFrame: weight, marginal and % contribution to risk)
+        """
+        metrics = self.evaluate_many([holdings], start, end, method, risk_free_pct, **estimator).iloc[0]
+        weights = self.weight_matrix([holdings])[:, 0]
+        rows = self.window(start, end)
+        estimate = self.covariance(start, end, method, **estimator)
+
+        held = np.flatnonzero(weights)
+        marginal = estimate['cov'][held] @ weights
+        variance = weights @ estimate['cov'] @ weights
+        with np.errstate(invalid='ignore', divide='ignore'):
+            contribution = pd.DataFrame({
+                'weight': weights[held],
+                'marginal_risk_pct': marginal / np.sqrt(variance) * np.sqrt(TRADING_DAYS),
+                'risk_contribution_pct': weights[held] * marginal / variance * 100,
+            }, index=pd.Index(self.tickers[held], name='ticker')).sort_values('risk_contribution_pct',
+                                                                                ascending=False)
+
+        daily = self.returns[rows] @ weights
+        equity = np.cumprod(1 + daily / 100)
+        index = self.dates[rows]
+        return {
+            'metrics': metrics.to_dict(),
+            'returns': pd.Series(daily, index=index, name='return_pct'),
+            'drawdown': pd.Series(_drawdown(equity) * 100, index=index, name='drawdown_pct'),
+            'risk_contribution': contribution,
+        }
@@ -0,0 +1,151 @@
+"""
+TUNVESTI - Partitioned exports for Power BI incremental refresh
+Writes the fact table as one CSV per month with a pinned schema, plus the
+dimensions, into output/powerbi/. Only partitions whose content changed are
+rewritten, and manifest.json lists them, so Power BI incremental refresh (or
+any loader that tracks the manifest) re-imports a month or two per day
+instead of the whole fact table.
+
+Layout (output/powerbi/):
+    manifest.json                              columns, partitions, changes of the last run
+    fact_stock_daily/fact_stock_daily_2025-06.csv
+    dim_date.csv, dim_stock.csv                rewritten only when their content changes
+    fact_market_daily.csv                      one row per date (TUNINDEX), same rule
+
+Schema: the fact columns are pinned by the first export (stored in the
+manifest) and every partition is written with the same columns in the same
+order, dates as YYYY-MM-DD. If the fact table gains or loses columns, the
+next export rewrites every partition and sets 'schema_changed'.
+
+Note: columns derived from the whole history (adj_close is rescaled to the
+latest corporate-action factor) change old months whenever a new corporate
+action is recorded; those months are then listed as changed as well.
+
+Usage:
+    from tunvesti.powerbi import export_partitions
+    manifest = export_partitions(fact, dim_date, dim_stock)
+    manifest['changed']        # partition files rewritten by this run
+"""
+
+import json
+import logging
+from datetime import datetime
+
+import pandas as pd
+
+from tunvesti import config
+from tunvesti.snapshots import content_hash, write_atomic
+
+logger = logging.getLogger(__name__)
+
+EXPORT_DIR = config.OUTPUT_DIR / 'powerbi'
+MANIFEST_FILE = 'manifest.json'
+FACT_NAME = 'fact_stock_daily'
+DIMENSIONS = ('dim_date', 'dim_stock')
+# Small tables written whole, like the dimensions
+MARKET_NAME = 'fact_market_daily'
+# Identical float formatting keeps unchanged partitions byte-identical across runs
+CSV_OPTIONS = {'float_format': '%.10g', 'date_format': '%Y-%m-%d'}
+
+
+def load_manifest(export_dir=None):
+    """Manifest of the last export, or None."""
+    path = (export_dir or EXPORT_DIR) / MANIFEST_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _month_partitions(fact, columns):
+    """Yield (YYYY-MM, frame) with the pinned columns, sorted by date and ticker."""
+    df = fact.reindex(columns=columns)
+    df['date'] = pd.to_datetime(df['date'])
+    df = df.sort_values(['date', 'ticker'], kind='mergesort')
+    for period, part in df.groupby(df['date'].dt.to_period('M'), sort=True):
+        yield str(period), part.reset_index(drop=True)
+
+
+def export_partitions(fact, dim_date=None, dim_stock=None, market=None, export_dir=None):
+    """
+    Write changed monthly fact partitions and changed dimensions.
+
+    Parameters:
+    fact (pd.DataFrame): fact_stock_daily
+    dim_date, dim_stock (pd.DataFrame): Dimensions (skipped if None)
+    market (pd.DataFrame): fact_market_daily (skipped if None)
+    export_dir (Path): Target directory (default: output/powerbi)
+
+    Returns:
+    dict: The saved manifest; 'changed' / 'removed' list the files of this run
+    """
+    export_dir = export_dir or EXPORT_DIR
+    fact_dir = export_dir / FACT_NAME
+    fact_dir.mkdir(parents=True, exist_ok=True)
+    previous = load_manifest(export_dir) or {}
+    run_at = datetime.now().isoformat(timespec='seconds')
+
+    columns = previous.get('columns') or list(fact.columns)
+    schema_changed = bool(previous) and set(columns) != set(fact.columns)
+    if schema_changed:
+        columns = list(fact.columns)
+        logger.info(f"Fact schema changed; rewriting every partition ({len(columns)} columns)")
+    known = {} if schema_changed else previous.get('partitions', {})
+
+    partitions, changed = {}, []
+    for month, part in _month_partitions(fact, columns):
+        digest = content_hash(part)
+        entry = known.get(month)
+        if entry is None or entry['hash'] != digest or not (export_dir / entry['file']).exists():
+            filename = f'{FACT_NAME}/{FACT_NAME}_{month}.csv'
+            write_atomic(part, export_dir / filename, **CSV_OPTIONS)
+            entry = {'file': filename, 'hash': digest, 'rows': len(part),
+                     'date_min': str(part['date'].min().date()), 'date_max': str(part['date'].max().date()),
+                     'updated_at': run_at}
+            changed.append(filename)
+        partitions[month] = entry
+
+    removed = [entry['file'] for month, entry in previous.get('partitions', {}).items() if month not in partitions]
+    for filename in removed:
+        (export_dir / filename).unlink(missing_ok=True)
+
+    dimensions = {}
+    for name, df in zip(DIMENSIONS + (MARKET_NAME,), (dim_date, dim_stock, market)):
+        entry = previous.get('dimensions', {}).get(name)
+        if df is None:
+            if entry is not None:
+                dimensions[name] = entry
+            continue
+        digest = content_hash(df)
+        if entry is None or entry['hash'] != digest or not (export_dir / entry['file']).exists():
+            entry = {'file': f'{name}.csv', 'hash': digest, 'rows': len(df), 'updated_at': run_at}
+            write_atomic(df, export_dir / entry['file'], **CSV_OPTIONS)
+            changed.append(entry['file'])
+        dimensions[name] = entry
+
+    manifest = {
+        'exported_at': run_at,
+        'columns': columns,
+        'schema_changed': schema_changed,
+        'partitions': partitions,
+        'dimensions': dimensions,
+        'changed': changed,
+        'removed': removed,
+    }
+    tmp = export_dir / f'.{MANIFEST_FILE}.tmp'
+    tmp.write_text(json.dumps(manifest, indent=2))
+    tmp.replace(export_dir / MANIFEST_FILE)
+    return manifest
+
+
+def changed_since(timestamp, export_dir=None):
+    """
+    Partition files updated after an ISO timestamp (for loaders that track their last pull).
+
+    Returns:
+    list: Relative file paths, fact partitions first
+    """
+    manifest = load_manifest(export_dir)
+    if manifest is None:
+        return []
+    entries = list(manifest['partitions'].values()) + list(manifest['dimensions'].values())
+    return [entry['file'] for entry in entries if entry['updated_at'] > timestamp]
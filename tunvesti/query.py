@@ -0,0 +1,214 @@
+"""
+TUNVESTI - Embedded SQL query layer
+Registers the star schema produced by script 03 (fact_stock_daily, dim_date,
+dim_stock, fact_market_daily) as DuckDB views over the output files, so ad-hoc SQL runs directly
+on disk without loading the fact table into pandas.
+
+Usage:
+    from tunvesti.query import run_query
+    df = run_query("SELECT ticker, max(close) FROM fact_stock_daily GROUP BY 1")
+
+    python -m tunvesti query --sql "SELECT count(*) FROM fact_stock_daily"
+    python -m tunvesti query --saved sector_returns_quarterly
+"""
+
+import logging
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+# Views registered on every connection: name -> output file stem
+TABLES = {
+    'fact_stock_daily': 'fact_stock_daily',
+    'dim_date': 'dim_date',
+    'dim_stock': 'dim_stock',
+    'fact_market_daily': 'fact_market_daily',
+}
+
+# Dashboard rollups from tunvesti.cube, registered when they have been built
+CUBE_TABLES = {
+    'cube_sector_month': 'cube/sector_month',
+    'cube_ticker_month': 'cube/ticker_month',
+    'cube_ticker_year': 'cube/ticker_year',
+    'cube_date': 'cube/date',
+}
+
+# Named queries for common dashboard questions
+SAVED_QUERIES = {
+    'sector_returns_monthly': """
+        SELECT sector, year, month,
+               round(avg_daily_return_pct, 4) AS avg_daily_return_pct,
+               round(avg_volatility_30d, 2) AS avg_volatility_30d,
+               total_volume
+        FROM cube_sector_month
+        ORDER BY year, month, sector
+    """,
+    'sector_returns_quarterly': """
+        WITH ticker_quarter AS (
+            SELECT s.sector, d.year, d.quarter, f.ticker,
+                   (product(1 + f.daily_return_pct / 100) - 1) * 100 AS return_pct
+            FROM fact_stock_daily f
+            JOIN dim_stock s USING (ticker)
+            JOIN dim_date d USING (date)
+            WHERE f.daily_return_pct IS NOT NULL AND s.sector IS NOT NULL
+            GROUP BY ALL
+        )
+        SELECT sector, year, quarter,
+               round(avg(return_pct), 2) AS avg_return_pct,
+               count(*) AS stocks
+        FROM ticker_quarter
+        GROUP BY ALL
+        ORDER BY year, quarter, sector
+    """,
+    'top_volatility_latest': """
+        SELECT f.ticker, s.sector, round(f.volatility_30d, 2) AS volatility_30d, f.close
+        FROM fact_stock_daily f
+        LEFT JOIN dim_stock s USING (ticker)
+        WHERE f.volatility_30d IS NOT NULL
+        QUALIFY row_number() OVER (PARTITION BY f.ticker ORDER BY f.date DESC) = 1
+        ORDER BY volatility_30d DESC
+        LIMIT 15
+    """,
+    'dividend_leaders': """
+        SELECT f.ticker, s.sector, year(f.date) AS year,
+               round(max(f.dividend_yield_pct), 2) AS max_dividend_yield_pct
+        FROM fact_stock_daily f
+        LEFT JOIN dim_stock s USING (ticker)
+        WHERE f.dividend_yield_pct > 0
+        GROUP BY ALL
+        ORDER BY year DESC, max_dividend_yield_pct DESC
+    """,
+    'ticker_summary': """
+        SELECT ticker, min(date) AS first_date, max(date) AS last_date, count(*) AS days,
+               round(avg(daily_return_pct), 4) AS avg_return_pct,
+               round(avg(volatility_30d), 2) AS avg_volatility_30d,
+               round(avg(volume), 0) AS avg_volume
+        FROM fact_stock_daily
+        GROUP BY ticker
+        ORDER BY ticker
+    """,
+}
+
+
+def _import_duckdb():
+    """Import duckdb with an actionable error message."""
+    try:
+        import duckdb
+    except ImportError as e:
+        raise ImportError("The query layer requires duckdb: pip install duckdb") from e
+    return duckdb
+
+
+def table_source(name, output_dir=None):
+    """
+    Return the file backing a table, preferring the Parquet copy over CSV.
+
+    Parameters:
+    name (str): Output file stem, e.g. 'fact_stock_daily'
+    output_dir (Path): Directory holding the pipeline outputs
+
+    Returns:
+    Path (file, or partition directory) or None if neither exists
+    """
+    output_dir = output_dir or config.OUTPUT_DIR
+    for suffix in ('.parquet', '.csv'):
+        path = output_dir / f'{name}{suffix}'
+        if path.exists():
+            return path
+    # Partitioned table (snapshot store): a directory of <key>=<value> files
+    partitioned = output_dir / name
+    if partitioned.is_dir() and any(partitioned.glob('*=*')):
+        return partitioned
+    return None
+
+
+def data_version(output_dir=None):
+    """
+    Fingerprint of the pipeline outputs currently on disk.
+
+    Changes whenever script 03 rewrites a table or the cube, so caches keyed
+    on it are invalidated by a new pipeline run. Costs a handful of stat calls.
+
+    Returns:
+    str: Short hex digest
+    """
+    import hashlib
+
+    digest = hashlib.sha1()
+    for stem in list(TABLES.values()) + list(CUBE_TABLES.values()):
+        path = table_source(stem, output_dir)
+        if path is not None:
+            stat = path.stat()
+            digest.update(f'{path.name}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return digest.hexdigest()[:16]
+
+
+def _scan_expression(path):
+    """DuckDB table function scanning a file lazily."""
+    if path.is_dir():
+        suffix = '.parquet' if any(path.glob('*.parquet')) else '.csv'
+        path_sql = str(path / f'*{suffix}').replace("'", "''")
+        if suffix == '.parquet':
+            return f"read_parquet('{path_sql}', union_by_name = true)"
+        return f"read_csv('{path_sql}', header = true, auto_detect = true, union_by_name = true)"
+    path_sql = str(path).replace("'", "''")
+    if path.suffix == '.parquet':
+        return f"read_parquet('{path_sql}')"
+    return f"read_csv('{path_sql}', header = true, auto_detect = true)"
+
+
+def connect(output_dir=None, database=':memory:'):
+    """
+    Open a DuckDB connection with the star schema registered as views.
+
+    Views scan the files on every query (projection and filter pushdown),
+    so nothing is materialized in RAM up front.
+
+    Parameters:
+    output_dir (Path): Directory holding the pipeline outputs (default: output/)
+    database (str): DuckDB database file, in-memory by default
+
+    Returns:
+    duckdb.DuckDBPyConnection
+    """
+    duckdb = _import_duckdb()
+    con = duckdb.connect(database)
+
+    for view, stem in TABLES.items():
+        path = table_source(stem, output_dir)
+        if path is None:
+            logger.warning(f"⚠ {stem} not found in {output_dir or config.OUTPUT_DIR}; view '{view}' not registered")
+            continue
+        con.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {_scan_expression(path)}")
+        logger.debug(f"Registered {view} -> {path.name}")
+
+    for view, stem in CUBE_TABLES.items():
+        path = table_source(stem, output_dir)
+        if path is not None:
+            con.execute(f"CREATE OR REPLACE VIEW {view} AS SELECT * FROM {_scan_expression(path)}")
+
+    return con
+
+
+def run_query(sql, params=None, con=None, output_dir=None):
+    """
+    Run a SQL query against the star schema and return a pandas DataFrame.
+
+    Parameters:
+    sql (str): SQL text, or the name of an entry in SAVED_QUERIES
+    params (list): Optional positional parameters for '?' placeholders
+    con: Existing connection from connect(); a temporary one is opened otherwise
+    output_dir (Path): Directory holding the pipeline outputs
+
+    Returns:
+    pd.DataFrame: Query result
+    """
+    sql = SAVED_QUERIES.get(sql, sql)
+    owns_connection = con is None
+    con = con or connect(output_dir)
+    try:
+        return con.execute(sql, params or []).df()
+    finally:
+        if owns_connection:
+            con.close()
@@ -0,0 +1,217 @@
+"""
+TUNVESTI - Monthly segments of the daily scrape files
+Compacts output/daily_updates/updated_<kind>_YYYY-MM-DD.csv (one small file
+per scrape day) into one columnar file per kind and month, with min/max date
+statistics in a catalog, so reading a date range opens a few segments
+instead of parsing every daily CSV.
+
+Layout (output/daily_updates/segments/):
+    catalog.json                  per segment: file, rows, date_min, date_max, sources
+    stocks_2025-12.parquet        all updated_stocks_2025-12-*.csv, with a source_date column
+    index_2025-12.parquet
+
+Compaction is idempotent: a month is rewritten only when its set of daily
+files (name, size, mtime) changed, so the daily run rewrites the current
+month at most. Segments are Parquet when pyarrow is installed, CSV
+otherwise. The daily files are kept unless remove_sources is set, which
+deletes those of closed months once they are in a segment.
+
+read_range() prunes on the catalog statistics, and also picks up daily
+files that have not been compacted yet (their date is in the file name),
+so it always returns everything scraped in the range.
+
+Usage:
+    python -m tunvesti compact [--remove-sources]
+
+    from tunvesti.segments import compact, read_range
+    compact()
+    q4 = read_range('stocks', '2025-10-01', '2025-12-31')
+"""
+
+import json
+import logging
+import re
+from datetime import datetime
+
+import pandas as pd
+
+from tunvesti import config
+from tunvesti.snapshots import write_atomic
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_DIR = config.DAILY_UPDATES_DIR / 'segments'
+CATALOG_FILE = 'catalog.json'
+KINDS = ('stocks', 'index')
+DAILY_PATTERN = re.compile(r'^updated_(?P<kind>[a-z]+)_(?P<date>\d{4}-\d{2}-\d{2})\.csv$')
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def daily_files(daily_dir=None):
+    """Daily scrape files: (kind, month) -> sorted list of (date, path)."""
+    daily_dir = daily_dir or config.DAILY_UPDATES_DIR
+    groups = {}
+    if not daily_dir.exists():
+        return groups
+    for path in daily_dir.glob('updated_*.csv'):
+        match = DAILY_PATTERN.match(path.name)
+        if match is None or match['kind'] not in KINDS:
+            continue
+        groups.setdefault((match['kind'], match['date'][:7]), []).append((match['date'], path))
+    return {key: sorted(files) for key, files in sorted(groups.items())}
+
+
+def load_catalog(segment_dir=None):
+    path = (segment_dir or SEGMENT_DIR) / CATALOG_FILE
+    if not path.exists():
+        return {'segments': {}}
+    return json.loads(path.read_text())
+
+
+def _fingerprint(files):
+    return [[path.name, path.stat().st_size, path.stat().st_mtime_ns] for _, path in files]
+
+
+def _read_daily(files):
+    frames = [pd.read_csv(path).assign(source_date=date) for date, path in files]
+    df = pd.concat(frames, ignore_index=True)
+    # A column parsed as numbers in one file and text in another is kept as text
+    for col in df.columns[df.dtypes == object]:
+        df[col] = df[col].where(df[col].isna(), df[col].astype(str))
+    df['source_date'] = pd.to_datetime(df['source_date'])
+    return df
+
+
+def _date_column(df):
+    return 'Date' if 'Date' in df.columns else 'date' if 'date' in df.columns else 'source_date'
+
+
+# ============================================================================
+# COMPACTION
+# ============================================================================
+
+def compact(daily_dir=None, segment_dir=None, remove_sources=False, today=None):
+    """
+    Merge daily scrape files into monthly segments (changed months only).
+
+    Parameters:
+    daily_dir (Path): Directory of the daily files (default: output/daily_updates)
+    segment_dir (Path): Segment directory (default: output/daily_updates/segments)
+    remove_sources (bool): Delete daily files of closed months after compaction
+    today (date): Reference date for "closed month" (default: today)
+
+    Returns:
+    dict: The saved catalog plus 'written' (segment names) and 'removed' (file count)
+    """
+    segment_dir = segment_dir or SEGMENT_DIR
+    segment_dir.mkdir(parents=True, exist_ok=True)
+    catalog = load_catalog(segment_dir)
+    suffix = '.parquet' if _parquet_available() else '.csv'
+    current_month = (today or datetime.now()).strftime('%Y-%m')
+    written, removed = [], 0
+
+    for (kind, month), files in daily_files(daily_dir).items():
+        name = f'{kind}_{month}'
+        entry = catalog['segments'].get(name)
+        fingerprint = _fingerprint(files)
+        current = all(source in entry['sources'] for source in fingerprint) if entry else False
+        if not current or not (segment_dir / entry['file']).exists():
+            df = _read_daily(files)
+            if entry is not None and (segment_dir / entry['file']).exists():
+                # Keep the days whose daily file was removed after an earlier compaction
+                names = {path.name for _, path in files}
+                gone = [source for source in entry['sources'] if source[0] not in names]
+                if gone:
+                    old = read_segment(segment_dir / entry['file'])
+                    df = pd.concat([old[~old['source_date'].isin(df['source_date'])], df], ignore_index=True)
+                    fingerprint = gone + fingerprint
+            dates = pd.to_datetime(df[_date_column(df)], errors='coerce')
+            df = df.iloc[dates.argsort(kind='stable')].reset_index(drop=True)
+            entry = {
+                'kind': kind, 'month': month, 'file': f'{name}{suffix}', 'rows': len(df),
+                'date_min': str(dates.min().date()), 'date_max': str(dates.max().date()),
+                'sources': sorted(fingerprint),
+            }
+            write_atomic(df, segment_dir / entry['file'])
+            catalog['segments'][name] = entry
+            written.append(name)
+
+        if remove_sources and month < current_month:
+            for _, path in files:
+                path.unlink()
+                removed += 1
+
+    catalog['compacted_at'] = datetime.now().isoformat(timespec='seconds')
+    tmp = segment_dir / f'.{CATALOG_FILE}.tmp'
+    tmp.write_text(json.dumps(catalog, indent=2))
+    tmp.replace(segment_dir / CATALOG_FILE)
+    if written:
+        logger.info(f"Compacted {len(written)} segment(s): {', '.join(written)}")
+    return dict(catalog, written=written, removed=removed)
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def read_segment(path, columns=None):
+    if path.suffix == '.parquet':
+        return pd.read_parquet(path, columns=columns)
+    df = pd.read_csv(path, usecols=columns)
+    if 'source_date' in df.columns:
+        df['source_date'] = pd.to_datetime(df['source_date'])
+    return df
+
+
+def read_range(kind='stocks', start=None, end=None, columns=None, daily_dir=None, segment_dir=None):
+    """
+    All scraped rows of one kind between start and end (inclusive).
+
+    Segments whose [date_min, date_max] misses the range are not opened;
+    daily files newer than the catalog are read directly.
+
+    Parameters:
+    kind (str): 'stocks' or 'index'
+    start, end: Date bounds (default: unbounded)
+    columns (list): Columns to read (Parquet segments only read those)
+
+    Returns:
+    pd.DataFrame: Rows sorted by date, with a source_date column
+    """
+    segment_dir = segment_dir or SEGMENT_DIR
+    lo = pd.Timestamp(start) if start is not None else pd.Timestamp.min
+    hi = pd.Timestamp(end) if end is not None else pd.Timestamp.max
+    wanted = None if columns is None else list(dict.fromkeys(list(columns) + ['source_date']))
+
+    # Daily files not in a segment, or rewritten since (their rows replace the segment's)
+    segments = [entry for entry in load_catalog(segment_dir)['segments'].values() if entry['kind'] == kind]
+    compacted = {tuple(source) for entry in segments for source in entry['sources']}
+    in_range = [(date, path) for (file_kind, _), files in daily_files(daily_dir).items() if file_kind == kind
+                for date, path in files if lo <= pd.Timestamp(date) <= hi]
+    pending = [(date, path) for (date, path), source in zip(in_range, _fingerprint(in_range))
+               if tuple(source) not in compacted]
+    pending_dates = pd.to_datetime([date for date, _ in pending])
+
+    frames = []
+    for entry in segments:
+        if pd.Timestamp(entry['date_max']) < lo or pd.Timestamp(entry['date_min']) > hi:
+            continue
+        df = read_segment(segment_dir / entry['file'], wanted)
+        frames.append(df[~df['source_date'].isin(pending_dates)])
+    if pending:
+        daily = _read_daily(pending)
+        frames.append(daily if wanted is None else daily.reindex(columns=wanted))
+
+    if not frames:
+        return pd.DataFrame(columns=wanted)
+    df = pd.concat(frames, ignore_index=True)
+    dates = pd.to_datetime(df[_date_column(df)], errors='coerce')
+    inside = dates.between(lo, hi).to_numpy()
+    return df[inside].iloc[dates[inside].argsort(kind='stable')].reset_index(drop=True)
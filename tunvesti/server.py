@@ -0,0 +1,430 @@
+"""
+TUNVESTI - Local read-only HTTP query API
+Serves ticker time series, sector aggregates and latest snapshots from the
+pipeline outputs (through the DuckDB query layer) to the Streamlit / Power BI
+front ends, so they stop re-reading CSVs from output/.
+
+Endpoints (GET only):
+    /health                         liveness + current data version
+    /tickers                        dim_stock
+    /series/<TICKER>?start=&end=&columns=close,volume
+    /sectors?start=&end=            cube_sector_month (or fact fallback)
+    /snapshot/latest                last row per ticker
+    /chart/<TICKER>?width=800&start=&end=&field=close&method=lttb|minmax|ohlc
+                                    downsampled series from the chart pyramid
+
+Every endpoint accepts ?format=json (default) or ?format=arrow (Arrow IPC
+stream, requires pyarrow). Responses are streamed with chunked encoding,
+carry an ETag derived from the data version, and are kept in an LRU cache
+that is dropped as soon as the pipeline publishes new outputs.
+
+Usage:
+    python -m tunvesti serve --port 8765
+"""
+
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from tunvesti import query
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+BATCH_ROWS = 5_000
+IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+# ============================================================================
+# RESULT CACHE
+# ============================================================================
+
+class ResultCache:
+    """Thread-safe LRU of response bodies, bounded by entries and bytes."""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = None
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def sync_version(self, version):
+        """Drop every entry if the data version changed."""
+        with self._lock:
+            if version != self.version:
+                self._entries.clear()
+                self._size = 0
+                self.version = version
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            if key in self._entries or len(body) > self.max_bytes:
+                return
+            self._entries[key] = body
+            self._size += len(body)
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._size,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+# ============================================================================
+# ROUTES -> SQL
+# ============================================================================
+
+def _date_filters(params, column='date'):
+    conditions, args = [], []
+    if 'start' in params:
+        conditions.append(f'{column} >= CAST(? AS DATE)')
+        args.append(params['start'])
+    if 'end' in params:
+        conditions.append(f'{column} <= CAST(? AS DATE)')
+        args.append(params['end'])
+    return conditions, args
+
+
+def route_tickers(params):
+    return 'SELECT * FROM dim_stock ORDER BY ticker', []
+
+
+def route_series(params, ticker):
+    columns = params.get('columns', 'open,high,low,close,volume,daily_return_pct').split(',')
+    if not all(IDENTIFIER.match(c) for c in columns):
+        raise ValueError('invalid column name')
+    conditions, args = _date_filters(params)
+    conditions.insert(0, 'ticker = ?')
+    args.insert(0, ticker.upper())
+    sql = (f"SELECT CAST(date AS DATE) AS date, {', '.join(columns)} FROM fact_stock_daily "
+           f"WHERE {' AND '.join(conditions)} ORDER BY date")
+    return sql, args
+
+
+def route_sectors(params, cursor):
+    has_cube = cursor.execute(
+        "SELECT count(*) FROM duckdb_views() WHERE view_name = 'cube_sector_month'").fetchone()[0]
+    conditions, args = _date_filters(params, column='make_date(year, month, 1)')
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    if has_cube:
+        sql = (f"SELECT sector, year, month, avg_daily_return_pct, avg_volatility_30d, "
+               f"total_volume, avg_dividend_yield_pct FROM cube_sector_month {where} "
+               f"ORDER BY year, month, sector")
+    else:
+        sql = (f"SELECT * FROM (SELECT coalesce(s.sector, 'Unclassified') AS sector, "
+               f"year(f.date) AS year, month(f.date) AS month, "
+               f"avg(f.daily_return_pct) AS avg_daily_return_pct, "
+               f"avg(f.volatility_30d) AS avg_volatility_30d, sum(f.volume) AS total_volume, "
+               f"avg(f.dividend_yield_pct) FILTER (WHERE f.dividend_yield_pct > 0) AS avg_dividend_yield_pct "
+               f"FROM fact_stock_daily f LEFT JOIN dim_stock s USING (ticker) GROUP BY ALL) {where} "
+               f"ORDER BY year, month, sector")
+    return sql, args
+
+
+def route_chart(params, ticker, cursor, pyramid):
+    from tunvesti import charts
+
+    width = int(params.get('width', charts.DEFAULT_WIDTH))
+    if width < 1:
+        raise ValueError('width must be positive')
+    method = params.get('method', 'lttb')
+    try:
+        if method == 'ohlc':
+            df = charts.candles(ticker, width, params.get('start'), params.get('end'), pyramid)
+        else:
+            df = charts.chart_series(ticker, width, params.get('start'), params.get('end'),
+                                     params.get('field', 'close'), method, pyramid)
+    except KeyError as e:
+        raise ValueError(e.args[0]) from e
+    # Registered on this request's cursor only
+    cursor.register('chart_series', df)
+    return 'SELECT CAST(date AS DATE) AS date, * EXCLUDE (date) FROM chart_series', []
+
+
+def route_snapshot_latest(params):
+    sql = ("SELECT CAST(f.date AS DATE) AS date, f.* EXCLUDE (date), s.sector "
+           "FROM fact_stock_daily f LEFT JOIN dim_stock s USING (ticker) "
+           "QUALIFY row_number() OVER (PARTITION BY f.ticker ORDER BY f.date DESC) = 1 "
+           "ORDER BY f.ticker")
+    return sql, []
+
+
+# ============================================================================
+# ENCODERS (generators of byte chunks)
+# ============================================================================
+
+def _json_value(value):
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+def stream_json(cursor):
+    """Yield a JSON array of row objects, one batch at a time."""
+    columns = [d[0] for d in cursor.description]
+    yield b'['
+    first = True
+    while True:
+        rows = cursor.fetchmany(BATCH_ROWS)
+        if not rows:
+            break
+        records = [dict(zip(columns, map(_json_value, row))) for row in rows]
+        text = ','.join(json.dumps(r, default=str, separators=(',', ':')) for r in records)
+        yield (text if first else ',' + text).encode()
+        first = False
+    yield b']'
+
+
+def stream_arrow(cursor):
+    """Yield an Arrow IPC stream, one record batch at a time."""
+    import io
+    import pyarrow as pa
+
+    reader = cursor.fetch_record_batch(BATCH_ROWS)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, reader.schema)
+    for batch in reader:
+        writer.write_batch(batch)
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+    writer.close()
+    yield sink.getvalue()
+
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+
+# ============================================================================
+# HTTP SERVER
+# ============================================================================
+
+class QueryService:
+    """Owns the DuckDB connection, the data version and the result cache."""
+
+    def __init__(self, output_dir=None, cache=None):
+        self.output_dir = output_dir
+        self.cache = cache or ResultCache()
+        self._lock = threading.Lock()
+        self._con = None
+        # id(connection) -> [connection, cursors handed out and not yet released]
+        self._users = {}
+        self._cursor_con = {}
+        self._pyramid = None
+        self._pyramid_mtime = None
+        self.version = None
+
+    def current(self):
+        """
+        Return (cursor, version), reconnecting when outputs changed.
+
+        Hand the cursor back with release(). A connection replaced by a newer
+        data version stays open until the last of its cursors is released, so
+        requests in flight during the swap are not cut off.
+        """
+        version = query.data_version(self.output_dir)
+        with self._lock:
+            if version != self.version or self._con is None:
+                previous = self._con
+                self._con = query.connect(self.output_dir)
+                self._users[id(self._con)] = [self._con, 0]
+                self._pyramid = None
+                self.version = version
+                if previous is not None:
+                    self._close_if_idle(previous)
+                logger.info(f"Serving data version {version}")
+            self.cache.sync_version(version)
+            # One cursor per request: DuckDB connections are not shared across threads
+            cursor = self._con.cursor()
+            self._users[id(self._con)][1] += 1
+            self._cursor_con[id(cursor)] = self._con
+            return cursor, version
+
+    def release(self, cursor):
+        """Close a cursor from current(), and its connection if that has been replaced and is idle."""
+        cursor.close()
+        with self._lock:
+            con = self._cursor_con.pop(id(cursor))
+            self._users[id(con)][1] -= 1
+            if con is not self._con:
+                self._close_if_idle(con)
+
+    def _close_if_idle(self, con):
+        """Close a replaced connection once no cursor of it is in use (lock held)."""
+        if self._users[id(con)][1] == 0:
+            del self._users[id(con)]
+            con.close()
+
+    def pyramid(self):
+        """Chart pyramid of the current outputs, reopened whenever its meta.json is replaced."""
+        from tunvesti.charts import CHART_DIR, META_FILE, Pyramid
+
+        chart_dir = self.output_dir / CHART_DIR.name if self.output_dir else CHART_DIR
+        try:
+            mtime = (chart_dir / META_FILE).stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            if self._pyramid is None or mtime != self._pyramid_mtime:
+                self._pyramid = Pyramid.open(chart_dir)
+                self._pyramid_mtime = mtime
+            return self._pyramid
+
+    def resolve(self, path, params, cursor):
+        """Map a request path to (sql, args); None if unknown."""
+        parts = [p for p in path.split('/') if p]
+        if parts == ['tickers']:
+            return route_tickers(params)
+        if len(parts) == 2 and parts[0] == 'series':
+            return route_series(params, parts[1])
+        if parts == ['sectors']:
+            return route_sectors(params, cursor)
+        if parts == ['snapshot', 'latest']:
+            return route_snapshot_latest(params)
+        if len(parts) == 2 and parts[0] == 'chart':
+            return route_chart(params, parts[1], cursor, self.pyramid())
+        return None
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    service = None  # set by make_server
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def _send_small(self, status, payload, headers=None):
+        body = json.dumps(payload, default=str).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        if data:
+            self.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        fmt = params.pop('format', 'json')
+
+        cursor, version = self.service.current()
+        try:
+            self._respond(url, params, fmt, cursor, version)
+        finally:
+            self.service.release(cursor)
+
+    def _respond(self, url, params, fmt, cursor, version):
+        if url.path.rstrip('/') == '/health':
+            self._send_small(200, {'status': 'ok', 'version': version, 'cache': self.service.cache.stats()})
+            return
+        if fmt not in CONTENT_TYPES:
+            self._send_small(400, {'error': f'unsupported format {fmt!r}'})
+            return
+
+        # Data is immutable per version, so the ETag needs no query execution
+        key = f'{version}|{url.path}|{sorted(params.items())}|{fmt}'
+        etag = '"' + hashlib.sha1(key.encode()).hexdigest()[:20] + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        headers = {'Content-Type': CONTENT_TYPES[fmt], 'ETag': etag,
+                   'Cache-Control': 'no-cache', 'X-Data-Version': version}
+
+        cached = self.service.cache.get(key)
+        if cached is not None:
+            self.send_response(200)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(cached)))
+            self.send_header('X-Cache', 'HIT')
+            self.end_headers()
+            self.wfile.write(cached)
+            return
+
+        try:
+            resolved = self.service.resolve(url.path, params, cursor)
+            if resolved is None:
+                self._send_small(404, {'error': f'unknown endpoint {url.path}'})
+                return
+            sql, args = resolved
+            cursor.execute(sql, args)
+        except ValueError as e:
+            self._send_small(400, {'error': str(e)})
+            return
+        except Exception as e:
+            logger.warning(f"Query failed for {self.path}: {e}")
+            self._send_small(500, {'error': str(e)})
+            return
+
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Cache', 'MISS')
+        self.end_headers()
+
+        encoder = stream_arrow if fmt == 'arrow' else stream_json
+        chunks, size = [], 0
+        for chunk in encoder(cursor):
+            self._write_chunk(chunk)
+            if size <= self.service.cache.max_bytes:
+                chunks.append(chunk)
+                size += len(chunk)
+        self.wfile.write(b'0\r\n\r\n')
+
+        if size <= self.service.cache.max_bytes:
+            self.service.cache.put(key, b''.join(chunks))
+
+
+def make_server(host=DEFAULT_HOST, port=DEFAULT_PORT, output_dir=None, cache=None):
+    """Create (but do not start) the HTTP server."""
+    handler = type('BoundRequestHandler', (RequestHandler,), {'service': QueryService(output_dir, cache)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, output_dir=None):
+    """Run the API until interrupted."""
+    server = make_server(host, port, output_dir)
+    logger.info(f"TUNVESTI query API listening on http://{host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Server stopped by user")
+    finally:
+        server.server_close()
@@ -0,0 +1,353 @@
+"""
+TUNVESTI - Versioned snapshot store
+Immutable, versioned copies of the star schema (fact_stock_daily partitioned
+by year, dim_date, dim_stock, cube rollups) so readers never see a
+half-written table and a bad run can be rolled back.
+
+Layout (output/snapshots/):
+    CURRENT                                 name of the published snapshot
+    20250612-153001-042137/manifest.json    tables, partitions, content hashes, rows
+    20250612-153001-042137/fact_stock_daily/year=2024.parquet
+    20250612-153001-042137/dim_date.parquet
+    ...
+
+Publishing writes a snapshot into a staging directory, renames it into
+place, then replaces CURRENT in one os.replace() - readers resolve CURRENT
+once and keep a consistent view. Partitions whose content hash matches the
+previous snapshot are hard-linked instead of rewritten, so a daily run costs
+one write per changed partition (usually the current year) plus the
+dimensions. Old snapshots are deleted by the retention policy; shared files
+survive as long as a snapshot still links them.
+
+Usage:
+    from tunvesti.snapshots import publish, read_table, snapshot_path
+    publish({'fact_stock_daily': (fact, 'year'), 'dim_date': (dim_date, None)})
+    fact = read_table('fact_stock_daily', partitions=['year=2025'])
+    query.connect(snapshot_path())          # SQL over the current snapshot
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = config.OUTPUT_DIR / 'snapshots'
+CURRENT_FILE = 'CURRENT'
+MANIFEST_FILE = 'manifest.json'
+STAGING_PREFIX = '.staging-'
+BUILD_PREFIX = 'build-'
+# Retention: the newest KEEP_SNAPSHOTS are always kept, older ones only while
+# younger than KEEP_DAYS; the current snapshot is never deleted
+KEEP_SNAPSHOTS = 7
+KEEP_DAYS = 30
+VERSION_FORMAT = '%Y%m%d-%H%M%S-%f'
+
+
+def _parquet_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# ============================================================================
+# WRITING
+# ============================================================================
+
+def write_atomic(df, path, **kwargs):
+    """Write a CSV/Parquet file through a temporary file and os.replace()."""
+    tmp = path.with_name(f'.{path.name}.tmp')
+    if path.suffix == '.parquet':
+        df.to_parquet(tmp, index=False, **kwargs)
+    else:
+        df.to_csv(tmp, index=False, **kwargs)
+    os.replace(tmp, path)
+    return path
+
+
+def new_build(root):
+    """
+    Name and empty staging directory for a new build of a memory-mapped store.
+
+    Returns:
+    tuple: (build name, staging directory inside root)
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    build = f'{BUILD_PREFIX}{datetime.now().strftime(VERSION_FORMAT)}'
+    staging = root / f'{STAGING_PREFIX}{build}'
+    staging.mkdir()
+    return build, staging
+
+
+def publish_build(root, staging, meta, meta_file='meta.json'):
+    """
+    Swap a fully written build into a store of memory-mapped files (panel, charts).
+
+    staging is renamed to root/<meta['build']>, then root/<meta_file> is
+    replaced in one os.replace(), so a reader sees the old or the new build,
+    never a mix, and no mapped file is ever rewritten in place. The previous
+    build is kept for readers holding the old meta; older builds, leftover
+    staging directories and .npy files of the flat layout are deleted
+    (mapped files may refuse deletion on Windows; the next build retries).
+    """
+    meta_path = root / meta_file
+    previous = json.loads(meta_path.read_text()).get('build') if meta_path.exists() else None
+    os.replace(staging, root / meta['build'])
+    tmp = root / f'.{meta_file}.tmp'
+    tmp.write_text(json.dumps(meta, indent=2))
+    os.replace(tmp, meta_path)
+
+    for path in root.iterdir():
+        if path.name in (meta['build'], previous):
+            continue
+        if path.is_dir():
+            shutil.rmtree(path, ignore_errors=True)
+        elif path.suffix == '.npy':
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def content_hash(df):
+    """Hash of a frame's columns, dtypes and values (vectorized, no serialization)."""
+    digest = hashlib.sha1()
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def _partitions(df, partition_by):
+    """Yield (partition key, frame); 'year' partitions on the year of the date column."""
+    if partition_by is None:
+        yield '', df
+        return
+    if partition_by == 'year':
+        keys = pd.to_datetime(df['date']).dt.year
+    else:
+        keys = df[partition_by]
+    for key, part in df.groupby(keys, sort=True):
+        yield f'{partition_by}={key}', part.reset_index(drop=True)
+
+
+def _link_or_copy(source, target):
+    try:
+        os.link(source, target)
+        return True
+    except OSError:
+        shutil.copy2(source, target)
+        return False
+
+
+def _new_version(snapshot_dir):
+    version = datetime.now().strftime(VERSION_FORMAT)
+    candidate, n = version, 1
+    while (snapshot_dir / candidate).exists():
+        candidate = f'{version}.{n}'
+        n += 1
+    return candidate
+
+
+def publish(tables, files=None, snapshot_dir=None, keep=KEEP_SNAPSHOTS, keep_days=KEEP_DAYS):
+    """
+    Write a new snapshot and make it current.
+
+    Parameters:
+    tables (dict): name -> (DataFrame, partition column or 'year' or None)
+    files (dict): name -> existing file copied in as-is (e.g. cube rollup CSVs)
+    snapshot_dir (Path): Store root (default: output/snapshots)
+    keep, keep_days: Retention applied after publishing (keep=None skips it)
+
+    Returns:
+    dict: The snapshot manifest plus 'written' / 'linked' partition counts
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    previous_version = current_version(snapshot_dir)
+    previous = load_manifest(previous_version, snapshot_dir) if previous_version else None
+    previous_tables = previous['tables'] if previous else {}
+
+    version = _new_version(snapshot_dir)
+    staging = snapshot_dir / f'{STAGING_PREFIX}{version}'
+    staging.mkdir()
+    suffix = '.parquet' if _parquet_available() else '.csv'
+    manifest = {'version': version, 'created': datetime.now().isoformat(timespec='seconds'),
+                'previous': previous_version, 'tables': {}}
+    written = linked = 0
+
+    def place(name, key, digest, rows, write):
+        nonlocal written, linked
+        old = previous_tables.get(name, {}).get('partitions', {}).get(key)
+        if old is not None and old['hash'] == digest:
+            relative = old['file']
+            target = staging / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            _link_or_copy(snapshot_dir / previous_version / relative, target)
+            linked += 1
+        else:
+            relative = write()
+            written += 1
+        return {'file': relative, 'hash': digest, 'rows': rows}
+
+    for name, (df, partition_by) in tables.items():
+        partitions = {}
+        for key, part in _partitions(df, partition_by):
+            relative = f'{name}/{key}{suffix}' if key else f'{name}{suffix}'
+
+            def write(part=part, relative=relative):
+                target = staging / relative
+                target.parent.mkdir(parents=True, exist_ok=True)
+                if suffix == '.parquet':
+                    part.to_parquet(target, index=False)
+                else:
+                    part.to_csv(target, index=False)
+                return relative
+
+            partitions[key] = place(name, key, content_hash(part), len(part), write)
+        manifest['tables'][name] = {'partition_by': partition_by, 'partitions': partitions,
+                                    'rows': int(len(df))}
+
+    for name, source in (files or {}).items():
+        digest = hashlib.sha1(source.read_bytes()).hexdigest()
+        relative = f'{name}{source.suffix}'
+
+        def copy(source=source, relative=relative):
+            target = staging / relative
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(source, target)
+            return relative
+
+        manifest['tables'][name] = {'partition_by': None, 'partitions': {'': place(name, '', digest, None, copy)},
+                                    'rows': None}
+
+    (staging / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    os.rename(staging, snapshot_dir / version)
+    set_current(version, snapshot_dir)
+
+    if keep is not None:
+        collect_garbage(snapshot_dir, keep, keep_days)
+    return dict(manifest, written=written, linked=linked)
+
+
+def set_current(version, snapshot_dir=None):
+    """Atomically point CURRENT at an existing snapshot (also used to roll back)."""
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    if not (snapshot_dir / version / MANIFEST_FILE).exists():
+        raise ValueError(f"Snapshot '{version}' does not exist in {snapshot_dir}")
+    tmp = snapshot_dir / f'.{CURRENT_FILE}.tmp'
+    tmp.write_text(version)
+    os.replace(tmp, snapshot_dir / CURRENT_FILE)
+
+
+# ============================================================================
+# READING
+# ============================================================================
+
+def current_version(snapshot_dir=None):
+    """Name of the published snapshot, or None."""
+    path = (snapshot_dir or SNAPSHOT_DIR) / CURRENT_FILE
+    if not path.exists():
+        return None
+    return path.read_text().strip() or None
+
+
+def snapshot_path(version=None, snapshot_dir=None):
+    """Directory of a snapshot (the current one by default)."""
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    version = version or current_version(snapshot_dir)
+    if version is None:
+        raise FileNotFoundError(f"No snapshot has been published in {snapshot_dir}")
+    return snapshot_dir / version
+
+
+def load_manifest(version=None, snapshot_dir=None):
+    return json.loads((snapshot_path(version, snapshot_dir) / MANIFEST_FILE).read_text())
+
+
+def list_snapshots(snapshot_dir=None):
+    """Published snapshots, oldest first: version, created, tables, current."""
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    if not snapshot_dir.exists():
+        return pd.DataFrame(columns=['version', 'created', 'tables', 'current'])
+    current = current_version(snapshot_dir)
+    records = []
+    for path in sorted(snapshot_dir.iterdir()):
+        if path.is_dir() and (path / MANIFEST_FILE).exists():
+            manifest = json.loads((path / MANIFEST_FILE).read_text())
+            records.append({'version': path.name, 'created': manifest['created'],
+                            'tables': len(manifest['tables']), 'current': path.name == current})
+    return pd.DataFrame(records, columns=['version', 'created', 'tables', 'current'])
+
+
+def read_table(name, version=None, partitions=None, columns=None, snapshot_dir=None):
+    """
+    Read a table from one snapshot (the current one by default).
+
+    Parameters:
+    partitions (list): Partition keys to read, e.g. ['year=2024', 'year=2025'] (default: all)
+    columns (list): Columns to read (Parquet snapshots only read those)
+
+    Returns:
+    pd.DataFrame
+    """
+    root = snapshot_path(version, snapshot_dir)
+    entry = json.loads((root / MANIFEST_FILE).read_text())['tables'].get(name)
+    if entry is None:
+        raise KeyError(f"Table '{name}' is not in snapshot {root.name}")
+
+    frames = []
+    for key, part in entry['partitions'].items():
+        if partitions is not None and key not in partitions:
+            continue
+        path = root / part['file']
+        if path.suffix == '.parquet':
+            frames.append(pd.read_parquet(path, columns=columns))
+        else:
+            frames.append(pd.read_csv(path, usecols=columns))
+    if not frames:
+        return pd.DataFrame(columns=columns)
+    return pd.concat(frames, ignore_index=True)
+
+
+# ============================================================================
+# RETENTION
+# ============================================================================
+
+def collect_garbage(snapshot_dir=None, keep=KEEP_SNAPSHOTS, keep_days=KEEP_DAYS):
+    """
+    Delete snapshots outside the retention policy and abandoned staging directories.
+
+    Returns:
+    list: Deleted snapshot versions
+    """
+    snapshot_dir = snapshot_dir or SNAPSHOT_DIR
+    current = current_version(snapshot_dir)
+    cutoff = datetime.now() - timedelta(days=keep_days or 0)
+    snapshots = list_snapshots(snapshot_dir)
+    deleted = []
+
+    for i, row in enumerate(snapshots.itertuples()):
+        newest = len(snapshots) - i <= keep
+        recent = keep_days is not None and datetime.fromisoformat(row.created) >= cutoff
+        if row.version == current or newest or recent:
+            continue
+        try:
+            shutil.rmtree(snapshot_dir / row.version)
+            deleted.append(row.version)
+        except OSError as e:
+            # A reader may still hold files open (Windows); retry on the next run
+            logger.warning(f"Could not delete snapshot {row.version}: {e}")
+
+    for path in snapshot_dir.glob(f'{STAGING_PREFIX}*'):
+        if path.stat().st_mtime < (datetime.now() - timedelta(hours=1)).timestamp():
+            shutil.rmtree(path, ignore_errors=True)
+    return deleted
@@ -0,0 +1,221 @@
+"""
+TUNVESTI - Keyed price store
+Stock price rows keyed by (ticker, date) in a SQLite table clustered on that
+key (WITHOUT ROWID), so applying a day's scrape is an upsert of ~90 rows -
+O(new rows x log N) B-tree writes - instead of concatenating the whole
+history, dropping duplicates and re-sorting it. Reads come back ordered by
+ticker and date straight from the primary key, with no sort.
+
+Tables (output/prices.sqlite):
+    prices    ticker, date, open, high, low, close, volume, volatility, market_cap_m
+    updates   append-only log of every upserted batch row (replayed on rebuild)
+    batches   batch name, content hash, rows, applied_at
+    meta      history hash (the base layer loaded by load_history)
+
+A later row for the same key replaces the earlier one, like
+drop_duplicates(keep='last'). If the historical base file changes,
+load_history() reloads it and replays the update log on top, so scraped
+days are never lost.
+
+Usage:
+    from tunvesti.store import PriceStore
+    with PriceStore() as store:
+        store.load_history(df_hist)                      # no-op when unchanged
+        store.upsert(df_scraped, batch='updated_stocks_2025-12-26.csv')
+        df = store.read(start='2025-01-01')              # ordered by ticker, date
+"""
+
+import logging
+import sqlite3
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+logger = logging.getLogger(__name__)
+
+STORE_FILE = config.OUTPUT_DIR / 'prices.sqlite'
+KEY_COLUMNS = ['ticker', 'date']
+VALUE_COLUMNS = ['open', 'high', 'low', 'close', 'volume', 'volatility', 'market_cap_m']
+COLUMNS = KEY_COLUMNS + VALUE_COLUMNS
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS prices (
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {', '.join(f'{c} REAL' for c in VALUE_COLUMNS)},
+    PRIMARY KEY (ticker, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS updates (
+    seq INTEGER PRIMARY KEY,
+    batch TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    date TEXT NOT NULL,
+    {', '.join(f'{c} REAL' for c in VALUE_COLUMNS)}
+);
+CREATE TABLE IF NOT EXISTS batches (
+    batch TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    rows INTEGER NOT NULL,
+    applied_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_UPSERT = (f"INSERT INTO prices ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+           f"ON CONFLICT (ticker, date) DO UPDATE SET "
+           + ', '.join(f'{c} = excluded.{c}' for c in VALUE_COLUMNS))
+
+
+def _records(df):
+    """Rows of (ticker, date, values...) in store format; missing columns become NULL."""
+    frame = df.reindex(columns=COLUMNS)
+    keys = pd.DataFrame({
+        'ticker': frame['ticker'].astype(str).str.strip().str.upper(),
+        'date': pd.to_datetime(frame['date']).dt.strftime('%Y-%m-%d'),
+    })
+    values = frame[VALUE_COLUMNS].apply(pd.to_numeric, errors='coerce').astype(object)
+    values = values.where(values.notna(), None)
+    return list(zip(keys['ticker'], keys['date'], *(values[c] for c in VALUE_COLUMNS)))
+
+
+class PriceStore:
+    """SQLite-backed (ticker, date) keyed store of stock price rows."""
+
+    def __init__(self, path=None):
+        self.path = path or STORE_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.con = sqlite3.connect(self.path)
+        self.con.execute('PRAGMA journal_mode = WAL')
+        self.con.execute('PRAGMA synchronous = NORMAL')
+        self.con.executescript(_SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.con.close()
+
+    def __len__(self):
+        return self.con.execute('SELECT count(*) FROM prices').fetchone()[0]
+
+    def _meta(self, key):
+        row = self.con.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else None
+
+    # ------------------------------------------------------------------------
+    # Writing
+    # ------------------------------------------------------------------------
+
+    def load_history(self, df):
+        """
+        Load the historical base layer if it differs from the one in the store.
+
+        A changed base rebuilds the table: the new history, then every logged
+        update replayed in order.
+
+        Returns:
+        str: 'unchanged' or 'rebuilt'
+        """
+        from tunvesti.snapshots import content_hash
+
+        digest = content_hash(df.reindex(columns=COLUMNS).reset_index(drop=True))
+        if self._meta('history_hash') == digest:
+            return 'unchanged'
+
+        records = sorted(_records(df), key=lambda r: (r[0], r[1]))
+        with self.con:
+            self.con.execute('DELETE FROM prices')
+            self.con.executemany(_UPSERT, records)
+            self.con.execute(f"INSERT INTO prices ({', '.join(COLUMNS)}) "
+                             f"SELECT {', '.join(COLUMNS)} FROM updates WHERE true ORDER BY seq "
+                             f"ON CONFLICT (ticker, date) DO UPDATE SET "
+                             + ', '.join(f'{c} = excluded.{c}' for c in VALUE_COLUMNS))
+            self.con.execute("INSERT OR REPLACE INTO meta VALUES ('history_hash', ?)", (digest,))
+        logger.info(f"Price store rebuilt: {len(records)} historical rows, {self.update_count()} updates replayed")
+        return 'rebuilt'
+
+    def upsert(self, df, batch=None):
+        """
+        Insert new rows and replace existing (ticker, date) rows.
+
+        Parameters:
+        df (pd.DataFrame): Rows with ticker, date and any of VALUE_COLUMNS
+        batch (str): Name of the batch (e.g. the scrape file); a batch already
+            applied with identical content is skipped
+
+        Returns:
+        int: Rows written (0 if the batch was already applied)
+        """
+        from tunvesti.snapshots import content_hash
+
+        if df.empty:
+            return 0
+        batch = batch or datetime.now().isoformat(timespec='seconds')
+        digest = content_hash(df.reindex(columns=COLUMNS).reset_index(drop=True))
+        known = self.con.execute('SELECT hash FROM batches WHERE batch = ?', (batch,)).fetchone()
+        if known is not None and known[0] == digest:
+            return 0
+
+        records = _records(df)
+        with self.con:
+            self.con.executemany(_UPSERT, records)
+            self.con.executemany(f"INSERT INTO updates (batch, {', '.join(COLUMNS)}) "
+                                 f"VALUES (?, {', '.join('?' * len(COLUMNS))})",
+                                 [(batch,) + record for record in records])
+            self.con.execute('INSERT OR REPLACE INTO batches VALUES (?, ?, ?, ?)',
+                             (batch, digest, len(records), datetime.now().isoformat(timespec='seconds')))
+        return len(records)
+
+    # ------------------------------------------------------------------------
+    # Reading
+    # ------------------------------------------------------------------------
+
+    def read(self, tickers=None, start=None, end=None, columns=None):
+        """
+        Rows ordered by ticker and date (primary-key order, no sort).
+
+        Parameters:
+        tickers (list): Only these tickers (default: all)
+        start, end: Inclusive date bounds
+        columns (list): Value columns to return (default: all)
+
+        Returns:
+        pd.DataFrame: ticker, date (datetime64) and the value columns
+        """
+        columns = columns or VALUE_COLUMNS
+        where, params = [], []
+        if tickers is not None:
+            tickers = [t.upper() for t in tickers]
+            where.append(f"ticker IN ({', '.join('?' * len(tickers))})")
+            params += tickers
+        if start is not None:
+            where.append('date >= ?')
+            params.append(pd.Timestamp(start).strftime('%Y-%m-%d'))
+        if end is not None:
+            where.append('date <= ?')
+            params.append(pd.Timestamp(end).strftime('%Y-%m-%d'))
+        sql = f"SELECT ticker, date, {', '.join(columns)} FROM prices"
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY ticker, date'
+
+        df = pd.DataFrame(self.con.execute(sql, params).fetchall(), columns=KEY_COLUMNS + list(columns))
+        df['date'] = pd.to_datetime(df['date'], format='%Y-%m-%d')
+        df[columns] = df[columns].astype(np.float64)
+        return df
+
+    def update_count(self):
+        return self.con.execute('SELECT count(*) FROM updates').fetchone()[0]
+
+    def batches(self):
+        """Applied batches, oldest first."""
+        return pd.read_sql_query('SELECT * FROM batches ORDER BY applied_at, batch', self.con)
@@ -0,0 +1,263 @@
+"""
+TUNVESTI - Data-quality validation
+Declarative rules checked inside the pipeline (script 03) after clean_data
+and after derive_metrics. Each rule is one vectorized expression over the
+whole frame (plus, for the per-ticker rules, a single sort), so validating
+the full history costs a few hundred milliseconds.
+
+Severity:
+    error    offending rows are removed from the pipeline and written to
+             output/quarantine/<stage>.csv with the rules they failed
+    warning  rows are kept; they are written to
+             output/quarantine/<stage>_warnings.csv with the rules they
+             failed, for review (e.g. price limit breaches, stale prices)
+
+The quarantined share of a stage can abort the run (gate_exceeded), but
+only for stages of at least GATE_MIN_ROWS rows: a single bad quote is 1.1%
+of a ~90-row scraped batch, and is quarantined without blocking the day.
+
+Usage:
+    from tunvesti.validation import validate, gate_exceeded
+    result = validate(df, stage='clean')
+    df = result['passed']
+    result['summary']       # rule, severity, violations
+    gate_exceeded(len(result['quarantine']), len(df), max_pct=1.0)
+"""
+
+import numpy as np
+import pandas as pd
+
+from tunvesti import config
+
+QUARANTINE_DIR = config.OUTPUT_DIR / 'quarantine'
+# BVMT daily variation threshold (+/- 6.09%) plus a margin for tick rounding
+PRICE_LIMIT_PCT = 6.5
+# Identical OHLC for this many consecutive sessions counts as a stale price
+STALE_SESSIONS = 20
+# Relative slack for open/close vs. the high-low range (rounded source prices)
+RANGE_TOLERANCE = 1e-6
+# Smallest stage whose quarantined share can fail the run
+GATE_MIN_ROWS = 1000
+
+
+# ============================================================================
+# CHECKS (each returns a boolean Series: True = violation)
+# ============================================================================
+
+def _has(df, *columns):
+    return all(col in df.columns for col in columns)
+
+
+def check_missing_key(df):
+    return df['date'].isna() | df['ticker'].isna()
+
+
+def check_non_positive_price(df):
+    prices = [col for col in ('open', 'high', 'low', 'close') if col in df.columns]
+    return (df[prices] <= 0).any(axis=1)
+
+
+def check_high_below_low(df):
+    return df['high'] < df['low']
+
+
+def check_open_out_of_range(df):
+    slack = df['high'].abs() * RANGE_TOLERANCE
+    return (df['open'] < df['low'] - slack) | (df['open'] > df['high'] + slack)
+
+
+def check_close_out_of_range(df):
+    slack = df['high'].abs() * RANGE_TOLERANCE
+    return (df['close'] < df['low'] - slack) | (df['close'] > df['high'] + slack)
+
+
+def check_negative_volume(df):
+    return df['volume'] < 0
+
+
+def check_duplicate_key(df):
+    """Every occurrence of a (date, ticker) key except the last one."""
+    return df.duplicated(subset=['date', 'ticker'], keep='last')
+
+
+def _previous_close(df):
+    """Close of the previous session of the same ticker (sort-based, no groupby loop)."""
+    order = np.lexsort((df['date'].to_numpy(), df['ticker'].to_numpy()))
+    close = df['close'].to_numpy()[order]
+    ticker = df['ticker'].to_numpy()[order]
+    previous = np.empty_like(close)
+    previous[0] = np.nan
+    previous[1:] = close[:-1]
+    previous[1:][ticker[1:] != ticker[:-1]] = np.nan
+    out = np.empty_like(previous)
+    out[order] = previous
+    return out
+
+
+def check_price_limit_breach(df):
+    """Close-to-close move beyond the BVMT daily limit (corporate action or bad tick)."""
+    if 'daily_return_pct' in df.columns:
+        move = df['daily_return_pct'].to_numpy()
+    else:
+        previous = _previous_close(df)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            move = (df['close'].to_numpy() / previous - 1) * 100
+    return pd.Series(np.abs(move) > PRICE_LIMIT_PCT, index=df.index)
+
+
+def check_stale_price(df):
+    """Identical open/high/low/close for STALE_SESSIONS sessions in a row."""
+    order = np.lexsort((df['date'].to_numpy(), df['ticker'].to_numpy()))
+    ticker = pd.factorize(df['ticker'])[0][order]
+    values = df[['open', 'high', 'low', 'close']].to_numpy(dtype=np.float64)[order]
+    changed = np.ones(len(values), dtype=bool)
+    changed[1:] = (values[1:] != values[:-1]).any(axis=1) | (ticker[1:] != ticker[:-1])
+    run_id = np.cumsum(changed)
+    run_start = np.flatnonzero(changed)
+    position = np.arange(len(values)) - run_start[run_id - 1]
+    stale = np.empty(len(values), dtype=bool)
+    stale[order] = position >= STALE_SESSIONS - 1
+    return pd.Series(stale, index=df.index)
+
+
+def check_unexpected_return_nan(df):
+    """daily_return_pct missing on a row that is not the ticker's first session."""
+    order = np.lexsort((df['date'].to_numpy(), df['ticker'].to_numpy()))
+    ticker = df['ticker'].to_numpy()[order]
+    first = np.ones(len(ticker), dtype=bool)
+    first[1:] = ticker[1:] != ticker[:-1]
+    is_first = np.empty(len(ticker), dtype=bool)
+    is_first[order] = first
+    return df['daily_return_pct'].isna() & ~is_first
+
+
+# ============================================================================
+# RULES
+# ============================================================================
+
+# name -> stages it runs in, severity, required columns, check, description
+RULES = {
+    'missing_key': {
+        'stages': ('clean', 'enriched'), 'severity': 'error', 'columns': ('date', 'ticker'),
+        'check': check_missing_key, 'description': 'date or ticker is missing',
+    },
+    'non_positive_price': {
+        'stages': ('clean', 'enriched'), 'severity': 'error', 'columns': ('close',),
+        'check': check_non_positive_price, 'description': 'a price is zero or negative',
+    },
+    'high_below_low': {
+        'stages': ('clean', 'enriched'), 'severity': 'error', 'columns': ('high', 'low'),
+        'check': check_high_below_low, 'description': 'high < low',
+    },
+    # Scraped quotes carry the reference price (previous close) as open, so this is only a warning
+    'open_out_of_range': {
+        'stages': ('clean', 'enriched'), 'severity': 'warning', 'columns': ('open', 'high', 'low'),
+        'check': check_open_out_of_range, 'description': 'open outside [low, high]',
+    },
+    'close_out_of_range': {
+        'stages': ('clean', 'enriched'), 'severity': 'error', 'columns': ('close', 'high', 'low'),
+        'check': check_close_out_of_range, 'description': 'close outside [low, high]',
+    },
+    'negative_volume': {
+        'stages': ('clean', 'enriched'), 'severity': 'error', 'columns': ('volume',),
+        'check': check_negative_volume, 'description': 'volume < 0',
+    },
+    'duplicate_source_key': {
+        'stages': ('clean',), 'severity': 'warning', 'columns': ('date', 'ticker'),
+        'check': check_duplicate_key, 'description': 'repeated (date, ticker) in a source; merge keeps the last',
+    },
+    'duplicate_key': {
+        'stages': ('enriched',), 'severity': 'error', 'columns': ('date', 'ticker'),
+        'check': check_duplicate_key, 'description': 'repeated (date, ticker) after the merge',
+    },
+    'price_limit_breach': {
+        'stages': ('enriched',), 'severity': 'warning', 'columns': ('date', 'ticker', 'close'),
+        'check': check_price_limit_breach, 'description': f'close-to-close move beyond +/-{PRICE_LIMIT_PCT}%',
+    },
+    'stale_price': {
+        'stages': ('enriched',), 'severity': 'warning', 'columns': ('date', 'ticker', 'open', 'high', 'low', 'close'),
+        'check': check_stale_price, 'description': f'identical OHLC for {STALE_SESSIONS}+ sessions',
+    },
+    'unexpected_return_nan': {
+        'stages': ('enriched',), 'severity': 'warning', 'columns': ('date', 'ticker', 'daily_return_pct'),
+        'check': check_unexpected_return_nan, 'description': 'daily_return_pct missing after the first session',
+    },
+}
+
+
+# ============================================================================
+# ENGINE
+# ============================================================================
+
+def validate(df, stage='clean', rules=None):
+    """
+    Run every rule of a stage over df.
+
+    Parameters:
+    df (pd.DataFrame): Stock rows (date, ticker, OHLCV, ...)
+    stage (str): 'clean' or 'enriched'
+    rules (dict): Rule set (default: RULES)
+
+    Returns:
+    dict: 'passed' (rows without errors), 'quarantine' (error rows plus a
+          failed_rules column), 'summary' (rule, severity, violations),
+          'warnings' (warning rows plus a failed_rules column)
+    """
+    rules = RULES if rules is None else rules
+    records, error_masks, warning_masks = [], {}, {}
+
+    for name, rule in rules.items():
+        if stage not in rule['stages']:
+            continue
+        if not len(df) or not _has(df, *rule['columns']):
+            records.append({'rule': name, 'severity': rule['severity'], 'violations': 0,
+                            'description': rule['description'], 'skipped': True})
+            continue
+        mask = rule['check'](df).fillna(False).to_numpy(dtype=bool)
+        (error_masks if rule['severity'] == 'error' else warning_masks)[name] = mask
+        records.append({'rule': name, 'severity': rule['severity'], 'violations': int(mask.sum()),
+                        'description': rule['description'], 'skipped': False})
+
+    def flagged(masks):
+        if not masks:
+            return np.zeros(len(df), dtype=bool), df.iloc[0:0].assign(failed_rules='')
+        stacked = np.column_stack(list(masks.values()))
+        rows = stacked.any(axis=1)
+        names = np.array(list(masks))
+        failed = [','.join(names[hits]) for hits in stacked[rows]]
+        return rows, df[rows].assign(failed_rules=failed)
+
+    errors, quarantine = flagged(error_masks)
+    _, warnings = flagged(warning_masks)
+    return {
+        'passed': df[~errors],
+        'quarantine': quarantine,
+        'warnings': warnings,
+        'summary': pd.DataFrame(records, columns=['rule', 'severity', 'violations', 'description', 'skipped']),
+    }
+
+
+def gate_exceeded(quarantined, rows, max_pct, min_rows=GATE_MIN_ROWS):
+    """
+    Whether the quarantined share of a stage should abort the run.
+
+    Parameters:
+    quarantined (int): Rows removed by error rules
+    rows (int): Rows validated
+    max_pct (float): Largest tolerated share of quarantined rows (%)
+    min_rows (int): Smaller stages never fail on their share (their bad rows
+        are still quarantined)
+
+    Returns:
+    bool: True if rows >= min_rows and the share exceeds max_pct
+    """
+    return rows >= min_rows and quarantined / rows * 100 > max_pct
+
+
+def save_quarantine(quarantine, name, quarantine_dir=None):
+    """Write quarantined rows to output/quarantine/<name>.csv (replaced each run)."""
+    quarantine_dir = quarantine_dir or QUARANTINE_DIR
+    quarantine_dir.mkdir(parents=True, exist_ok=True)
+    path = quarantine_dir / f'{name}.csv'
+    quarantine.to_csv(path, index=False)
+    return path